@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+""" Time the record pipeline and the browsing of the project tree on a
+    generated tree, without a display or network. The results can be
+    saved to JSON, and compared to an earlier run.
+
+    Usage:
+    RDM_benchmark.py [-o results.json] [-b baseline.json] [--tolerance t]
+                     [-p projects] [-s samples] [-r records] [-d depth]
+                     [--rows rows] [-a attachments] [--attachment-kb kb]
+                     [-n repeat] [--keep folder] [--only name ...]
+                     [--upload] [-w workers] [--latency s] [--error-rate r]
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+from rdm_modules.rdm_bench import (compare, default_params, format_comparison,
+                                   format_results, load_results,
+                                   run_benchmarks, run_upload_benchmark,
+                                   save_results)
+from rdm_modules.rdm_trace import setup_logging
+
+
+def main(args:list) -> int:
+    """ parse the command line, run the benchmarks and compare them
+
+        return:
+        the exit code: 0 if done, 1 if a benchmark got slower than
+        the baseline or on errors
+    """
+    setup_logging()
+
+    parser = argparse.ArgumentParser(
+            description= 'Benchmark the RDM-desktop record pipeline')
+    parser.add_argument('-o', '--output',
+                        help= 'save the results to this JSON file')
+    parser.add_argument('-b', '--baseline',
+                        help= 'compare to the results of an earlier run')
+    parser.add_argument('--tolerance', type= float, default= 0.1,
+                        help= 'relative change taken as noise (default 0.1)')
+    parser.add_argument('-p', '--projects', type= int,
+                        default= default_params['projects'])
+    parser.add_argument('-s', '--samples', type= int,
+                        default= default_params['samples'],
+                        help= 'samples per project')
+    parser.add_argument('-r', '--records', type= int,
+                        default= default_params['records'],
+                        help= 'records per sample')
+    parser.add_argument('-d', '--depth', type= int,
+                        default= default_params['subset_depth'],
+                        help= 'subsets nested in the records, 0 for none')
+    parser.add_argument('--rows', type= int,
+                        default= default_params['subset_rows'],
+                        help= 'rows in every subset')
+    parser.add_argument('-a', '--attachments', type= int,
+                        default= default_params['attachments'],
+                        help= 'attachment files per record')
+    parser.add_argument('--attachment-kb', type= int,
+                        default= default_params['attachment_kb'])
+    parser.add_argument('-n', '--repeat', type= int,
+                        default= default_params['repeat'],
+                        help= 'runs of every benchmark')
+    parser.add_argument('--keep',
+                        help= 'generate the tree in this folder and keep it')
+    parser.add_argument('--only', nargs= '+',
+                        help= 'run only these benchmarks')
+    parser.add_argument('--upload', action= 'store_true',
+                        help= 'also upload all records to a local mock '
+                              'ElabFTW server')
+    parser.add_argument('-w', '--workers', type= int, default= 4,
+                        help= 'records uploaded at the same time')
+    parser.add_argument('--latency', type= float, default= 0.0,
+                        help= 'seconds the mock server waits to answer')
+    parser.add_argument('--error-rate', type= float, default= 0.0,
+                        help= 'part of the requests the mock server fails')
+
+    opts = parser.parse_args(args)
+    params = {'projects': opts.projects,
+              'samples': opts.samples,
+              'records': opts.records,
+              'subset_depth': opts.depth,
+              'subset_rows': opts.rows,
+              'attachments': opts.attachments,
+              'attachment_kb': opts.attachment_kb,
+              'repeat': opts.repeat}
+
+    baseline = None
+    if opts.baseline:
+        try:
+            baseline = load_results(opts.baseline)
+        except (OSError, ValueError) as e:
+            print('cannot read the baseline:', e, file= sys.stderr)
+            return 1
+
+    def progress(name:str) -> None:
+        print('running', name, file= sys.stderr)
+
+    def run(root:str) -> dict:
+        results = run_benchmarks(os.path.join(root, 'pipeline'),
+                                 params, opts.only, progress)
+        if opts.upload:
+            progress('batch upload')
+            # a tree of its own, the upload changes the records
+            results['upload'] = run_upload_benchmark(
+                    os.path.join(root, 'upload'),
+                    params,
+                    workers= opts.workers,
+                    latency= opts.latency,
+                    error_rate= opts.error_rate)
+        return results
+    # end run
+
+    if opts.keep:
+        if os.path.isdir(opts.keep) and os.listdir(opts.keep):
+            print(opts.keep, 'is not empty', file= sys.stderr)
+            return 1
+        results = run(opts.keep)
+    else:
+        with tempfile.TemporaryDirectory(prefix= 'rdm_bench_') as root:
+            results = run(root)
+
+    print(format_results(results))
+    if opts.output:
+        save_results(results, opts.output)
+
+    if baseline is None:
+        return 0
+
+    comparison = compare(results, baseline, opts.tolerance)
+    print()
+    print(format_comparison(comparison, results, baseline))
+    return 1 if any(i[4] == 'slower' for i in comparison) else 0
+# end main
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
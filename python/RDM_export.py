@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+""" Export all records of a template under projects or samples to a
+    CSV or Parquet table, one line per record, or one line per row of
+    a subset.
+
+    Usage:
+    RDM_export.py -t template [-s subset] [-o output] [-w workers]
+                  [--row-group rows] [path ...]
+
+    The output is CSV unless its name ends with .parquet, which needs
+    pyarrow installed.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import argparse
+import json
+import sys
+
+from rdm_modules.project_config import get_config
+from rdm_modules.rdm_export import export_records
+from rdm_modules.rdm_trace import setup_logging
+
+
+def main(args:list) -> int:
+    """ parse the command line and export the records
+
+        return:
+        the exit code: 0 if done, 1 on errors
+    """
+    setup_logging()
+
+    config = get_config()
+
+    parser = argparse.ArgumentParser(
+            description= 'Export RDM-desktop records of a template to a table')
+    parser.add_argument('paths', nargs='*',
+                        help= 'records, sample or project folders '
+                              '(default: the whole projects folder)')
+    parser.add_argument('-t', '--template', required= True,
+                        help= 'the template of the records, e.g. SEM.yaml')
+    parser.add_argument('-s', '--subset',
+                        help= 'make a line of every row of this subset')
+    parser.add_argument('-o', '--output', default= 'export.csv',
+                        help= 'the output file, .csv or .parquet')
+    parser.add_argument('-w', '--workers', type= int, default= 4,
+                        help= 'records read at the same time')
+    parser.add_argument('--row-group', type= int, default= 10000,
+                        help= 'lines in a row group of Parquet files')
+
+    opts = parser.parse_args(args)
+    paths = opts.paths if opts.paths else [config['projectDir']]
+
+    try:
+        summary = export_records(paths,
+                                 config,
+                                 opts.template,
+                                 opts.output,
+                                 subset= opts.subset,
+                                 workers= opts.workers,
+                                 row_group_size= opts.row_group)
+    except (OSError, ValueError, ImportError) as e:
+        print('cannot export:', e, file= sys.stderr)
+        return 1
+
+    json.dump(summary, sys.stdout, indent= 2)
+    print()
+    return 0
+# end main
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+""" Run a local mock ElabFTW server, to try uploads from the GUI or
+    RDM_upload.py without a real server. The experiments are kept in
+    memory only, and the counted requests are printed at the end.
+
+    Usage:
+    RDM_mockserver.py [-p port] [-t token] [--latency s] [--error-rate r]
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from rdm_modules.rdm_trace import setup_logging
+from rdm_modules.uploaders.mock_elabftw import MockElabFTW
+
+
+def main(args:list) -> int:
+    """ parse the command line and serve until Ctrl-C
+
+        return:
+        the exit code: 0
+    """
+    setup_logging()
+
+    parser = argparse.ArgumentParser(
+            description= 'A local mock ElabFTW server for testing uploads')
+    parser.add_argument('-p', '--port', type= int, default= 8080)
+    parser.add_argument('-t', '--token', default= '',
+                        help= 'the API token to accept (default: any)')
+    parser.add_argument('--latency', type= float, default= 0.0,
+                        help= 'seconds to wait before every answer')
+    parser.add_argument('--error-rate', type= float, default= 0.0,
+                        help= 'part of the requests answered by 503')
+
+    opts = parser.parse_args(args)
+
+    server = MockElabFTW(token= opts.token,
+                         latency= opts.latency,
+                         error_rate= opts.error_rate,
+                         port= opts.port)
+    with server:
+        print('mock ElabFTW server at', server.url, '(Ctrl-C to stop)')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+    json.dump({'experiments': len(server.experiments),
+               'requests': server.counts,
+               'errors': server.errors,
+               'bytes received': server.bytes_received},
+              sys.stdout, indent= 2)
+    print()
+    return 0
+# end main
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
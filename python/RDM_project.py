@@ -11,6 +11,9 @@
 
 import rdm_modules.main_window as mw
 from rdm_modules.project_config import get_config
+from rdm_modules.rdm_trace import setup_logging
+
+setup_logging()
 
 print(get_config())
 
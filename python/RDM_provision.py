@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+""" Create many projects and their samples at once from a YAML or CSV
+    manifest, using the folder list and readme templates of the
+    configuration. Existing folders and readme files are kept, so the
+    same manifest can be run again.
+
+    Usage:
+    RDM_provision.py [-n] [-w workers] manifest
+
+    With -n (dry run) only the folders and readme files to be created
+    are listed.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import argparse
+import json
+import sys
+
+import yaml
+
+from rdm_modules.project_config import get_config
+from rdm_modules.rdm_provision import (provision, read_manifest)
+from rdm_modules.rdm_trace import setup_logging
+
+
+def main(args:list) -> int:
+    """ parse the command line and create the folders
+
+        return:
+        the exit code: 0 if all went fine, 1 if anything failed
+    """
+    setup_logging()
+
+    config = get_config()
+
+    parser = argparse.ArgumentParser(
+            description= 'Create RDM-desktop projects and samples '
+                         'from a manifest')
+    parser.add_argument('manifest',
+                        help= 'YAML or CSV file listing the projects '
+                              'and their samples')
+    parser.add_argument('-n', '--dry-run', action= 'store_true',
+                        help= 'only show what would be created')
+    parser.add_argument('-w', '--workers', type= int, default= 8,
+                        help= 'folders created at the same time')
+
+    opts = parser.parse_args(args)
+
+    try:
+        manifest = read_manifest(opts.manifest, config)
+        summary = provision(manifest,
+                            config,
+                            dry_run= opts.dry_run,
+                            workers= opts.workers)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        print('cannot provision:', e, file= sys.stderr)
+        return 1
+
+    if opts.dry_run:
+        print(summary.pop('plan'))
+        return 0
+
+    json.dump(summary, sys.stdout, indent= 2)
+    print()
+
+    return 1 if summary['failed'] else 0
+# end main
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
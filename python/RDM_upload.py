@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+""" Upload many records to an ELN without the GUI, e.g. from a cron job.
+    Walks the project tree from the given folders (projects, samples or
+    the whole projects folder) the same way the main window does, uploads
+    every record not yet uploaded to the server, and prints a JSON
+    summary of the new experiments and the failures.
+
+    Usage:
+    RDM_upload.py [-s server] [-t token] [-e ELN] [-w workers]
+                  [-a attachment workers] [-p pool size] [-r retries] [--per-field]
+                  [--no-dedup] [--no-verify] [--list] [path ...]
+
+    Server and token default to the configuration, the token can also
+    come from the RDM_TOKEN environment variable.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from rdm_modules.project_config import get_config
+from rdm_modules.rdm_trace import setup_logging
+from rdm_modules.rdm_tree import iter_records
+from rdm_modules.rdm_upload import (batch_upload, uploader_dict)
+
+
+def main(args:list) -> int:
+    """ parse the command line and run the upload
+
+        return:
+        the exit code: 0 if all went fine, 1 if any record failed
+    """
+    setup_logging()
+
+    config = get_config()
+    server_config = config['server'] if 'server' in config else {}
+
+    parser = argparse.ArgumentParser(
+            description= 'Upload RDM-desktop records to an ELN')
+    parser.add_argument('paths', nargs='*',
+                        help= 'records, sample or project folders '
+                              '(default: the whole projects folder)')
+    parser.add_argument('-s', '--server',
+                        default= server_config.get('server', ''),
+                        help= 'server URL')
+    parser.add_argument('-t', '--token',
+                        default= os.getenv('RDM_TOKEN',
+                                           server_config.get('token', '')),
+                        help= 'API token (or set RDM_TOKEN)')
+    parser.add_argument('-e', '--eln',
+                        default= list(uploader_dict.keys())[0],
+                        choices= list(uploader_dict.keys()),
+                        help= 'the ELN type')
+    parser.add_argument('-w', '--workers', type= int, default= 4,
+                        help= 'records uploaded at the same time')
+    parser.add_argument('-a', '--attachment-workers', type= int, default= 4,
+                        help= 'attachments uploaded at the same time '
+                              'for every record')
+    parser.add_argument('-p', '--pool-size', type= int,
+                        default= server_config.get('pool size', 0),
+                        help= 'open connections per server (default: '
+                              'workers x attachment workers)')
+    parser.add_argument('-r', '--retries', type= int,
+                        default= server_config.get('retries', 3),
+                        help= 'retries of failed requests')
+    parser.add_argument('--per-field', action= 'store_true',
+                        default= server_config.get('per field update', False),
+                        help= 'one PATCH request per field (older servers)')
+    parser.add_argument('--no-dedup', action= 'store_true',
+                        help= 'send attachments even if the same content '
+                              'is already on the server')
+    parser.add_argument('--no-verify', action= 'store_true',
+                        help= 'do not check the server certificate')
+    parser.add_argument('--list', action= 'store_true',
+                        help= 'only list the records found')
+
+    opts = parser.parse_args(args)
+    paths = opts.paths if opts.paths else [config['projectDir']]
+
+    if opts.list:
+        for path in paths:
+            for i in iter_records(config, path):
+                print(i)
+        return 0
+
+    options = {'pool_size': max(opts.pool_size,
+                                opts.workers * opts.attachment_workers,
+                                1),
+               'attachment_workers': opts.attachment_workers,
+               'retries': opts.retries,
+               'per_field': opts.per_field,
+               'deduplicate': not opts.no_dedup}
+
+    summary = batch_upload(paths,
+                           config,
+                           opts.server,
+                           opts.token,
+                           eln= opts.eln,
+                           workers= opts.workers,
+                           verify= False if opts.no_verify else None,
+                           options= options)
+
+    json.dump(summary, sys.stdout, indent= 2)
+    print()
+
+    return 1 if summary['failed'] else 0
+# end main
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
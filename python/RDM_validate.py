@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+""" Check the experiment records of projects against their templates,
+    e.g. records written by instruments or scripts, or a whole archive
+    before uploading it. Prints the problems of every invalid record.
+
+    Usage:
+    RDM_validate.py [-w workers] [--json] [path ...]
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import argparse
+import json
+import sys
+
+from rdm_modules.project_config import get_config
+from rdm_modules.rdm_trace import setup_logging
+from rdm_modules.rdm_validate import (format_report, validate_tree)
+
+
+def main(args:list) -> int:
+    """ parse the command line and check the records
+
+        return:
+        the exit code: 0 if all records are valid, 1 otherwise
+    """
+    setup_logging()
+
+    config = get_config()
+
+    parser = argparse.ArgumentParser(
+            description= 'Check RDM-desktop records against their templates')
+    parser.add_argument('paths', nargs='*',
+                        help= 'records, sample or project folders '
+                              '(default: the whole projects folder)')
+    parser.add_argument('-w', '--workers', type= int, default= 8,
+                        help= 'records checked at the same time')
+    parser.add_argument('--json', action= 'store_true',
+                        help= 'print the report as JSON')
+
+    opts = parser.parse_args(args)
+    paths = opts.paths if opts.paths else [config['projectDir']]
+
+    report = validate_tree(paths, config, workers= opts.workers)
+
+    if opts.json:
+        json.dump(report, sys.stdout, indent= 2)
+        print()
+    else:
+        print(format_report(report))
+
+    return 1 if report['invalid'] else 0
+# end main
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -9,14 +9,16 @@
     Warranty:   None
 """
 
-import yaml
 import os
 import sys
 import rdm_modules.project_config as pc
+from rdm_modules.rdm_yaml import safe_load
 import tkinter as tk
 from tkinter.filedialog import askopenfile
 import rdm_modules.form_from_dict as ffd
+from rdm_modules.rdm_trace import setup_logging
 
+setup_logging()
 config = pc.get_config()
 
 output_file= ''
@@ -30,14 +32,14 @@ with open(
             config['defaultForm'][-1]
             ),
         'rt') as fp:
-    template = yaml.safe_load(fp)
+    template = safe_load(fp)
 
 with askopenfile(title='Select template form',
                         mode='r',
                         filetypes=[('yaml', '*.yaml'), ('yml', '*.yml')],
                         initialdir= config['templateDir'],
                  defaultextension='yaml') as fp:
-    template_2 = yaml.safe_load(fp)
+    template_2 = safe_load(fp)
 
 if template and template_2:
     template.update(template_2)
@@ -16,11 +16,16 @@ from tkinter.messagebox import showerror
 
 from .project_config import replace_text
 
+from .rdm_export import (flatten, table_columns, write_csv)
 from .rdm_help import rdmHelp
+from .rdm_schema import (Schema, compile_template)
+from .rdm_trace import (get_logger, traced)
 from .rdm_widgets import (EntryBox, MultilineText,
                           FilePickerTextField, CheckBox, MultiSelect,
                           Select, DateRoller, RdmWindow)
 
+log = get_logger('form')
+
 
 class FormBuilder():
     """ a GUI window form dynamically built from a template
@@ -34,7 +39,8 @@ class FormBuilder():
                  root_path:str,
                  parent:tk.Misc,
                  template:dict,
-                 config:dict
+                 config:dict,
+                 schema:Schema|None= None
                  ) -> None:
         """ Create a window, and populate it with input fields from
             template.
@@ -43,19 +49,28 @@ class FormBuilder():
             title:      title displayed for the window
             root_path:  where the data shall be saved (data folder)
             parent:     parent window object or None
-            template:   template dict to base the work on
+            template:   template dict to base the work on, its
+                        values are shown in the fields
             config:     configuration settings
+            schema:     the compiled template, if it is known already,
+                        it is compiled from template otherwise
 
             Return;
                 At submittion, save a YAML file of the results.
+
+            Raise:
+                TemplateError if the template is broken
         """
         if not config or not template:
-            print('Not enough information to proceed')
+            log.warning('not enough information to build a form')
             return
 
         self.config = config
         self.parent = parent
         self.template = template
+        # check the template before opening any window
+        self.schema = schema if schema is not None\
+                        else compile_template(template)
 
         self.root_path = root_path if root_path\
                             else config['projectDir']
@@ -97,6 +112,7 @@ class FormBuilder():
     # end init()
 
 
+    @traced('form')
     def add_content(self) -> None:
         """ parse the template dict, and add elements to the
             main window accordingly.
@@ -156,92 +172,19 @@ class FormBuilder():
                 # then use continue to skip the rest:
                 continue
 
-            # a local frame is used to pack everything in
-            # the specific line
-            # turn to using a match structure with all its
-            # complex possibilities
-            # this should make the whole procedure somewhat simpler looking
-            # testing match:
-            #match v:
-            #    case {'type':'text'|'url'|'numeric'|'integer'|'list'|'numericlist'}:
-            #        print ('found a field!', v['type'])
-            #
-            # problem: python < 3.10 does not support match / case
-            # and python > 3.10 cannot run on older windows
-
-            # end if not a dict or has no type...
-            # handle those which have type and are dicts
-            if v['type'] in ['text', 'url',
-                             'numeric', 'integer',
-                             'list', 'numericlist']:
-                # entry = ttk.Entry(frame, textvariable= var)
-                entry = EntryBox(frame,
-                                 txt_label,
-                                 v['type'],
-                                 units=(v['units'] if 'units' in v else None))
-
-                # set is managed for all later
-                if 'unit' in v:
-                    entry.unit= v['unit']
-
-
-            elif v['type'] == 'date':
-                entry = DateRoller(frame, label= txt_label)
-
-            elif v['type'] == 'select':
-                entry = Select(frame, txt_label, v['options'])
-
-                # make it read only, so user cannot insert new values
-                # alternative would be state 'normal'
-
-            elif v['type'] == 'multiselect':
-                entry = MultiSelect(frame, txt_label, v['options'])
-
-            elif v['type'] == 'multiline':
-                # another text widget, with multiple lines
-                # if confit['editor'] is set, it has an edit button
-                # to allow for external editing
-                editor = self.config['editor'] if ('editor' in self.config
-                                    and self.config['editor']) else None
-
-                entry = MultilineText(frame, label= txt_label, editor= editor)
-
-            elif v['type'] == 'file':
-                # files we are seeking contain other
-                # experiments in the root_path
-                # experiments are typically yaml files
-                ext = v['extension'] if 'extension' in v else 'yaml'
-                entry = FilePickerTextField(
-                        parent= frame,
-                        label= txt_label,
-                        indir= self.root_path,
-                        extension= ext
-                        )
-
-            elif v['type'] == 'checkbox':
-                entry = CheckBox(frame, label= txt_label)
-
-            elif v['type'] == 'subset' \
-                    and 'form' in v \
-                    and isinstance(v['form'], dict):
-                # we leave it in its own lower level frame
-                # so it can be part of other settings like measurement
-
-                entry= SubSet(
-                    title= txt_label,
-                    root_path= self.root_path,
-                    parent= frame,
-                    form= v['form'],
-                    config= self.config
-                    )
-            # end enumerating possible types
+            # the widget comes from the type of the compiled field
+            field = self.schema[i]
+            entry = self.widget_makers[field.type](self, frame, txt_label, field)
+
+            if 'unit' in v and field.units:
+                entry.unit = v['unit']
 
             # error and required should be initialized for
             # every widget as false
             # we run this, though not every widget will
             # have it (e.g. in a selection or a radio button
             # it has no meaning)
-            if 'required' in v and v['required']:
+            if field.required:
                 entry.required = True
 
             # is there a default value requested,
@@ -283,6 +226,97 @@ class FormBuilder():
     # end of add_content
 
 
+    def make_entry(self, frame:tk.Misc, label:str, field) -> EntryBox:
+        """ text, url, numeric, integer, list and numericlist fields
+        """
+        return EntryBox(frame,
+                        label,
+                        field.type,
+                        units= list(field.units) if field.units else None)
+    # end make_entry
+
+
+    def make_date(self, frame:tk.Misc, label:str, field) -> DateRoller:
+        """ a date and time field
+        """
+        return DateRoller(frame, label= label)
+    # end make_date
+
+
+    def make_select(self, frame:tk.Misc, label:str, field) -> Select:
+        """ a read only selection, the user cannot add new values
+        """
+        return Select(frame, label, list(field.options))
+    # end make_select
+
+
+    def make_multiselect(self, frame:tk.Misc, label:str, field) -> MultiSelect:
+        """ a selection of several options
+        """
+        return MultiSelect(frame, label, list(field.options))
+    # end make_multiselect
+
+
+    def make_multiline(self, frame:tk.Misc, label:str, field) -> MultilineText:
+        """ a text widget with multiple lines, if config['editor']
+            is set, it has an edit button to allow for external editing
+        """
+        editor = self.config['editor'] if ('editor' in self.config
+                            and self.config['editor']) else None
+
+        return MultilineText(frame, label= label, editor= editor)
+    # end make_multiline
+
+
+    def make_file(self, frame:tk.Misc, label:str, field) -> FilePickerTextField:
+        """ files we are seeking contain other experiments in the
+            root_path, which are typically yaml files
+        """
+        return FilePickerTextField(parent= frame,
+                                   label= label,
+                                   indir= self.root_path,
+                                   extension= field.extension)
+    # end make_file
+
+
+    def make_checkbox(self, frame:tk.Misc, label:str, field) -> CheckBox:
+        """ a yes / no field
+        """
+        return CheckBox(frame, label= label)
+    # end make_checkbox
+
+
+    def make_subset(self, frame:tk.Misc, label:str, field) -> 'SubSet':
+        """ a subset in its own lower level frame,
+            so it can be part of other settings like measurement
+        """
+        return SubSet(title= label,
+                      root_path= self.root_path,
+                      parent= frame,
+                      form= field.form.template(),
+                      config= self.config,
+                      schema= field.form)
+    # end make_subset
+
+
+    # field type: function(self, frame, label, field) making its widget
+    widget_makers = {
+            'text':         make_entry,
+            'url':          make_entry,
+            'numeric':      make_entry,
+            'integer':      make_entry,
+            'list':         make_entry,
+            'numericlist':  make_entry,
+            'date':         make_date,
+            'select':       make_select,
+            'multiselect':  make_multiselect,
+            'multiline':    make_multiline,
+            'file':         make_file,
+            'checkbox':     make_checkbox,
+            'subset':       make_subset
+            }
+
+
     def collect_results(self) -> None:
         """ fill up the results with this
         """
@@ -301,7 +335,7 @@ class FormBuilder():
             # within the subset vs. main tree
             val = v.get()
             typ = self.template[i]['type']
-            print('getting:', i,'/', typ, ':', val)
+            log.debug('getting: %s / %s: %s', i, typ, val)
 
             # If we have a problem, do not close the
             # widget, inform the user
@@ -359,7 +393,8 @@ class SubSet():
                  root_path:str,
                  parent:tk.Misc,
                  form:dict,
-                 config:dict) -> None:
+                 config:dict,
+                 schema:Schema|None= None) -> None:
         """ create a frame inside the parent widget with
             information about the current status of the subset,
             and buttons to:
@@ -376,9 +411,10 @@ class SubSet():
             parent:     the parent widget or None
             form:       what fields to be collected
             config:     the configuration dict
+            schema:     the compiled form, compiled from form if None
         """
         if not form:
-            print('Nothing to do here!')
+            log.warning('empty subset form')
             return
 
         # to minimize internal variables, leave
@@ -390,6 +426,9 @@ class SubSet():
         self.error = False
         # we need form to create the form when needed
         self.form = form
+        # every new or edited row gets its own copy of the form from it
+        self.schema = schema if schema is not None\
+                        else compile_template(form, title)
         # if called out of context, it should still work:
         self.parent = tk.Tk() if parent is None else parent
 
@@ -499,9 +538,9 @@ class SubSet():
                 )->None:
         """ add values to the lists
         """
-        # since python 3.11 dict copy is a shallow copy
-        # so we make a full copy for protecting the original
-        this_template = self.form.copy()
+        # a fresh copy, so the values set here do not
+        # stick to the form
+        this_template = self.schema.template()
         if self.content:
             row = self.content[-1]
 
@@ -521,7 +560,8 @@ class SubSet():
                 root_path= root_path,
                 parent= self.parent,
                 template= this_template,
-                config= config
+                config= config,
+                schema= self.schema
                 )
         input_form.window.wait_window()
 
@@ -642,14 +682,8 @@ class SubSet():
 
     def write_csv(self, folder) -> None:
         """ get a file name, and dump the content to a CSV file.
-            For elements containing comma, quote them as strings.
-            Do a simple job, so we can live without the CSV class.
-            It is not really nice when one has many lists and subsets
-            to use this, but useful for simple subset tables.
-
-            Delimiter: ','
-            New line: '\n'
-            quote:      simple, when ',' is in the string
+            Fields with units get a second column with the unit,
+            lists are joined by '; ', see rdm_export.
         """
 
         # get a file pointer in the current project folder
@@ -658,32 +692,18 @@ class SubSet():
                       filetypes= [('.csv', '*.csv')],
                       defaultextension= '.csv',
                       )
+        if not fn:
+            return
+
+        columns = table_columns(self.schema, constants= False)
+        keys = list(self.form.keys())
+
+        rows = [[(i[0], i[3]) for i in columns]]
+        rows += [flatten(self.schema, dict(zip(keys, row)), columns)
+                 for row in self.content]
+        write_csv(rows, fn)
 
-        # for simple quoting:
-        def to_str(x):
-            if isinstance(x, str):
-                t = f'{x}'
-            else:
-                t = repr(x)
-            if ',' in t:
-                return f'"{x}"'
-            return t
-        # end define to_str
-
-        with open(fn, 'wt', encoding='UTF-8') as fp:
-            # create a header
-            txt = ', '.join([to_str(i) for i in self.form.keys()])
-            print('header:\n', txt)
-            fp.write(f'{txt}\n')
-
-            for row in self.content:
-                txt = ', '.join([to_str(i) for i in row])
-                # print(txt)
-                fp.write(f'{txt}\n')
-            # with takes care of this
-            # fp.close()
-
-        print('writing csv file is complete')
+        log.info('%s is written', fn)
     # end wirte_csv
 
 
@@ -721,7 +741,7 @@ class SubSet():
         """
         element = tree_widget.selection()
         if not element:
-            print('Nothing to edit')
+            log.debug('nothing to edit')
             return
 
         element = element[0]
@@ -730,8 +750,8 @@ class SubSet():
         row = self.content[index]
 
         # to use the form builder, we have to change
-        # the form to have values set
-        this_template = self.form.copy()
+        # the form to have values set, in a copy of it
+        this_template = self.schema.template()
         keylist = list(this_template.keys())
         for i,j in enumerate(keylist):
             this_template[j]['value'] = row[i]
@@ -747,7 +767,8 @@ class SubSet():
                 root_path= root_path,
                 parent= tree_widget,
                 template= this_template,
-                config= config
+                config= config,
+                schema= self.schema
                 )
         input_form.window.wait_window()
 
@@ -850,11 +871,12 @@ class SubSet():
 
         for i in keys:
             if i not in self.form:
-                print('key', i, 'not found')
+                log.warning('key %s not found in the subset', i)
                 return
 
         if len(keys) != len(self.form):
-            print('length mismatch!', len(keys), 'vs', length(self.form))
+            log.warning('length mismatch: %d vs %d', len(keys),
+                        len(self.form))
             return
 
         self.content = [tuple(i.values()) for i in values]
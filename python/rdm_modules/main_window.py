@@ -12,26 +12,102 @@
 
 import os
 import subprocess
+import threading
 import tkinter as tk
 from tempfile import NamedTemporaryFile
 from tkinter import simpledialog as tksd
 from tkinter.filedialog import askopenfilename
+from tkinter.messagebox import showerror
 # from tkinter import font
-import yaml
 
 
 # now the local elements:
 from .form_from_dict import FormBuilder, SubSet
 from .project_config import (replace_text, get_config, save_config)
 from .project_dir import make_dir
+from .rdm_index import get_record_index
+from .rdm_match import level_filter
+from .rdm_schema import TemplateError
+from .rdm_search import get_search_index
 from .rdm_uploader import rdmUploader
 
-from .rdm_templates import (read_record, save_record)
-from .rdm_widgets   import RdmWindow
+from .rdm_templates import (get_schema, read_record, save_record)
+from .rdm_trace import (get_logger, span)
+from .rdm_tree import (config_element, record_level)
+from .rdm_watcher import get_watcher
+from .rdm_worker import TkExecutor
+from .rdm_widgets   import (RdmWindow, VirtualList)
+from .rdm_yaml import (safe_dump, safe_load)
 
 # important global variables (within the package)
 __version__= '0.5.0'
 
+log = get_logger('main')
+
+
+def _record_info(full_path:str, level:int) -> dict|None:
+    """ the indexed information of a record (template, user, created
+        and upload servers), None if there is no index
+    """
+    index = get_record_index()
+    if index is None:
+        return None
+
+    return index.record_info(full_path, level)
+# end _record_info
+
+
+def _info_text(info:dict|None) -> str:
+    """ a one line summary of the record information for the window
+    """
+    if not info:
+        return ''
+
+    text = f'{info["template"] or "no template"}'
+    if info['template version']:
+        text = f'{text} ({info["template version"]})'
+    if info['user']:
+        text = f'{text}, {info["user"]}'
+    if info['created']:
+        text = f'{text}, {info["created"]}'
+
+    if info['uploaded']:
+        return f'{text}, uploaded to: {", ".join(info["uploaded"])}'
+    return f'{text}, not uploaded'
+# end _info_text
+
+
+def _read_form(full_path:str,
+               default_template:str,
+               template_dir:str,
+               level:int) -> tuple:
+    """ read a record merged with its templates, and find the shared
+        compiled template of it, run in the background by edit_form
+
+        return:
+        the record, the Schema and the indexed record information;
+        None for the Schema if the record has fields the current
+        template does not know (e.g. a full record of an older
+        template version)
+    """
+    info = _record_info(full_path, level)
+    form_data = read_record(full_path, default_template, template_dir)
+    name = form_data.get('template') if form_data else None
+    if not isinstance(name, str):
+        return form_data, None, info
+
+    schema = get_schema(os.path.join(template_dir, name), default_template)
+    if schema is None:
+        return form_data, None, info
+
+    for k, v in form_data.items():
+        if isinstance(v, dict) and 'type' in v\
+                and (k not in schema or schema[k].type != v['type']):
+            return form_data, None, info
+
+    return form_data, schema, info
+# end _read_form
+
 
 class ListWidget():
     """ A widget to provide a list of a folder, but in
@@ -71,6 +147,10 @@ class ListWidget():
         self.config = config
         self.level = level
         self.content_list = []
+        # listing runs in the background, only the last one counts
+        self.scan_id = 0
+        # the listbox shows search hits instead of the folder content
+        self.searching = False
 
         self.root_path = root_path if root_path \
                     else self.get_config_element('projectDir')
@@ -121,7 +201,7 @@ class ListWidget():
 
 
         # this is for debugging
-        print(f'level: {self.level}, Path is {self.root_path}')
+        log.debug('level: %d, path is %s', self.level, self.root_path)
 
         self.target = self.get_config_element(
                 'searchTargets'
@@ -155,6 +235,24 @@ class ListWidget():
                 )
             config_button.grid(column= 1, row= 0)
 
+        # search in the records under this folder
+        self.search_text = tk.StringVar()
+        search_entry = tk.Entry(
+                self.window.header,
+                textvariable= self.search_text
+                )
+        search_entry.grid(column= 0, row= 0, padx= 5, sticky= 'ew')
+        search_entry.bind('<Return>', self.search)
+
+
+        # slow work runs in worker threads, the window stays usable
+        self.status = tk.Label(self.window.command, text= '')
+        self.status.grid(column= 0, row= 0, sticky= 'w')
+        # the template, user and uploads of the selected record
+        self.info = tk.Label(self.window.command, text= '', anchor= 'w')
+        self.info.grid(column= 0, columnspan= 10, row= 1, sticky= 'we')
+        self.executor = TkExecutor(self.window.window,
+                                   on_busy= self.show_busy)
 
         # make the content
         self.make_listbox(self.window.content)
@@ -191,9 +289,62 @@ class ListWidget():
         # make a nice, large button:
         # button.grid(column= 7, columnspan= 3, row= 9)
         button.grid(column= 7, columnspan= 2, row=0)
+
+        # follow the changes made by other programs:
+        # the watcher runs in its own thread, it only sets
+        # the flag, the list is updated in check_changes
+        self.changed = threading.Event()
+        self.watch_id = get_watcher().watch(
+                self.root_path,
+                lambda path: self.changed.set()
+                )
+        self.after_id = None
+        self.window.window.bind('<Destroy>', self.on_destroy, add= '+')
+        self.check_changes()
     # end __init__
 
 
+    def show_busy(self, busy:bool) -> None:
+        """ show if anything is running in the background
+        """
+        self.window.window.config(cursor= 'watch' if busy else '')
+        self.status.config(text= 'working...' if busy else '')
+    # end show_busy
+
+
+    def check_changes(self) -> None:
+        """ update the list if the watcher reported a change,
+            and check again a bit later
+        """
+        if self.changed.is_set():
+            self.changed.clear()
+            self.listbox_update()
+            # e.g. an upload just finished
+            self.show_info()
+
+        self.after_id = self.window.window.after(250, self.check_changes)
+    # end check_changes
+
+
+    def on_destroy(self, event) -> None:
+        """ stop watching the folder when the window is closed
+        """
+        # child widgets report their destruction here too
+        if event.widget is not self.window.window:
+            return
+
+        if self.after_id is not None:
+            self.window.window.after_cancel(self.after_id)
+            self.after_id = None
+
+        self.executor.close()
+
+        if self.watch_id is not None:
+            get_watcher().unwatch(self.watch_id)
+            self.watch_id = None
+    # end on_destroy
+
+
     def get_config_element(self, key:str) -> str:
         """ Get a config value out of the dict.
             If it is one of the lists, then
@@ -228,7 +379,7 @@ class ListWidget():
             cmd= [fm, self.root_path]
             # open in a subprocess, but do not wait for it!
             with subprocess.Popen(cmd) as pop:
-                print('child started:', pop)
+                log.debug('child started: %s', pop)
     # end file_manager
 
 
@@ -242,18 +393,22 @@ class ListWidget():
             If it is a data folder, we need to list the YAML
             files in there.
         """
-        indx = self.listbox.curselection()
-        if not indx:
-            print('Nothing was selected')
+        item = self.listbox.get_selected()
+        if item is None:
+            log.debug('nothing was selected')
             return
 
-        item = self.listbox.get(indx)
-
         # turn it to a full path:
         full_path = os.path.join(
                 self.root_path,
                 item)
 
+        # search hits are records somewhere below
+        if self.searching:
+            if os.path.isfile(full_path):
+                self.edit_form(full_path, record_level(self.config))
+            return
+
         # a file we open with the default editor
         if os.path.isfile(full_path):
             use_form = self.get_config_element('use form')
@@ -278,71 +433,85 @@ class ListWidget():
     # end activate item
 
 
-    def get_dirlist(self, ignore:list) -> None:
-        """ get a list of directories in the root_path
-            Use self.root_path for the path,
-            but drop those words in ignore.
-            Fill upt the self.content_list list.
-
-            @param ignore   list, list of names to ignore
+    def show_info(self, item:str|None= None) -> None:
+        """ show the template, user, creation date and the uploads of
+            the selected record, taken from the folder index, so only
+            the records changed since are read
 
-            @return None    fill up the self.content_list
+            parameters:
+            item:   the selected item, None for the current selection
         """
-        if not os.path.isdir(self.root_path):
-            self.content_list = []
-            print('Folder does not exist', self.root_path)
+        if item is None:
+            item = self.listbox.get_selected()
+
+        full_path = os.path.join(self.root_path, item) if item else ''
+        if not os.path.isfile(full_path):
+            self.info.config(text= '')
             return
 
+        level = record_level(self.config) if self.searching else self.level
 
-        self.content_list = [i.name for i in os.scandir(self.root_path) \
-            if i.is_dir() and i not in ignore]
+        def show(info:dict|None) -> None:
+            # another item may be selected meanwhile
+            if self.listbox.get_selected() == item:
+                self.info.config(text= _info_text(info))
 
-        self.content_list.sort()
-    # end get_dirlist
+        self.executor.submit(_record_info, full_path, level, on_done= show)
+    # end show_info
 
 
-    def get_filelist(self, pattern:str, ignore:list) -> None:
-        """ list up files in a folder based on a simple pattern,
-            e.g. .yaml for all files ending with .yaml.
-            If pattern starts with ., then use end of, else
-            use starts with.
+    def get_folder_content(self, on_chunk= None) -> list:
+        """ list the content of self.root_path, using the index
+            if it is available, so unchanged folders are not listed
+            again
 
-            Drop files which names are in ignore list.
+            parameters:
+            on_chunk:   function(list of (name, is_dir)) getting
+                        parts of the content while it is listed
+
+            return:
+            a list of (name, is_dir) tuples
+        """
+        index = get_record_index()
+        if index is not None:
+            return index.folder(self.root_path, on_chunk= on_chunk)
+
+        with span('scan'):
+            content = [(i.name, i.is_dir())
+                       for i in os.scandir(self.root_path)]
+        if on_chunk is not None:
+            on_chunk(content)
+        return content
+    # end get_folder_content
 
-            Parameters
-            pattern     string  files to search for
-            ignore      list    files to be ignored
+
+    def get_content_list(self, on_chunk= None) -> list:
+        """ list the folders or the files of self.root_path to be shown
+            at this level: the searchTargets, searchPattern and ignore
+            settings are applied by the same filter rdm_tree.list_level
+            uses. It runs in a worker thread, do not touch the widgets.
+
+            parameters:
+            on_chunk:   function(list of names) getting the items
+                        found so far while listing
 
             return:
-            None    fill up self.content_list
+            the sorted list of names
         """
-        self.content_list = []
         if not os.path.isdir(self.root_path):
-            print('Folder does not exist', self.root_path)
-            return
+            log.warning('folder does not exist: %s', self.root_path)
+            return []
 
-        if pattern and pattern[-1] == '$':
-            pattern = pattern[:-1]
-            use_start = False
-        else:
-            use_start= True
-        print('search for pattern:', pattern)
-
-        # do the compact list handling way:
-        if use_start:
-            self.content_list = [i.name\
-                    for i in os.scandir(self.root_path)\
-                    if i.name.startswith(pattern)\
-                    and i.name not in ignore]
-        else:
-            self.content_list = [i.name\
-                    for i in os.scandir(self.root_path)\
-                    if i.name.endswith(pattern)\
-                    and i.name not in ignore]
+        accept = level_filter(self.config, self.level).accept
+        content = self.get_folder_content(
+            None if on_chunk is None else
+            lambda chunk: on_chunk([i for i,j in chunk if accept(i, j)]))
+        content_list = [name for name, is_dir in content\
+                if accept(name, is_dir)]
 
-        if self.content_list:
-            self.content_list.sort()
-    # end get_filelist
+        content_list.sort()
+        return content_list
+    # end get_content_list
 
 
     def make_listbox(self,
@@ -356,12 +525,15 @@ class ListWidget():
             return: None
         """
         # next is the actual directory content (sub directories)
-        # listbox with single selection
-        self.listbox = tk.Listbox(parent, selectmode= tk.BROWSE)
-        # we define the content filling up the frame with a narrow
-        # scroll-bar on the right
+        # listbox with single selection, showing only the visible
+        # part of long lists, with its own scroll-bar on the right
+        self.listbox = VirtualList(
+                parent,
+                on_filter= lambda text: self.status.config(
+                    text= f'filter: {text}' if text else ''),
+                on_select= self.show_info
+                )
         parent.columnconfigure(0, weight=10)
-        parent.columnconfigure(1, weight=1)
         parent.rowconfigure(0, weight=10)
         self.listbox.grid(
                 column=0,
@@ -373,18 +545,6 @@ class ListWidget():
                 sticky='swne'
                 )
 
-        # make it scrollable:
-        self.scrollbar= tk.Scrollbar(
-                parent,
-                bg='grey',
-                orient='vertical',
-                command= self.listbox.yview,
-                takefocus= True
-                )
-        # we just make it sticky on top-bottom to expand the list box
-        self.scrollbar.grid(column=1, row= 0, sticky='ns')
-        self.listbox.config(yscrollcommand= self.scrollbar.set)
-
         self.listbox_fill()
         self.listbox.bind(
                 '<Double-Button-1>',
@@ -397,37 +557,148 @@ class ListWidget():
 
 
     def listbox_fill(self) -> None:
-        """ refresh the listbox content from self.content_list
+        """ list the folder in the background, showing the items
+            as they are found, then refresh the listbox content
+            from self.content_list
         """
-        if not self.listbox:
-            print('Listbox is not defined!')
+        if self.listbox is None:
+            log.warning('the listbox is not defined')
             return
 
+        log.debug('at level: %d', self.level)
+        self.searching = False
+        self.scan_id += 1
+        this_scan = self.scan_id
+
         # clear the content
-        print('at level:', self.level)
-        self.listbox.delete('0', 'end')
+        self.listbox.clear()
 
-        # first define what to ignore
-        ignore= self.config['ignore'] if 'ignore' in self.config else []
+        def add(names:list) -> None:
+            """ show what was found so far
+            """
+            if this_scan == self.scan_id and not self.searching:
+                self.listbox.add(names)
 
-        # load / reload folder content
-        if self.target == 'dir':
-            print('listing directories')
-            self.get_dirlist(ignore)
-        else:
-            print('listing files')
-            # search pattern should matter only for searching for files
-            pattern = self.get_config_element(
-                'searchPattern'
-                )
-            self.get_filelist(pattern, ignore)
+        def fill(content_list:list) -> None:
+            """ put the result into the listbox
+            """
+            # a newer listing or a search came meanwhile
+            if this_scan != self.scan_id or self.searching:
+                return
+
+            self.content_list = content_list
+            self.listbox.set_items(self.content_list)
+        # end fill
 
-        # fill up the content (folder names)
-        for i,j in enumerate(self.content_list):
-            self.listbox.insert(i, j)
+        self.executor.submit(self.load_content,
+                             lambda names: self.executor.call(add, names),
+                             on_done= fill)
     # end listbox_fill
 
 
+    def listbox_update(self) -> None:
+        """ list the folder again, and delete or insert only the
+            rows which changed, keeping the selection and the
+            position of the list
+        """
+        # search hits are not the folder content
+        if self.searching:
+            return
+
+        self.scan_id += 1
+        this_scan = self.scan_id
+
+        def update(content_list:list) -> None:
+            """ apply the difference to the listbox
+            """
+            if this_scan != self.scan_id or self.searching:
+                return
+
+            old_set = set(self.content_list)
+            new_set = set(content_list)
+            self.content_list = content_list
+
+            for i in old_set - new_set:
+                self.listbox.remove(i)
+
+            # the list keeps its order
+            self.listbox.add([i for i in content_list if i not in old_set])
+        # end update
+
+        self.executor.submit(self.load_content, on_done= update)
+    # end listbox_update
+
+
+    def load_content(self, on_chunk= None) -> list:
+        """ list the folder based on the configuration
+            It runs in a worker thread, do not touch the widgets.
+
+            parameters:
+            on_chunk:   function(list of names) getting the items
+                        found so far while listing
+
+            return:
+            the sorted list of names to show
+        """
+        log.debug('listing %s', 'directories' if self.target == 'dir'
+                                 else 'files')
+        return self.get_content_list(on_chunk)
+    # end load_content
+
+
+    def search(self, event= None) -> str:
+        """ search the records under the current folder with the
+            text of the search box, and list the hits in the listbox.
+            An empty search lists the folder content again.
+            For the query format see rdm_search.
+
+            return:
+            'break' to stop the <Return> event reaching the window
+        """
+        query = self.search_text.get().strip()
+        if not query:
+            self.listbox_fill()
+            return 'break'
+
+        index = get_search_index()
+        if index is None:
+            return 'break'
+
+        def run_search() -> list:
+            """ update the index and search, in a worker thread
+            """
+            # only the changed records are read again
+            record_index = get_record_index()
+            index.update(self.config,
+                         self.root_path,
+                         lister= record_index.listing if record_index else None)
+
+            return index.search(query, under= self.root_path)
+        # end run_search
+
+        self.scan_id += 1
+        this_scan = self.scan_id
+
+        def show_hits(hits:list) -> None:
+            """ list the hits
+            """
+            if this_scan != self.scan_id:
+                return
+
+            self.content_list = [os.path.relpath(i, self.root_path) for i in hits]
+            self.listbox.set_items(self.content_list)
+            self.searching = True
+        # end show_hits
+
+        self.executor.submit(run_search,
+                             on_done= show_hits,
+                             on_error= lambda e: log.warning('invalid search: %s',
+                                                             e))
+
+        return 'break'
+    # end search
+
+
     def make_readme(self, default_template:str, new_path:str) -> None:
         """ Create the readme file in a new folder
             based on information provided.
@@ -505,20 +776,24 @@ class ListWidget():
         # this is a generic reader, that takes care of
         # merging templates and data, etc...
         # returns an empty dict on any problem
-        print('Default template:', default_template)
-        template_dict = read_record(None, default_template, fn)
-        if not template_dict:
-            print('Empty template / or no template')
+        log.debug('default template: %s', default_template)
+        try:
+            template_dict = read_record(None, default_template, fn)
+            if not template_dict:
+                log.warning('empty template or no template: %s', fn)
+                return False
+
+            form = FormBuilder(
+                    title= f'Form of {label}',
+                    root_path= self.root_path,
+                    parent= self.window.window,
+                    template= template_dict,
+                    config= self.config,
+                    schema= get_schema(fn, default_template))
+        except TemplateError as e:
+            self.show_template_error(e)
             return False
 
-
-        form = FormBuilder(
-                title= f'Form of {label}',
-                root_path= self.root_path,
-                parent= self.window.window,
-                template= template_dict,
-                config= self.config)
-
         # we have to get stuck here until it comes back
         # form.window.mainloop()
         self.window.withdraw()
@@ -528,15 +803,15 @@ class ListWidget():
         if form.result:
             full_record= ('full record' in self.config and self.config['full record'])
 
-            print('saving file to', new_path, end=' ')
             res= save_record(form.result,
                              new_path,
                              overwrite= False,
-                             full_record= full_record)
+                             full_record= full_record,
+                             fsync= self.config.get('fsync'))
             if res:
-                print('...done')
+                log.info('saved %s', new_path)
             else:
-                print('...failed')
+                log.warning('cannot save %s', new_path)
 
             return res
 
@@ -545,43 +820,94 @@ class ListWidget():
     # end run_form
 
 
-    def edit_form(self, full_path:str) ->None:
+    def edit_form(self, full_path:str, level:int|None= None) ->None:
         """ take a yaml file, and try turning it back to
             a form. Display this form then.
 
             parameters
             full_path:  path to the yaml file
+            level:      the level of the record in the tree,
+                        default is the level of this list
 
             return:
             nothing
         """
+        if level is None:
+            level = self.level
+
         # the path was checked before the call...
-        default_template = self.get_config_element(
-            'defaultTemplate'
-            )
+        default_template = config_element(self.config,
+                                          'defaultTemplate',
+                                          level)
 
-        template_dir = self.get_config_element('templateDir')
+        template_dir = config_element(self.config, 'templateDir', level)
 
         # this should get a full record or an empty template
-        form_data = read_record(full_path,
-                                os.path.join(template_dir,
-                                            default_template),
-                                template_dir)
+        # reading may be slow on network drives
+        self.executor.submit(_read_form,
+                             full_path,
+                             os.path.join(template_dir,
+                                          default_template),
+                             template_dir,
+                             level,
+                             on_done= lambda res:
+                                self.open_form(full_path, level, *res),
+                             on_error= self.show_template_error
+                             )
+    # end edit_form
+
+
+    def show_template_error(self, error:Exception) -> None:
+        """ tell the user why a form cannot be shown
+        """
+        if isinstance(error, TemplateError):
+            message = '\n'.join(error.problems)
+            title = f'Invalid template {error.name}'
+        else:
+            message = str(error)
+            title = 'Cannot open the record'
+
+        showerror(master= self.window.window, title= title, message= message)
+    # end show_template_error
+
+
+    def open_form(self,
+                  full_path:str,
+                  level:int,
+                  form_data:dict,
+                  schema= None,
+                  info:dict|None= None) -> None:
+        """ show the form of a record read by edit_form,
+            and save the result
+
+            parameters
+            full_path:  path to the yaml file
+            level:      the level of the record in the tree
+            form_data:  the record merged with its templates
+            schema:     the compiled template, compiled from
+                        form_data if None
+            info:       the indexed information of the record,
+                        shown in the list window
+        """
+        self.info.config(text= _info_text(info))
 
         if not form_data:
-            print('template not found, calling editor')
+            log.info('template not found, calling editor')
             self.open_editor(full_path)
             return
 
-        label = self.get_config_element(
-            'searchNames'
-            )
-        form = FormBuilder(
-            title= f'Form of {label}',
-            root_path= self.root_path,
-            parent= self.window.window,
-            template= form_data,
-            config= self.config)
+        label = config_element(self.config, 'searchNames', level)
+        try:
+            form = FormBuilder(
+                title= f'Form of {label}',
+                root_path= os.path.dirname(full_path),
+                parent= self.window.window,
+                template= form_data,
+                config= self.config,
+                schema= schema)
+        except TemplateError as e:
+            self.show_template_error(e)
+            return
 
         # we have to get stuck here until it comes back
         # form.window.mainloop()
@@ -594,7 +920,7 @@ class ListWidget():
             # here we do not have to refresh
             # the file list, so the return value
             # does not matter
-            print('overwriting file:', full_path)
+            log.info('overwriting file: %s', full_path)
             #full_record = (('full record' in form.result
             #               and form.result['full record'])
             #               or ('full record' in self.config
@@ -604,12 +930,18 @@ class ListWidget():
             # But inside we do use one...
             full_record = ('full record' in self.config
                                and self.config['full record'])
-            save_record(form.result,
-                        full_path,
-                        overwrite= True,
-                        full_record= full_record)
+            if not save_record(form.result,
+                               full_path,
+                               overwrite= True,
+                               full_record= full_record,
+                               fsync= self.config.get('fsync')):
+                showerror(master= self.window.window,
+                          title= 'Cannot save the record',
+                          message= f'{full_path} is left unchanged')
+            else:
+                self.show_info()
 
-    #end edit_form
+    # end open_form
 
 
     def edit_config(self):
@@ -619,18 +951,18 @@ class ListWidget():
             """
         # create a temporary file, and dump the config into it
         fp = NamedTemporaryFile('wt', delete= False, encoding= 'UTF-8')
-        yaml.dump(self.config, fp)
+        safe_dump(self.config, fp)
         fname = fp.name
         fp.close()
 
         # now, call an editor on it
-        print('Temp config file to edit', fname)
+        log.debug('temporary config file to edit: %s', fname)
         self.open_editor(fname)
         # after done:
         with open(fname,
                   'rt',
                   encoding= 'UTF-8') as fp:
-           this_config= yaml.safe_load(fp)
+           this_config= safe_load(fp)
 
         os.unlink(fname)
         # end loading back
@@ -651,7 +983,7 @@ class ListWidget():
         ed = self.get_config_element('editor')
         if ed:
             cmd = ed.split(' ')
-            print('calling editor as:', cmd + [full_path])
+            log.debug('calling editor as: %s', cmd + [full_path])
             subprocess.call(ed.split(' ') + [full_path])
     # end open_editor
 
@@ -677,7 +1009,7 @@ class ListWidget():
         if not new_name:
             return
 
-        print('creating', new_name)
+        log.info('creating %s', new_name)
 
         template_dir = self.get_config_element('templateDir')
 
@@ -700,7 +1032,7 @@ class ListWidget():
         if self.target == 'dir':
             # do no work if it were in vain:
             if os.path.isdir(new_path):
-                print('folder already exists!')
+                log.info('folder already exists: %s', new_path)
                 return
 
             # this is the subfolder structure:
@@ -712,7 +1044,7 @@ class ListWidget():
                 template_file = os.path.join(template_dir,
                                          template_file)
 
-            print('template file:', template_file)
+            log.debug('template file: %s', template_file)
 
             make_dir(
                     new_path,
@@ -725,7 +1057,7 @@ class ListWidget():
 
         else:
             if os.path.isfile(new_path):
-                print('file already exists!')
+                log.info('file already exists: %s', new_path)
                 return
 
         # now, update the list. If nothing changed, just go back.
@@ -745,13 +1077,12 @@ class ListWidget():
         if not self.target == 'file':
              return
 
-        indx = self.listbox.curselection()
-        if not indx:
-            print('Nothing was selected')
+        # get what is selected:
+        item = self.listbox.get_selected()
+        if item is None:
+            log.debug('nothing was selected')
             return
 
-        # get what is selected:
-        item = self.listbox.get(indx)
         if not item.endswith('yaml'):
             item = f'{item}.yaml'
         # turn it to a full path:
@@ -11,7 +11,11 @@
 import os
 import sys
 import time
-import yaml
+
+from rdm_modules.rdm_trace import get_logger
+from rdm_modules.rdm_yaml import (safe_dump, safe_load)
+
+log = get_logger('config')
 
 
 def get_config_dir() -> str:
@@ -65,7 +69,7 @@ def get_default_config() -> dict:
                          'default_configuration')
     if os.path.isfile(template_path):
         with open(template_path, 'rt', encoding='UTF-8') as fp:
-            custom_config= yaml.safe_load(fp)
+            custom_config= safe_load(fp)
 
     # projects_dir = os.path.join(home_dir, 'Projects')
 
@@ -174,21 +178,21 @@ def get_config() -> dict:
     config_path = os.path.join(config_dir, 'config.yaml')
 
     if not os.path.isfile(config_path):
-        print('Configuration not found')
+        log.info('configuration not found')
         conf = get_default_config()
         if ('save config' in conf
             and conf['save config']):
-            print('Saving default configuration')
+            log.info('saving the default configuration')
             save_config(conf)
         else:
-            print('configuration is not saved')
+            log.info('the configuration is not saved')
 
         return conf
 
     with open(config_path,
               'rt',
               encoding='utf8') as fp:
-        conf = yaml.safe_load(fp)
+        conf = safe_load(fp)
     # we got a config
 
     # get the default and check out what is missing
@@ -239,7 +243,7 @@ def save_config(config: dict) -> None:
     with open(os.path.join(config_dir, 'config.yaml'),
                    'wt',
                    encoding='utf8') as fp:
-        yaml.dump(config, fp)
+        safe_dump(config, fp)
 # end save_config
 
 
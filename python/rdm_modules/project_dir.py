@@ -10,59 +10,90 @@
 
 import os
 import sys
-__all__ = ['make_dir']
+
+from rdm_modules.rdm_trace import get_logger
+
+__all__ = ['make_dir', 'read_folder_list', 'missing_folders']
+
+log = get_logger('project_dir')
 
 list_file = '../../templates/folder.txt'
 
-def make_dir(folder_name:str, list_file_path:str) -> None:
+
+def read_folder_list(list_file_path:str) -> list:
+    """ Read the subfolders from a folder list template.
+        Every line is a relative folder path, lines starting
+        with # are comments, empty lines are skipped.
+
+        Parameters:
+        list_file_path  string  the folder list file
+
+        return
+            a list of relative paths, empty if the file is not found
+    """
+    if not list_file_path or not os.path.isfile(list_file_path):
+        return []
+
+    with open(list_file_path, 'rt', encoding='utf-8') as fp:
+        lines = [i.strip() for i in fp]
+
+    return [i for i in lines if i and not i.startswith('#')]
+# end read_folder_list
+
+
+def missing_folders(folder_name:str, list_file_path:str) -> list:
+    """ The folders make_dir would create: the main folder and
+        the subfolders of the list which do not exist yet.
+
+        Parameters:
+        folder_name     string  name of the project root folder
+        list_file_path  string  the folder list file
+
+        return
+            a list of absolute paths, parents before their children
+    """
+    folder_name = os.path.abspath(
+            os.path.expanduser(folder_name)
+            )
+    paths = [folder_name]
+    paths += [os.path.join(folder_name, i)
+              for i in read_folder_list(list_file_path)]
+
+    res = []
+    for i in paths:
+        i = os.path.normpath(i)
+        if i not in res and not os.path.isdir(i):
+            res.append(i)
+
+    return res
+# end missing_folders
+
+
+def make_dir(folder_name:str, list_file_path:str) -> list:
     """ Create a folder directory and all its subdirectories
         based on a list of folder names from list_file_path.
+        Existing folders are left as they are.
 
         Parameters:
         folder_name     string  name of the new project root folder
         list_file_path  string  a file where the subfolders are
                                 listed.
         return
-            None
+            the list of folders created
     """
-    folder_name = os.path.abspath(
-            os.path.expanduser(folder_name)
-            )
+    if list_file_path and not os.path.exists(list_file_path):
+        log.warning('folder list not found: %s', list_file_path)
+
+    created = missing_folders(folder_name, list_file_path)
 
-    # create the main directory
     # use 'brute force', thus make all intermediates in the path,
     # and do nothing if it exists
-    os.makedirs(folder_name, exist_ok= True)
-
-    if os.path.isfile(list_file_path):
-        print('found template file', list_file_path)
-        with open(list_file_path, 'rt', encoding='utf-8') as fp:
-            txt_list = fp.readlines()
-
-        if txt_list:
-            print('Read:', len(txt_list),'lines')
-            # each line should be a folder name
-            # or starts with #, meaning comment
-
-            # count what we create:
-            i = 1
-            for line in txt_list:
-                # readlines leaves the end newline character
-                # so cut it off:
-                line = line[:-1]
-                if line.startswith('#'):
-                    print(line)
-                    continue
-                # make the dirs
-                fn = os.path.join(folder_name, line)
-                print('creating folder:', fn)
-                os.makedirs(fn, exist_ok= True)
-                i += 1
-            print('Created', i, 'folders')
-        else:
-            print('Template not found!')
-    # all is done
-# end make_project
+    for fn in created:
+        os.makedirs(fn, exist_ok= True)
+
+    log.info('created %d folders in %s', len(created), folder_name)
+    return created
+# end make_dir
 
 if __name__ == '__main__':
     main_folder= './'
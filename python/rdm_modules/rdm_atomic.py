@@ -0,0 +1,317 @@
+#!/usr/bin/env python
+""" Atomic writing of records.
+
+    A record is never written in place: the new content goes into
+    a temporary file in the same folder, which then replaces the
+    record by os.replace(). A crash, a full disk or a broken network
+    drive leaves either the old or the new record, never a truncated
+    one. Stale temporary files (.<name>.<pid>.<thread>.tmp) of a
+    crash are hidden and not YAML, so the lists ignore them.
+
+    How much is forced onto the disk is set by fsync_policy:
+    'none':     leave it to the system
+    'file':     fsync the temporary file before replacing the record
+    'dir':      also fsync the folder, so the replacement itself
+                survives a power loss
+
+    Bulk rewrites (e.g. adding 'Uploaded' to every record of a batch
+    upload) can go through a WriteBehind queue instead, which writes
+    in a background thread, in batches, and syncs every folder only
+    once per batch.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import os
+import threading
+
+from rdm_modules.rdm_trace import (get_logger, span)
+
+__all__ = ['fsync_policy', 'atomic_write', 'fsync_dir', 'WriteBehind']
+
+log = get_logger('atomic')
+
+fsync_policy = 'file'
+_policies = ('none', 'file', 'dir')
+
+
+def _check_policy(fsync:str|None) -> str:
+    """ the fsync policy to use, fsync_policy if None or unknown
+        (e.g. a typo in the configuration)
+    """
+    if fsync is None:
+        return fsync_policy
+    if fsync not in _policies:
+        log.warning('unknown fsync policy: %s, using %s',
+                    fsync, fsync_policy)
+        return fsync_policy
+    return fsync
+# end _check_policy
+
+
+def _temp_path(file_path:str) -> str:
+    """ a hidden temporary file next to file_path, unique for the
+        process and thread writing it
+    """
+    fpath, fname = os.path.split(file_path)
+    return os.path.join(fpath,
+                        f'.{fname}.{os.getpid()}.{threading.get_ident()}.tmp')
+# end _temp_path
+
+
+def _write_temp(file_path:str, data:bytes, sync:bool) -> str:
+    """ write data into a temporary file for file_path, keeping the
+        permissions of an existing file_path
+
+        return:
+        the path of the temporary file
+    """
+    tmp_path = _temp_path(file_path)
+    # created with the umask of the user as open() would do
+    fd = os.open(tmp_path,
+                 os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+                 | getattr(os, 'O_BINARY', 0),
+                 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+            fp.flush()
+            if sync:
+                os.fsync(fp.fileno())
+
+        if os.path.isfile(file_path):
+            os.chmod(tmp_path, os.stat(file_path).st_mode & 0o7777)
+
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    return tmp_path
+# end _write_temp
+
+
+def _replace(tmp_path:str, file_path:str) -> None:
+    """ move the temporary file over file_path, removing it on failure
+    """
+    try:
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+# end _replace
+
+
+def fsync_dir(path:str) -> None:
+    """ make the entries of a folder (e.g. a replaced file) durable;
+        nothing to do on Windows, where folders cannot be opened
+
+        parameters:
+        path:   the folder
+    """
+    if os.name == 'nt':
+        return
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    except OSError as e:
+        # some network file systems do not support it
+        log.debug('cannot fsync %s: %s', path, e)
+    finally:
+        os.close(fd)
+# end fsync_dir
+
+
+def atomic_write(file_path:str, text:str|bytes, fsync:str|None= None) -> None:
+    """ replace file_path with text in one step
+
+        parameters:
+        file_path:  the file to write
+        text:       the new content, str is written as UTF-8
+        fsync:      'none', 'file' or 'dir', None for fsync_policy
+
+        raise:
+        OSError if the file cannot be written, the original file is
+        left unchanged then
+    """
+    fsync = _check_policy(fsync)
+    data = text.encode('UTF-8') if isinstance(text, str) else text
+
+    with span('write', path= file_path):
+        tmp_path = _write_temp(file_path, data, fsync != 'none')
+        _replace(tmp_path, file_path)
+        if fsync == 'dir':
+            fsync_dir(os.path.dirname(os.path.abspath(file_path)))
+# end atomic_write
+
+
+class WriteBehind():
+    """ a queue of file writes done in a background thread
+
+        The writes are collected into batches: all files of a batch are
+        written into their temporary files first, replaced, then every
+        folder is synced once (fsync policy 'dir'). A file queued again
+        before it was written is written only once, with the latest
+        content.
+
+        Use it as a context manager, or call close() at the end, which
+        waits for all writes:
+
+            with WriteBehind() as writer:
+                save_record(record, path, writer= writer)
+            writer.errors   # path: the exception of failed writes
+    """
+
+    def __init__(self, fsync:str|None= None, batch_size:int= 64) -> None:
+        """ parameters:
+            fsync:      'none', 'file' or 'dir', None for fsync_policy
+            batch_size: the most files written before syncing the
+                        folders
+        """
+        self.fsync = _check_policy(fsync)
+        self.batch_size = max(batch_size, 1)
+        # path: (bytes, callbacks or None), in the order queued
+        self.pending = {}
+        self.errors = {}
+        self.written = 0
+        self.batches = 0
+
+        self.cond = threading.Condition()
+        self.busy = False
+        self.closed = False
+        self.thread = threading.Thread(target= self._run,
+                                       name= 'rdm write-behind',
+                                       daemon= True)
+        self.thread.start()
+    # end __init__
+
+
+    def write(self, file_path:str, text:str|bytes, done= None) -> None:
+        """ queue a file to be written
+
+            parameters:
+            file_path:  the file to write
+            text:       the new content, str is written as UTF-8
+            done:       function(file_path, error) called in the writer
+                        thread once the file is on the disk, error is
+                        None or the exception of a failed write
+        """
+        data = text.encode('UTF-8') if isinstance(text, str) else text
+        with self.cond:
+            if self.closed:
+                raise RuntimeError('the write-behind queue is closed')
+
+            old = self.pending.pop(file_path, None)
+            if old is not None and old[1] is not None:
+                # the earlier content will never be written alone,
+                # but its caller is notified with the new one
+                callbacks = old[1] + ([done] if done else [])
+            else:
+                callbacks = [done] if done else None
+            self.pending[file_path] = (data, callbacks)
+            self.cond.notify_all()
+    # end write
+
+
+    def flush(self) -> None:
+        """ wait until everything queued so far is written
+        """
+        with self.cond:
+            while self.pending or self.busy:
+                self.cond.wait()
+    # end flush
+
+
+    def close(self) -> None:
+        """ write what is left and stop the thread
+        """
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
+    # end close
+
+
+    def __enter__(self) -> 'WriteBehind':
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+    def _run(self) -> None:
+        """ the writer thread
+        """
+        while True:
+            with self.cond:
+                while not self.pending and not self.closed:
+                    self.cond.wait()
+
+                if not self.pending:
+                    return
+
+                batch = []
+                for file_path in list(self.pending)[:self.batch_size]:
+                    batch.append((file_path, *self.pending.pop(file_path)))
+                self.busy = True
+
+            try:
+                self._write_batch(batch)
+            finally:
+                with self.cond:
+                    self.busy = False
+                    self.cond.notify_all()
+    # end _run
+
+
+    def _write_batch(self, batch:list) -> None:
+        """ write the files of a batch, sync their folders once
+        """
+        # pylint: disable=broad-exception-caught
+        results = []
+        folders = set()
+        with span('write', files= len(batch)):
+            for file_path, data, callbacks in batch:
+                try:
+                    tmp_path = _write_temp(file_path, data,
+                                           self.fsync != 'none')
+                    _replace(tmp_path, file_path)
+                    folders.add(os.path.dirname(os.path.abspath(file_path)))
+                    results.append((file_path, callbacks, None))
+                except Exception as e:
+                    log.error('cannot write %s: %s', file_path, e)
+                    results.append((file_path, callbacks, e))
+
+            if self.fsync == 'dir':
+                for folder in folders:
+                    try:
+                        fsync_dir(folder)
+                    except OSError as e:
+                        log.warning('cannot sync %s: %s', folder, e)
+
+        for file_path, callbacks, error in results:
+            if error is None:
+                self.written += 1
+                self.errors.pop(file_path, None)
+            else:
+                self.errors[file_path] = error
+
+            for done in callbacks or []:
+                try:
+                    done(file_path, error)
+                except Exception:
+                    log.exception('write-behind callback of %s failed',
+                                  file_path)
+        self.batches += 1
+    # end _write_batch
+# end of class WriteBehind
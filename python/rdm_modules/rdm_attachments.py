@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+""" A content addressed index of uploaded attachments.
+    Calibration and reference files are often linked from many records,
+    and uploading them again for every record is a waste. The index maps
+    the SHA-256 hash of the file content to the upload already on the
+    server, so the uploader can link to it instead of sending the same
+    bytes again.
+
+    The index also remembers the hash of local files by their path,
+    modification time and size, so unchanged files are not hashed again.
+
+    Both are kept in attachment_index.jsonl in the configuration folder,
+    as an append-only list of JSON lines. Lines replaced by a later one
+    (a file hashed again, an upload registered again) are dropped when
+    the index is loaded, so the file does not grow without bound.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import json
+import os
+import threading
+
+from rdm_modules.project_config import get_config_dir
+from rdm_modules.rdm_atomic import atomic_write
+from rdm_modules.rdm_journal import file_sha256
+from rdm_modules.rdm_trace import get_logger
+
+__all__ = ['AttachmentIndex', 'get_attachment_index']
+
+log = get_logger('attachments')
+
+index_name = 'attachment_index.jsonl'
+
+
+class AttachmentIndex():
+    """ uploads by (server, hash) and file hashes by (path, mtime, size)
+    """
+
+    def __init__(self, path:str) -> None:
+        """ load the index file if it exists
+
+            parameters:
+            path:   the index file
+        """
+        self.path = path
+        self.uploads = {}
+        self.hashes = {}
+        self._lock = threading.Lock()
+
+        if not os.path.isfile(path):
+            return
+
+        lines = 0
+        with open(path, 'rt', encoding='UTF-8') as fp:
+            for line in fp:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+
+                if entry.get('kind') == 'upload':
+                    self.uploads[(entry['server'], entry['sha256'])] = entry
+                elif entry.get('kind') == 'hash':
+                    self.hashes[entry['path']] = entry
+
+        if lines > len(self.uploads) + len(self.hashes):
+            self._compact()
+    # end __init__
+
+
+    def _compact(self) -> None:
+        """ rewrite the file with the current entries only, dropping
+            the replaced and broken lines
+        """
+        text = ''.join(json.dumps(i, ensure_ascii= False) + '\n'
+                       for i in list(self.hashes.values())
+                                + list(self.uploads.values()))
+        # lines another program appends meanwhile are lost, but
+        # those are only hashes or links to find again
+        try:
+            atomic_write(self.path, text)
+        except OSError as e:
+            log.warning('cannot compact %s: %s', self.path, e)
+    # end _compact
+
+
+    def _append(self, entry:dict) -> None:
+        """ write an entry to the end of the file
+        """
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder, exist_ok= True)
+
+        with open(self.path, 'at', encoding='UTF-8') as fp:
+            fp.write(json.dumps(entry, ensure_ascii= False) + '\n')
+    # end _append
+
+
+    def sha256(self, file_path:str) -> str:
+        """ the hash of a file, calculated only if the file changed
+            since it was hashed the last time
+
+            parameters:
+            file_path:  the file
+
+            return:
+            the SHA-256 hex digest
+        """
+        file_path = os.path.abspath(file_path)
+        st = os.stat(file_path)
+
+        with self._lock:
+            entry = self.hashes.get(file_path)
+        if (entry and entry['mtime'] == st.st_mtime_ns
+            and entry['size'] == st.st_size):
+            return entry['sha256']
+
+        entry = {'kind': 'hash',
+                 'path': file_path,
+                 'mtime': st.st_mtime_ns,
+                 'size': st.st_size,
+                 'sha256': file_sha256(file_path)}
+        with self._lock:
+            self.hashes[file_path] = entry
+            self._append(entry)
+
+        return entry['sha256']
+    # end sha256
+
+
+    def find(self, server:str, sha256:str) -> dict|None:
+        """ look up an upload of the same content on the server
+
+            return:
+            a dict with 'link' (of the upload), 'experiment' (link of
+            the experiment), 'name' and 'size', or None
+        """
+        with self._lock:
+            return self.uploads.get((server, sha256))
+    # end find
+
+
+    def add(self,
+            server:str,
+            sha256:str,
+            size:int,
+            link:str,
+            experiment:str,
+            name:str) -> None:
+        """ register an upload
+
+            parameters:
+            server:     the server link
+            sha256:     hash of the file content
+            size:       size of the file in bytes
+            link:       link of the upload on the server
+            experiment: link of the experiment it belongs to
+            name:       the file name
+        """
+        entry = {'kind': 'upload',
+                 'server': server,
+                 'sha256': sha256,
+                 'size': size,
+                 'link': link,
+                 'id': link.rsplit('/', 1)[-1],
+                 'experiment': experiment,
+                 'name': name}
+        with self._lock:
+            # uploaded again as it was: nothing new to write
+            if self.uploads.get((server, sha256)) == entry:
+                return
+            self.uploads[(server, sha256)] = entry
+            self._append(entry)
+    # end add
+# end of class AttachmentIndex
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_attachment_index() -> AttachmentIndex:
+    """ the attachment index of the user, loaded at the first call
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = AttachmentIndex(os.path.join(get_config_dir(),
+                                                  index_name))
+    return _index
+# end get_attachment_index
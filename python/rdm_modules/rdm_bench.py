@@ -0,0 +1,621 @@
+#!/usr/bin/env python
+""" Benchmarks of the record pipeline and of browsing the project tree,
+    running without a display and without a network.
+
+    A synthetic project tree is generated in a folder: projects with
+    their Data folders, samples, experiment records of a template with
+    subsets nested to a given depth, and attachment files next to the
+    records. Then the functions used when opening, saving and uploading
+    records are timed on it one by one, as well as listing the tree the
+    way the ListWidget does (directly and through the record index).
+
+    The results are a dict which can be saved as JSON, and compared to
+    the results of an earlier run, e.g. before a change.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import contextlib
+import copy
+import datetime
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import time
+
+from rdm_modules.rdm_cache import template_cache
+from rdm_modules.rdm_converters import convert_record_to_JSON
+from rdm_modules.rdm_index import RecordIndex
+from rdm_modules.rdm_templates import (clear_schema_cache,
+                                       combine_template_data, list_to_dict,
+                                       merge_templates, patch_record,
+                                       read_record, save_record)
+from rdm_modules.rdm_tree import (iter_records, list_level)
+from rdm_modules.rdm_yaml import (LIBYAML, safe_dump)
+
+# the uploader needs requests, the other benchmarks run without it
+try:
+    from rdm_modules.uploaders.ElabFTW import body_meta_from_record
+except ImportError:
+    body_meta_from_record = None
+
+__all__ = ['default_params', 'bench_config', 'make_template', 'make_record',
+           'make_tree', 'time_call', 'run_benchmarks',
+           'run_upload_benchmark', 'compare',
+           'format_results', 'format_comparison', 'save_results',
+           'load_results']
+
+# the size of the generated tree and records
+default_params = {
+        'projects':     4,
+        'samples':      5,
+        'records':      10,
+        'subset_depth': 2,
+        'subset_rows':  5,
+        'attachments':  3,
+        'attachment_kb': 4,
+        'repeat':       50,
+        }
+
+bench_template = 'benchmark.yaml'
+default_template = 'defaultForm.yaml'
+
+
+def bench_config(root:str) -> dict:
+    """ a configuration for the generated tree, with the default
+        folder structure: projects, samples in their Data folder,
+        and YAML records in the samples
+
+        parameters:
+        root:   the folder holding the projects and templates folders
+
+        return:
+        the configuration dict
+    """
+    return {'projectDir':       os.path.join(root, 'projects'),
+            'templateDir':      os.path.join(root, 'templates'),
+            'readme':           'readme.md',
+            'ignore':           ['References', 'Chemicals', 'Equipment'],
+            'searchFolders':    ['', 'Data', ''],
+            'searchNames':      ['project', 'sample', 'experiment'],
+            'searchTargets':    ['dir', 'dir', 'file'],
+            'searchPattern':    ['', '', 'yaml$'],
+            'templates':        ['folderlist', '', ''],
+            'defaultTemplate':  ['', '', default_template],
+            'userID':           'benchmark'}
+# end bench_config
+
+
+def _subset_form(depth:int) -> dict:
+    """ the form of a subset, containing a subset again down to depth
+    """
+    form = {'position': {'type': 'numeric',
+                         'units': ['mm', 'um', 'nm'],
+                         'unit': 'um'},
+            'label':    {'type': 'text'},
+            'quality':  {'type': 'select',
+                         'options': ['good', 'fair', 'bad']},
+            'image':    {'type': 'file'}}
+    if depth > 1:
+        form['details'] = {'type': 'subset',
+                           'form': _subset_form(depth - 1)}
+    return form
+# end _subset_form
+
+
+def make_template(depth:int) -> tuple:
+    """ a default template and an experiment template with every common
+        field type, and a subset nested to depth levels
+
+        return:
+        (default template, template) dicts
+    """
+    default = {'user': '%u',
+               'created': '%D',
+               'experiment ID': '%3',
+               'sample information': 'group_id',
+               'sample preparation log': {'type': 'file'},
+               'generic sample description': {'type': 'text',
+                                              'required': True},
+               'general': 'group_id',
+               'experiment start': {'type': 'date', 'required': True},
+               'aim': {'type': 'multiline'},
+               'observation': {'type': 'multiline'},
+               'attachments / links': {'type': 'file'}}
+
+    template = {'template': bench_template,
+                'template version': 1,
+                'measurement': 'group_id',
+                'temperature': {'type': 'numeric',
+                                'units': ['K', 'C'],
+                                'unit': 'K'},
+                'repetitions': {'type': 'integer'},
+                'mode': {'type': 'select',
+                         'options': ['static', 'dynamic', 'scan']},
+                'calibrated': {'type': 'checkbox'},
+                'wavelengths': {'type': 'numericlist'},
+                'notes': {'type': 'multiline'},
+                'data files': {'type': 'file'}}
+    if depth > 0:
+        template['positions'] = {'type': 'subset',
+                                 'form': _subset_form(depth)}
+
+    return (default, template)
+# end make_template
+
+
+def _rows(depth:int, rows:int, files:list, n:int= 0) -> list:
+    """ the rows of a subset as the forms write them,
+        fields with units as [value, unit] pairs
+    """
+    res = []
+    for i in range(rows):
+        row = {'position': [round(0.5 * (n + i), 3), 'um'],
+               'label': f'point {n}.{i}',
+               'quality': ['good', 'fair', 'bad'][i % 3],
+               'image': files[i % len(files)] if files else None}
+        if depth > 1:
+            row['details'] = _rows(depth - 1, rows, files, i)
+        res.append(row)
+
+    return res
+# end _rows
+
+
+def make_record(params:dict, index:int= 0, files:list|None= None) -> dict:
+    """ the values of an experiment record of the template from
+        make_template, as saved by the form (not a full record)
+
+        parameters:
+        params:     the sizes, see default_params
+        index:      the number of the record, to vary the values
+        files:      attachment paths to link in the file fields
+
+        return:
+        the record dict
+    """
+    files = files if files else []
+    record = {'template': bench_template,
+              'template version': 1,
+              'user': 'benchmark',
+              'created': datetime.date(2026, 10, 17),
+              'experiment ID': f'{index:03d}',
+              'sample information': 'group_id',
+              'sample preparation log': files[0] if files else None,
+              'generic sample description': f'synthetic sample {index}',
+              'general': 'group_id',
+              'experiment start': datetime.date(2026, 1, 1 + index % 28),
+              'aim': 'time the record pipeline\nwith a synthetic record',
+              'observation': '\n'.join(f'line {i} of the observation'
+                                       for i in range(10)),
+              'attachments / links': files,
+              'measurement': 'group_id',
+              'temperature': 273.15 + index,
+              'repetitions': index % 7 + 1,
+              'mode': ['static', 'dynamic', 'scan'][index % 3],
+              'calibrated': bool(index % 2),
+              'wavelengths': [400.0 + 10 * i for i in range(16)],
+              'notes': 'multiline notes\n' * 5,
+              'data files': files}
+    if params['subset_depth'] > 0:
+        record['positions'] = _rows(params['subset_depth'],
+                                    params['subset_rows'],
+                                    files)
+
+    return record
+# end make_record
+
+
+def make_tree(root:str, params:dict|None= None) -> dict:
+    """ generate the templates and the project tree under root
+
+        parameters:
+        root:       an empty or not existing folder
+        params:     the sizes, see default_params
+
+        return:
+        the configuration dict of the tree
+    """
+    params = {**default_params, **(params if params else {})}
+    config = bench_config(root)
+
+    os.makedirs(config['templateDir'], exist_ok= True)
+    default, template = make_template(params['subset_depth'])
+    for name, content in [(default_template, default),
+                          (bench_template, template)]:
+        with open(os.path.join(config['templateDir'], name),
+                  'wt', encoding='UTF-8') as fp:
+            fp.write(safe_dump(content))
+
+    blob = os.urandom(params['attachment_kb'] * 1024)
+    n = 0
+    for i in range(params['projects']):
+        project = os.path.join(config['projectDir'], f'project_{i:03d}')
+        data = os.path.join(project, 'Data')
+        os.makedirs(os.path.join(project, 'References'), exist_ok= True)
+        os.makedirs(data, exist_ok= True)
+        with open(os.path.join(project, 'readme.md'),
+                  'wt', encoding='UTF-8') as fp:
+            fp.write(f'# project {i}\n')
+
+        for j in range(params['samples']):
+            sample = os.path.join(data, f'sample_{j:03d}')
+            os.makedirs(sample, exist_ok= True)
+            with open(os.path.join(sample, 'readme.md'),
+                      'wt', encoding='UTF-8') as fp:
+                fp.write(f'# sample {j}\n')
+
+            for k in range(params['records']):
+                files = []
+                for m in range(params['attachments']):
+                    name = os.path.join(sample, f'data_{k:03d}_{m:02d}.dat')
+                    with open(name, 'wb') as fp:
+                        fp.write(blob)
+                    files.append(name)
+
+                save_record(make_record(params, n, files),
+                            os.path.join(sample, f'experiment_{k:03d}.yaml'),
+                            full_record= False)
+                n += 1
+
+    return config
+# end make_tree
+
+
+def time_call(func, prepare= None, repeat:int= 50) -> dict:
+    """ time a function, only the call itself is measured
+
+        parameters:
+        func:       called as func(*args)
+        prepare:    called before every run, returns the args tuple,
+                    e.g. fresh copies of the data func changes
+        repeat:     number of runs
+
+        return:
+        a dict with the number of 'calls', 'min_ms', 'median_ms'
+        and 'mean_ms' of a call, and the 'total_s' of all calls
+    """
+    times = []
+    gc_on = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(max(repeat, 1)):
+            args = prepare() if prepare is not None else ()
+            t0 = time.perf_counter()
+            func(*args)
+            times.append(time.perf_counter() - t0)
+    finally:
+        if gc_on:
+            gc.enable()
+
+    return {'calls': len(times),
+            'min_ms': round(min(times) * 1e3, 4),
+            'median_ms': round(statistics.median(times) * 1e3, 4),
+            'mean_ms': round(statistics.fmean(times) * 1e3, 4),
+            'total_s': round(sum(times), 4)}
+# end time_call
+
+
+def _cold(args:tuple) -> tuple:
+    """ empty the template and schema caches before a run, so it
+        parses, merges and compiles the templates again
+    """
+    template_cache.clear()
+    clear_schema_cache()
+    return args
+# end _cold
+
+
+def _records(config:dict) -> list:
+    return list(iter_records(config))
+
+
+def _walk(config:dict, lister) -> int:
+    """ list the whole tree level by level, as browsing every project
+        and sample in the GUI would do
+    """
+    return sum(1 for _ in iter_records(config, lister= lister))
+# end _walk
+
+
+def run_benchmarks(root:str,
+                   params:dict|None= None,
+                   only:list|None= None,
+                   progress= None) -> dict:
+    """ generate a tree under root and time the record pipeline on it
+
+        parameters:
+        root:       folder for the generated tree, should be empty
+        params:     the sizes, see default_params
+        only:       names of the benchmarks to run, None for all
+        progress:   function(name) called before every benchmark
+
+        return:
+        a dict with the 'meta' information of the run (parameters,
+        python, platform...) and the 'results' of every benchmark
+        by name, see time_call
+    """
+    params = {**default_params, **(params if params else {})}
+    repeat = params['repeat']
+
+    t0 = time.perf_counter()
+    config = make_tree(root, params)
+    setup = time.perf_counter() - t0
+
+    template_dir = config['templateDir']
+    template_path = os.path.join(template_dir, bench_template)
+    default_path = os.path.join(template_dir, default_template)
+    records = _records(config)
+    record_path = records[len(records)//2]
+    save_path = os.path.join(root, 'saved', 'record.yaml')
+    patch_path = os.path.join(root, 'saved', 'patched.yaml')
+    os.makedirs(os.path.dirname(patch_path), exist_ok= True)
+    shutil.copyfile(record_path, patch_path)
+    uploaded = {'Uploaded': {'server': 'https://eln.example.org',
+                             'id': '1',
+                             'link': 'https://eln.example.org/experiments/1',
+                             'date': '2026-10-17 12:00 +0200'}}
+
+    template = merge_templates(template_path, default_path)
+    full = read_record(record_path, default_path, template_dir)
+    # the uploader gets the record converted, as rdm_upload does
+    converted = convert_record_to_JSON(full)
+    values = make_record(params, 0, [os.path.join(root, f'file_{i}.dat')
+                                     for i in range(params['attachments'])])
+    rows = values.get('positions', [])
+
+    index = RecordIndex(':memory:')
+    _walk(config, index.listing)
+    first_sample = os.path.join(config['projectDir'], 'project_000',
+                                'Data', 'sample_000')
+
+    benchmarks = {
+        # after the first run these take the templates from the caches
+        'merge_templates': (
+            merge_templates, lambda: (template_path, default_path)),
+        'merge_templates cold': (
+            merge_templates, lambda: _cold((template_path, default_path))),
+        'read_record': (
+            read_record, lambda: (record_path, default_path, template_dir)),
+        'read_record cold': (
+            read_record,
+            lambda: _cold((record_path, default_path, template_dir))),
+        'combine_template_data': (
+            combine_template_data,
+            lambda: (copy.deepcopy(template), values)),
+        'list_to_dict': (
+            list_to_dict, lambda: (rows, False)),
+        'save_record': (
+            save_record, lambda: (copy.deepcopy(full), save_path)),
+        'save_record simple': (
+            save_record,
+            lambda: (copy.deepcopy(full), save_path, True, False)),
+        'patch_record': (
+            patch_record, lambda: (patch_path, uploaded)),
+        'convert_record_to_JSON': (
+            convert_record_to_JSON, lambda: (full,)),
+        'body_meta_from_record': (
+            body_meta_from_record, lambda: (copy.deepcopy(converted),)),
+        'list_level sample': (
+            list_level, lambda: (first_sample, config, 2)),
+        'walk tree': (
+            _walk, lambda: (config, list_level)),
+        'walk tree index cold': (
+            _walk, lambda: (config, RecordIndex(':memory:').listing)),
+        'walk tree index warm': (
+            _walk, lambda: (config, index.listing)),
+        }
+
+    results = {}
+    for name, (func, prepare) in benchmarks.items():
+        if only and name not in only:
+            continue
+        if func is None:
+            continue
+        if progress is not None:
+            progress(name)
+
+        # the tree walks are slow, they need fewer runs
+        n = max(repeat // 10, 3) if name.startswith('walk') else repeat
+        # the messages printed by the functions are not wanted here
+        with open(os.devnull, 'wt', encoding='UTF-8') as fp,\
+                contextlib.redirect_stdout(fp):
+            results[name] = time_call(func, prepare, n)
+
+    index.close()
+
+    return {'meta': {'date': datetime.datetime.now().isoformat(
+                                timespec= 'seconds'),
+                     'python': sys.version.split()[0],
+                     'platform': platform.platform(),
+                     'libyaml': LIBYAML,
+                     'params': params,
+                     'records': len(records),
+                     'setup_s': round(setup, 3)},
+            'results': results}
+# end run_benchmarks
+
+
+def run_upload_benchmark(root:str,
+                         params:dict|None= None,
+                         workers:int= 4,
+                         latency:float= 0.0,
+                         error_rate:float= 0.0) -> dict:
+    """ generate a tree under root and upload all its records in a batch
+        to a local mock ElabFTW server
+
+        parameters:
+        root:       folder for the generated tree, should be empty
+        params:     the sizes, see default_params
+        workers:    records uploaded at the same time
+        latency:    seconds the server waits before every answer
+        error_rate: the part of the requests answered by 503
+
+        return:
+        a dict with the number of 'records', 'uploaded' and 'failed'
+        ones, the 'time_s' of the batch, 'records_per_s', the attachment
+        'MB' and 'MB_per_s', the 'requests' and 'errors' seen by the
+        server, and the 'ms_per_record'
+    """
+    # imported here, so the other benchmarks run without requests
+    # pylint: disable=import-outside-toplevel
+    from rdm_modules.rdm_upload import batch_upload
+    from rdm_modules.uploaders.mock_elabftw import MockElabFTW
+
+    params = {**default_params, **(params if params else {})}
+    config = make_tree(root, params)
+    token = 'benchmark'
+
+    # the attachment index of the user is not touched,
+    # and no progress is printed for every file
+    options = {'pool_size': max(workers, 1),
+               'deduplicate': False,
+               'progress': None,
+               'backoff': 0.05}
+
+    with MockElabFTW(token= token,
+                     latency= latency,
+                     error_rate= error_rate) as server,\
+            open(os.devnull, 'wt', encoding='UTF-8') as fp,\
+            contextlib.redirect_stdout(fp):
+        t0 = time.perf_counter()
+        summary = batch_upload([config['projectDir']],
+                               config,
+                               server.url,
+                               token,
+                               workers= workers,
+                               options= options)
+        dt = time.perf_counter() - t0
+        requests = server.requests
+        errors = server.errors
+        n_bytes = server.upload_bytes
+
+    uploaded = len(summary['uploaded'])
+    return {'records': summary['records'],
+            'uploaded': uploaded,
+            'failed': len(summary['failed']),
+            'workers': workers,
+            'latency_s': latency,
+            'error_rate': error_rate,
+            'time_s': round(dt, 3),
+            'records_per_s': round(uploaded / max(dt, 1e-9), 2),
+            'MB': round(n_bytes / 1e6, 3),
+            'MB_per_s': round(n_bytes / 1e6 / max(dt, 1e-9), 3),
+            'requests': requests,
+            'errors': errors,
+            'ms_per_record': round(dt * 1e3 / max(uploaded, 1), 3)}
+# end run_upload_benchmark
+
+
+def _verdict(old:float, new:float, tolerance:float) -> tuple:
+    """ the ratio of two times and 'slower', 'faster' or ''
+    """
+    ratio = new / old
+    if ratio > 1 + tolerance:
+        return (round(ratio, 3), 'slower')
+    if ratio < 1 / (1 + tolerance):
+        return (round(ratio, 3), 'faster')
+    return (round(ratio, 3), '')
+# end _verdict
+
+
+def compare(results:dict, baseline:dict, tolerance:float= 0.1) -> list:
+    """ compare the median times of two runs, and the time per record
+        of the batch upload if both have it
+
+        parameters:
+        results:    the dict of run_benchmarks
+        baseline:   the dict of an earlier run
+        tolerance:  relative change taken as noise, 0.1 = 10 %
+
+        return:
+        a list of (name, baseline ms, ms, ratio, verdict) tuples for the
+        benchmarks in both runs, verdict is 'slower', 'faster' or ''
+    """
+    res = []
+    base = baseline.get('results', {})
+    for name, new in results.get('results', {}).items():
+        if name not in base or not base[name].get('median_ms'):
+            continue
+
+        old = base[name]['median_ms']
+        res.append((name, old, new['median_ms'],
+                    *_verdict(old, new['median_ms'], tolerance)))
+
+    if 'upload' in results and baseline.get('upload', {}).get('ms_per_record'):
+        old = baseline['upload']['ms_per_record']
+        new = results['upload']['ms_per_record']
+        res.append(('batch_upload per record', old, new,
+                    *_verdict(old, new, tolerance)))
+
+    return res
+# end compare
+
+
+def format_results(results:dict) -> str:
+    """ the results of run_benchmarks as a readable table
+    """
+    meta = results['meta']
+    lines = [f'{meta["records"]} records, python {meta["python"]}, '
+             f'libyaml: {meta["libyaml"]}, setup {meta["setup_s"]} s',
+             f'{"benchmark":28s} {"calls":>6s} {"min ms":>10s} '
+             f'{"median ms":>10s} {"mean ms":>10s}']
+    for name, r in results['results'].items():
+        lines.append(f'{name:28s} {r["calls"]:6d} {r["min_ms"]:10.3f} '
+                     f'{r["median_ms"]:10.3f} {r["mean_ms"]:10.3f}')
+
+    if 'upload' in results:
+        r = results['upload']
+        lines.append(f'batch upload: {r["uploaded"]} of {r["records"]} '
+                     f'records in {r["time_s"]} s with {r["workers"]} '
+                     f'workers, {r["records_per_s"]} records/s, '
+                     f'{r["MB_per_s"]} MB/s attachments, '
+                     f'{r["requests"]} requests, {r["errors"]} errors')
+
+    return '\n'.join(lines)
+# end format_results
+
+
+def format_comparison(comparison:list,
+                      results:dict|None= None,
+                      baseline:dict|None= None) -> str:
+    """ the list of compare() as a readable table, with a warning
+        if the two runs used different parameters
+    """
+    lines = []
+    if results is not None and baseline is not None\
+            and results['meta'].get('params') \
+                != baseline.get('meta', {}).get('params'):
+        lines.append('warning: the baseline used other parameters')
+
+    lines.append(f'{"benchmark":28s} {"base ms":>10s} {"now ms":>10s} '
+                 f'{"ratio":>7s}')
+    for name, old, new, ratio, verdict in comparison:
+        lines.append(f'{name:28s} {old:10.3f} {new:10.3f} {ratio:7.3f} '
+                     f'{verdict}'.rstrip())
+
+    return '\n'.join(lines)
+# end format_comparison
+
+
+def save_results(results:dict, path:str) -> None:
+    """ write the results to a JSON file
+    """
+    with open(path, 'wt', encoding='UTF-8') as fp:
+        json.dump(results, fp, indent= 2)
+# end save_results
+
+
+def load_results(path:str) -> dict:
+    """ read results written by save_results
+    """
+    with open(path, 'rt', encoding='UTF-8') as fp:
+        return json.load(fp)
+# end load_results
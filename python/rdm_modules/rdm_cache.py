@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+""" A process wide cache of parsed templates.
+    Forms, records and uploads all start with merging the default
+    template with the selected one. Parsing YAML files from a network
+    share every time is slow, so keep the parsed dicts in memory, and
+    reload a file only if its modification time or size changed.
+
+    Callers always get a deep copy, because the merging functions
+    modify the dicts they receive.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import copy
+import os
+import threading
+from collections import OrderedDict
+
+from rdm_modules.rdm_trace import span
+from rdm_modules.rdm_yaml import safe_load
+
+__all__ = ['TemplateCache', 'template_cache', 'load_template']
+
+
+class TemplateCache():
+    """ An LRU cache of parsed YAML templates keyed by the absolute
+        path of the file, and validated by (mtime, size) of the file.
+    """
+
+    def __init__(self, max_size:int= 128) -> None:
+        """ Create an empty cache.
+
+            parameters:
+            max_size:   how many templates to keep at most,
+                        the least recently used are dropped first
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    # end __init__
+
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+    def get(self, filename:str) -> dict|None:
+        """ Return a copy of the parsed content of filename.
+            Parse the file only if it is not in the cache or
+            it has changed since it was loaded.
+
+            parameters:
+            filename:   path to the YAML file
+
+            return:
+            a deep copy of the parsed content,
+            None if the file does not exist
+        """
+        path = os.path.abspath(os.path.expanduser(filename))
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        key = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            if path in self._data and self._data[path][0] == key:
+                self.hits += 1
+                self._data.move_to_end(path)
+                return copy.deepcopy(self._data[path][1])
+            self.misses += 1
+
+        # parse outside the lock, so a slow share does not
+        # block the other threads
+        with open(path, 'rt', encoding='UTF-8') as fp,\
+                span('parse', path= path):
+            content = safe_load(fp)
+
+        with self._lock:
+            self._data[path] = (key, content)
+            self._data.move_to_end(path)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last= False)
+
+        return copy.deepcopy(content)
+    # end get
+
+
+    def invalidate(self, filename:str) -> None:
+        """ drop a single file from the cache
+        """
+        path = os.path.abspath(os.path.expanduser(filename))
+        with self._lock:
+            self._data.pop(path, None)
+    # end invalidate
+
+
+    def clear(self) -> None:
+        """ empty the cache and reset the counters
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+    # end clear
+
+
+    def stats(self) -> dict:
+        """ return the cache counters as a dict
+        """
+        return {'size': len(self._data),
+                'max size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses}
+    # end stats
+# end of class TemplateCache
+
+
+# the one used by the whole program
+template_cache = TemplateCache()
+
+
+def load_template(filename:str) -> dict|None:
+    """ Load a template through the process wide cache.
+
+        parameters:
+        filename:   path to the template
+
+        return:
+        a private copy of the template content, or None
+        if the file is not found
+    """
+    return template_cache.get(filename)
+# end load_template
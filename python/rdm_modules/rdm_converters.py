@@ -14,13 +14,17 @@
 
 import datetime
 import os
-import yaml
-from yaml.scanner import ScannerError
+import re
+import stat
+import threading
 
 from rdm_modules.project_config import get_config, replace_text
 from rdm_modules.rdm_templates import (merge_templates,
                            list_to_dict,
                            combine_template_data)
+from rdm_modules.rdm_trace import get_logger
+
+log = get_logger('converters')
 
 
 def convert_record_to_JSON(data:dict)->dict:
@@ -120,8 +124,7 @@ def guess_template(data:dict)->dict:
             this_type = guess_type(v)
 
         if this_type is None:
-            print('Unknown type for:', k,':', v)
-            print('set default to text')
+            log.info('unknown type of %s, set to text', k)
             this_type= 'text'
 
             if 'value' in v:
@@ -133,45 +136,107 @@ def guess_template(data:dict)->dict:
 # end off guess_template
 
 
+# verdicts of is_record: (path, keys): (mtime, size, verdict)
+_record_cache = {}
+_record_cache_lock = threading.Lock()
+
+# a top level key in a YAML mapping, quoted or not
+_top_key = re.compile(r"""^(?:"([^"]*)"|'([^']*)'|([^\s#'"\-][^:#]*?))\s*:(?:\s|$)""")
+
+
+def _sniff_keys(full_path:str,
+                key_list:list,
+                head_size:int)->bool:
+    """ scan the top level keys in the head of a YAML file, without
+        parsing it, until all keys in key_list are found
+
+        parameters:
+        full_path:  path to the file
+        key_list:   the keys we look for
+        head_size:  the number of bytes to check
+
+        return:
+        True if all keys were found
+    """
+    missing = set(key_list)
+    read = 0
+
+    with open(full_path, 'rb') as fp:
+        for line in fp:
+            read += len(line)
+            if read > head_size:
+                break
+
+            # indented lines, comments and empty lines are not keys
+            if not line.strip() or line[:1] in (b' ', b'\t', b'#'):
+                continue
+
+            line = line.decode('UTF-8', errors= 'replace').rstrip('\r\n')
+            if line in ('---', '...') or line.startswith('%'):
+                continue
+
+            m = _top_key.match(line)
+            if m is None:
+                # the top level is not a mapping
+                return False
+
+            missing.discard(next(i for i in m.groups() if i is not None))
+            if not missing:
+                return True
+
+    return False
+# end _sniff_keys
+
+
 def is_record(full_path:str,
-              key_list:list = ['template', 'template version', 'user', 'created']
+              key_list:list = ['template', 'template version', 'user', 'created'],
+              head_size:int = 16384
               )->bool:
-    """ Take a file content, try loading it as yaml,
-        and check if it can be assumed to be an experiment record
+    """ Check the head of a file to see if it can be assumed
+        to be an experiment record, without loading the whole YAML.
         If the file is not a .yaml or .yml or does not exist, return False.
 
+        The result is cached by path and modification time.
+
         parameters
         full_path:      path to the file
         key_list:       a list of keys to check for a valid record
+        head_size:      how many bytes to read at most
 
         return:
         True if the file is:
         - a YAML file
-        - contains a dict of dicts
-        - and has all keys in the list
+        - has all keys in the list at the top level
     """
 
-    if not os.path.isfile(full_path):
-        return False
-
     if not (full_path.endswith('.yaml')
             or full_path.endswith('.yml')):
         return False
 
+    full_path = os.path.abspath(full_path)
     try:
-        with open(full_path, 'rt', encoding='UTF-8') as fp:
-            a = yaml.safe_load(fp)
+        st = os.stat(full_path)
+    except OSError:
+        return False
 
-    except ScannerError:
-        print(full_path, 'is not YAML file')
+    if not stat.S_ISREG(st.st_mode):
         return False
 
-    if isinstance(a, dict):
-        all_dicts = [isinstance(a[i], dict) for i in a]
-        all_match = [i in a for i in key_list]
+    cache_key = (full_path, tuple(key_list))
+    with _record_cache_lock:
+        cached = _record_cache.get(cache_key)
+    if (cached and cached[0] == st.st_mtime_ns
+        and cached[1] == st.st_size):
+        return cached[2]
+
+    try:
+        res = _sniff_keys(full_path, key_list, head_size)
+    except OSError as e:
+        log.warning('%s cannot be read: %s', full_path, e)
+        return False
 
-        if all(all_dicts) and all(all_match):
-            return True
+    with _record_cache_lock:
+        _record_cache[cache_key] = (st.st_mtime_ns, st.st_size, res)
 
-    return False
+    return res
 # end is_record
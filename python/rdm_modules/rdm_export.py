@@ -0,0 +1,410 @@
+#!/usr/bin/env python
+""" Export the records of a template as a table, e.g. for analysis
+    in pandas or a spreadsheet.
+
+    The records are read one by one while walking the project tree, and
+    written out right away, so the memory use does not grow with the
+    number of records. The columns come from the compiled template: the
+    fixed entries (user, created...), then every field, and for fields
+    with units a column with the unit after the value.
+
+    Every record is one line, or with a subset given, every row of that
+    subset is one line, with the fields of its record repeated.
+
+    CSV files are written by the csv module. Parquet files need pyarrow,
+    which is optional, and are written in row groups.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import csv
+import datetime
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rdm_modules.rdm_schema import Schema
+from rdm_modules.rdm_templates import get_schema
+from rdm_modules.rdm_trace import get_logger
+from rdm_modules.rdm_tree import (config_element, iter_records, record_level)
+from rdm_modules.rdm_yaml import safe_load_file
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    ARROW = True
+except ImportError:
+    ARROW = False
+
+__all__ = ['ARROW', 'table_columns', 'flatten', 'iter_rows', 'write_csv',
+           'write_parquet', 'export_records']
+
+log = get_logger('export')
+
+# fixed entries of the templates which are not data
+_skip_keys = ['doc', 'full record', 'uploaded', 'no_default']
+
+
+def table_columns(schema:Schema,
+                  prefix:str= '',
+                  constants:bool= True) -> list:
+    """ the columns of a schema: the fixed entries, then the fields,
+        subsets are left out
+
+        parameters:
+        schema:     the compiled template or subset form
+        prefix:     put before the column names, e.g. 'subset/'
+        constants:  include the fixed entries of the template
+
+        return:
+        a list of (column name, key, part, type) tuples,
+        where part is 'value' or 'unit'
+    """
+    res = []
+    if constants:
+        for k in schema.constants:
+            if str(k).lower() in _skip_keys or k in schema.groups:
+                continue
+            res.append((f'{prefix}{k}', k, 'value', None))
+
+    for field in schema:
+        if field.type == 'subset':
+            continue
+
+        res.append((f'{prefix}{field.name}', field.name, 'value', field.type))
+        if field.units:
+            res.append((f'{prefix}{field.name} unit', field.name, 'unit', None))
+
+    return res
+# end table_columns
+
+
+def _split_value(schema:Schema, key, data):
+    """ the value and unit of a field, from a full field dict, a plain
+        value or a [value, unit] pair of a subset row
+    """
+    field = schema.fields.get(key)
+    unit = None
+    if isinstance(data, dict):
+        unit = data.get('unit')
+        data = data.get('value')
+
+    if field is None or not field.units:
+        return (data, None)
+
+    if isinstance(data, list) and len(data) == 2 and isinstance(data[1], str)\
+            and field.type != 'list':
+        data, unit = data
+
+    # an empty field has no unit, even if the form stored one
+    if data is None or data == '':
+        return (data, None)
+
+    # simple records lost the unit, the form shows the default one
+    if unit is None:
+        unit = field.unit if field.unit else field.units[0]
+
+    return (data, unit)
+# end _split_value
+
+
+def flatten(schema:Schema, values:dict, columns:list) -> list:
+    """ the cells of a record or a subset row for the columns
+
+        parameters:
+        schema:     the template or subset form of the values
+        values:     the record or row dict
+        columns:    from table_columns() for the same schema
+
+        return:
+        the list of values in column order, None if not set
+    """
+    res = []
+    for _, key, part, _ in columns:
+        value, unit = _split_value(schema, key, values.get(key))
+        res.append(unit if part == 'unit' else value)
+
+    return res
+# end flatten
+
+
+def _read(path:str, template:str) -> dict|None:
+    """ read a record, None if it is of another template or broken
+    """
+    # a broken file must not stop the export
+    # pylint: disable=broad-exception-caught
+    try:
+        record = safe_load_file(path)
+    except Exception as e:
+        log.warning('cannot read record %s: %s', path, e)
+        return None
+
+    if not isinstance(record, dict) or record.get('template') != template:
+        return None
+
+    return record
+# end _read
+
+
+def iter_rows(paths:list,
+              config:dict,
+              template:str,
+              subset:str|None= None,
+              workers:int= 4,
+              stats:dict|None= None):
+    """ generate the header, then the lines of the table of all records
+        of a template under the paths
+
+        parameters:
+        paths:      record files, samples, projects or the projects folder
+        config:     the configuration dict
+        template:   the template name as in the records, e.g. 'SEM.yaml'
+        subset:     name of a subset field to make a line of every row
+        workers:    number of records read at the same time
+        stats:      a dict getting the number of 'records', 'rows'
+                    and 'skipped' files
+
+        yield:
+        first the list of (column name, type) tuples, then lists of values
+
+        raise:
+        ValueError if the template or the subset is not found
+    """
+    level = record_level(config)
+    template_dir = config_element(config, 'templateDir', level)
+    default = config_element(config, 'defaultTemplate', level)
+    schema = get_schema(os.path.join(template_dir, template),
+                        os.path.join(template_dir, default)
+                        if default else None)
+    if schema is None:
+        raise ValueError(f'template {template} not found')
+
+    columns = [('record', 'record', 'value', None)] + table_columns(schema)
+    sub_schema = None
+    if subset is not None:
+        if subset not in schema or schema[subset].type != 'subset':
+            raise ValueError(f'{subset} is not a subset of {template}')
+        sub_schema = schema[subset].form
+        sub_columns = table_columns(sub_schema, f'{subset}/', False)
+        yield [(i[0], i[3]) for i in columns + sub_columns]
+    else:
+        yield [(i[0], i[3]) for i in columns]
+
+    if stats is None:
+        stats = {}
+    stats.update({'records': 0, 'rows': 0, 'skipped': 0})
+
+    def lines(path:str, record:dict) -> list:
+        values = dict(record)
+        values['record'] = path
+        head = flatten(schema, values, columns)
+        if sub_schema is None:
+            return [head]
+
+        rows = values.get(subset)
+        if isinstance(rows, dict):
+            rows = rows.get('value')
+        if not isinstance(rows, list):
+            return []
+        return [head + flatten(sub_schema, i, sub_columns)
+                for i in rows if isinstance(i, dict)]
+    # end lines
+
+    # read in batches, so only a batch of records is in the memory
+    batch_size = 64 * max(workers, 1)
+    batch = []
+    with ThreadPoolExecutor(max_workers= max(workers, 1)) as pool:
+        def run(batch:list):
+            for path, record in zip(batch,
+                                    pool.map(lambda i: _read(i, template),
+                                             batch)):
+                if record is None:
+                    stats['skipped'] += 1
+                    continue
+                stats['records'] += 1
+                for line in lines(path, record):
+                    stats['rows'] += 1
+                    yield line
+        # end run
+
+        for path in _unique(paths, config):
+            batch.append(path)
+            if len(batch) >= batch_size:
+                yield from run(batch)
+                batch = []
+
+        if batch:
+            yield from run(batch)
+# end iter_rows
+
+
+def _unique(paths:list, config:dict):
+    """ the records under the paths, every one once
+    """
+    seen = set()
+    for path in paths:
+        for i in iter_records(config, path):
+            if i not in seen:
+                seen.add(i)
+                yield i
+# end _unique
+
+
+def _cell(value):
+    """ a value for a CSV cell: lists are joined by '; ', dicts are
+        written as JSON, None is empty
+    """
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, list):
+        return '; '.join(str(_cell(i)) for i in value)
+    if isinstance(value, dict):
+        return json.dumps(value, default= str, ensure_ascii= False)
+
+    return value
+# end _cell
+
+
+def write_csv(rows, path:str) -> int:
+    """ write the header and lines from iter_rows() to a CSV file
+
+        return:
+        the number of lines written, without the header
+    """
+    n = -1
+    with open(path, 'wt', encoding='UTF-8', newline='') as fp:
+        writer = csv.writer(fp)
+        for n, row in enumerate(rows):
+            if n == 0:
+                writer.writerow([i[0] for i in row])
+            else:
+                writer.writerow([_cell(i) for i in row])
+
+    return max(n, 0)
+# end write_csv
+
+
+def _arrow_type(field_type:str|None):
+    """ the column type of a field type
+    """
+    if field_type == 'numeric':
+        return pyarrow.float64()
+    if field_type == 'integer':
+        return pyarrow.int64()
+    if field_type == 'checkbox':
+        return pyarrow.bool_()
+
+    return pyarrow.string()
+# end _arrow_type
+
+
+def _arrow_value(value, field_type:str|None):
+    """ a value converted to its column type, None if it cannot be
+    """
+    if value is None:
+        return None
+
+    # pylint: disable=broad-exception-caught
+    try:
+        if field_type == 'numeric':
+            return float(value)
+        if field_type == 'integer':
+            return int(value)
+        if field_type == 'checkbox':
+            return value if isinstance(value, bool) else None
+    except Exception:
+        return None
+
+    value = _cell(value)
+    return value if isinstance(value, str) else str(value)
+# end _arrow_value
+
+
+def write_parquet(rows, path:str, row_group_size:int= 10000) -> int:
+    """ write the header and lines from iter_rows() to a Parquet file,
+        keeping only one row group in the memory
+
+        return:
+        the number of lines written
+
+        raise:
+        ImportError if pyarrow is not installed
+    """
+    if not ARROW:
+        raise ImportError('writing Parquet files needs pyarrow')
+
+    rows = iter(rows)
+    header = next(rows)
+    names = [i[0] for i in header]
+    types = [i[1] for i in header]
+    schema = pyarrow.schema([(i, _arrow_type(j)) for i, j in header])
+
+    n = 0
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        group = [[] for _ in names]
+
+        def flush():
+            writer.write_table(pyarrow.table(
+                    {names[i]: pyarrow.array(group[i], type= schema[i].type)
+                     for i in range(len(names))}, schema= schema))
+            for i in group:
+                i.clear()
+        # end flush
+
+        for row in rows:
+            for i, value in enumerate(row):
+                group[i].append(_arrow_value(value, types[i]))
+            n += 1
+            if len(group[0]) >= row_group_size:
+                flush()
+
+        if group[0] or n == 0:
+            flush()
+
+    return n
+# end write_parquet
+
+
+def export_records(paths:list,
+                   config:dict,
+                   template:str,
+                   out_path:str,
+                   subset:str|None= None,
+                   workers:int= 4,
+                   row_group_size:int= 10000) -> dict:
+    """ export all records of a template under the paths to a table,
+        Parquet if out_path ends with .parquet, CSV otherwise
+
+        parameters:
+        paths:          record files, samples, projects or the projects
+                        folder
+        config:         the configuration dict
+        template:       the template name as in the records
+        out_path:       the output file
+        subset:         a subset field, to make a line of every row
+        workers:        number of records read at the same time
+        row_group_size: lines in a row group of Parquet files
+
+        return:
+        a summary dict with the 'file', the number of 'records', 'rows'
+        and 'skipped' files, and the 'time' in s
+    """
+    t0 = time.perf_counter()
+    stats = {}
+    rows = iter_rows(paths, config, template, subset, workers, stats)
+
+    if out_path.lower().endswith('.parquet'):
+        write_parquet(rows, out_path, row_group_size)
+    else:
+        write_csv(rows, out_path)
+
+    stats['file'] = out_path
+    stats['time'] = round(time.perf_counter() - t0, 3)
+    return stats
+# end export_records
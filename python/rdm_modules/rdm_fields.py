@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+""" Walk a record once, and index its fields by type.
+
+    Records are trees: top level fields with a type and a value, fixed
+    key / value pairs, and subsets, whose value is a list of rows with
+    their own fields (which can be subsets again). Finding the files,
+    the multiline texts or the numbers of a record used to walk the tree
+    again for every question. FieldIndex walks it once, without changing
+    it, and keeps every field with its path, type, value and unit.
+
+    A path is a tuple of keys and row numbers, e.g.
+    ('image set', 2, 'file') for the file of the third row of the
+    image set subset.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+from rdm_modules.rdm_schema import Schema
+
+__all__ = ['FieldIndex']
+
+_group_values = ['group', 'group_id']
+
+
+def _definition(form, key) -> tuple:
+    """ the type, units, default unit and sub-form of a field in a form,
+        which can be a template dict or a compiled Schema
+
+        return:
+        (type, units, unit, form), with None for what is not known
+    """
+    if isinstance(form, Schema):
+        if key not in form:
+            return (None, None, None, None)
+        field = form[key]
+        return (field.type, field.units, field.unit, field.form)
+
+    if isinstance(form, dict) and isinstance(form.get(key), dict):
+        d = form[key]
+        return (d.get('type'), d.get('units'), d.get('unit'), d.get('form'))
+
+    return (None, None, None, None)
+# end _definition
+
+
+class FieldIndex():
+    """ the fields of a record by type, collected in a single walk
+    """
+
+    def __init__(self, record:dict, schema:Schema|None= None) -> None:
+        """ walk the record
+
+            parameters:
+            record:     a record merged with its template (fields are
+                        dicts with type and value), or a simple one
+                        with plain values; it is not changed
+            schema:     the compiled template, gives the types of the
+                        plain values of simple records
+        """
+        # (path, type, value, unit) in the order of the record
+        self.fields = []
+        # type: [(path, value)], type None for fixed values
+        self.by_type = {}
+
+        if isinstance(record, dict):
+            self._walk_record(record, schema)
+    # end __init__
+
+
+    def _add(self, path:tuple, this_type, value, unit) -> None:
+        self.fields.append((path, this_type, value, unit))
+        self.by_type.setdefault(this_type, []).append((path, value))
+    # end _add
+
+
+    def _walk_record(self, record:dict, schema:Schema|None) -> None:
+        """ the top level of a record
+        """
+        for k, v in record.items():
+            if isinstance(v, dict):
+                if 'type' not in v:
+                    continue
+
+                this_type = v['type']
+                value = v.get('value')
+                if this_type == 'subset':
+                    self._add((k,), this_type, value, None)
+                    if isinstance(value, list):
+                        self._walk_rows((k,), v.get('form'), value)
+                    continue
+
+                self._add((k,), this_type, value, v.get('unit'))
+                continue
+
+            if isinstance(v, str) and v.lower() in _group_values:
+                self._add((k,), 'group', v, None)
+                continue
+
+            # a plain value, its type may come from the template
+            this_type, units, unit, form = _definition(schema, k)
+            if this_type == 'subset':
+                self._add((k,), this_type, v, None)
+                if isinstance(v, list):
+                    self._walk_rows((k,), form, v)
+                continue
+
+            self._add((k,), this_type, v, unit if units else None)
+    # end _walk_record
+
+
+    def _walk_rows(self, path:tuple, form, rows:list) -> None:
+        """ the rows of a subset, rows are dicts of plain values
+            described by the form of the subset
+        """
+        for i, row in enumerate(rows):
+            if not isinstance(row, dict):
+                continue
+
+            for k, v in row.items():
+                this_type, units, unit, sub_form = _definition(form, k)
+                this_path = path + (i, k)
+
+                if this_type == 'subset':
+                    self._add(this_path, this_type, v, None)
+                    if isinstance(v, list):
+                        self._walk_rows(this_path, sub_form, v)
+                    continue
+
+                # fields with units are stored as [value, unit]
+                if ((units or unit) and isinstance(v, list) and len(v) == 2
+                    and isinstance(v[1], str)):
+                    v, unit = v
+
+                self._add(this_path, this_type, v, unit)
+    # end _walk_rows
+
+
+    def __iter__(self):
+        """ (path, type, value, unit) of every field
+        """
+        return iter(self.fields)
+
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+
+    def of_type(self, this_type:str|None) -> list:
+        """ (path, value) of every field of a type
+        """
+        return list(self.by_type.get(this_type, []))
+    # end of_type
+
+
+    def values(self, this_type:str) -> list:
+        """ all values of the fields of a type in a flat list,
+            lists (e.g. several files) are merged, empty values dropped
+        """
+        res = []
+        for _, value in self.by_type.get(this_type, []):
+            if isinstance(value, list):
+                res += [i for i in value if i is not None]
+            elif value is not None:
+                res.append(value)
+
+        return res
+    # end values
+# end of class FieldIndex
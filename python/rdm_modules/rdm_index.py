@@ -0,0 +1,425 @@
+#!/usr/bin/env python
+""" A persistent index of the project tree in an SQLite database
+    in the configuration folder.
+    Listing a folder with thousands of samples on a network share, and
+    reading the records again for every window is slow. The index keeps
+    the content of every folder listed so far, with the modification time
+    of the folder. As long as the folder did not change, its content comes
+    from the database, without listing the folder again.
+
+    Experiment records are stored with their template, template version,
+    user, creation date and upload servers, which are read again only if
+    the file changed (modification time or size).
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from rdm_modules.project_config import get_config_dir
+from rdm_modules.rdm_match import level_filter
+from rdm_modules.rdm_trace import (get_logger, traced)
+from rdm_modules.rdm_tree import (config_element, record_level, start_level)
+from rdm_modules.rdm_yaml import safe_load_file
+
+__all__ = ['index_name', 'RecordIndex', 'get_record_index']
+
+log = get_logger('index')
+
+index_name = 'rdm_index.sqlite'
+
+# increment it if the tables change, the old index is dropped then
+schema_version = 1
+
+_schema = """
+CREATE TABLE IF NOT EXISTS folders (
+    path    TEXT PRIMARY KEY,
+    mtime   INTEGER
+);
+CREATE TABLE IF NOT EXISTS entries (
+    path    TEXT PRIMARY KEY,
+    folder  TEXT NOT NULL,
+    name    TEXT NOT NULL,
+    is_dir  INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_folder ON entries (folder);
+CREATE TABLE IF NOT EXISTS records (
+    path                TEXT PRIMARY KEY,
+    folder              TEXT NOT NULL,
+    level               INTEGER,
+    mtime               INTEGER,
+    size                INTEGER,
+    template            TEXT,
+    template_version    TEXT,
+    user                TEXT,
+    created             TEXT,
+    uploaded            TEXT
+);
+CREATE INDEX IF NOT EXISTS records_folder ON records (folder);
+"""
+
+# folders changed less than this many seconds ago may still change
+# within the same time stamp, so their listing is not trusted later
+racy_time = 2.0
+
+
+def _field_value(record:dict, key:str) -> str|None:
+    """ get a top level value of a record as string, handling
+        full records, where it may be a dict with a value
+    """
+    if key not in record:
+        return None
+
+    v = record[key]
+    if isinstance(v, dict):
+        v = v.get('value')
+
+    return None if v is None else str(v)
+# end _field_value
+
+
+def _uploaded_servers(record:dict) -> list:
+    """ the list of servers a record was uploaded to
+    """
+    uploaded = record.get('Uploaded')
+    if not uploaded:
+        return []
+
+    if isinstance(uploaded, dict):
+        uploaded = [uploaded]
+
+    return [i['server'] for i in uploaded
+            if isinstance(i, dict) and 'server' in i]
+# end _uploaded_servers
+
+
+class RecordIndex():
+    """ folder listings and record information in an SQLite database,
+        refreshed incrementally using the modification times
+    """
+
+    def __init__(self, path:str) -> None:
+        """ open or create the database
+
+            parameters:
+            path:   the database file, ':memory:' for a temporary one
+        """
+        self.path = path
+        if path != ':memory:':
+            folder = os.path.dirname(path)
+            if folder and not os.path.isdir(folder):
+                os.makedirs(folder, exist_ok= True)
+
+        # the GUI and the worker threads share the connection,
+        # the lock serializes them
+        self._lock = threading.RLock()
+        self.db = sqlite3.connect(path,
+                                  check_same_thread= False,
+                                  isolation_level= None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version != schema_version:
+            for table in ['folders', 'entries', 'records']:
+                self.db.execute(f'DROP TABLE IF EXISTS {table}')
+            self.db.execute(f'PRAGMA user_version={schema_version}')
+
+        self.db.executescript(_schema)
+    # end __init__
+
+
+    def close(self) -> None:
+        """ close the database
+        """
+        with self._lock:
+            self.db.close()
+    # end close
+
+
+    def _forget(self, path:str) -> None:
+        """ drop a folder and everything under it,
+            call it holding the lock in a transaction
+        """
+        low = path + os.sep
+        high = path + chr(ord(os.sep) + 1)
+        for table in ['folders', 'entries', 'records']:
+            self.db.execute(f'DELETE FROM {table} WHERE path = ? '
+                            'OR (path >= ? AND path < ?)',
+                            (path, low, high))
+    # end _forget
+
+
+    @traced('scan')
+    def folder(self,
+               path:str,
+               on_chunk= None,
+               chunk_size:int= 256) -> list:
+        """ the content of a folder, listed again only if the folder
+            changed since the last time
+
+            parameters:
+            path:       the folder
+            on_chunk:   function(list of (name, is_dir)) called with
+                        parts of the content while the folder is being
+                        listed, not called if the index had it
+            chunk_size: number of items in a part
+
+            return:
+            a list of (name, is_dir) tuples, empty if the folder
+            does not exist
+        """
+        path = os.path.abspath(path)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            with self._lock:
+                self.db.execute('BEGIN')
+                self._forget(path)
+                self.db.execute('COMMIT')
+            return []
+
+        with self._lock:
+            row = self.db.execute('SELECT mtime FROM folders WHERE path = ?',
+                                  (path,)).fetchone()
+            if row and row[0] == mtime:
+                return [(i[0], bool(i[1])) for i in self.db.execute(
+                        'SELECT name, is_dir FROM entries WHERE folder = ?',
+                        (path,))]
+
+        # list it outside of the lock, this is the slow part
+        try:
+            content = {}
+            chunk = []
+            with os.scandir(path) as it:
+                for i in it:
+                    content[i.name] = i.is_dir()
+                    if on_chunk is not None:
+                        chunk.append((i.name, content[i.name]))
+                        if len(chunk) >= chunk_size:
+                            on_chunk(chunk)
+                            chunk = []
+            if chunk:
+                on_chunk(chunk)
+        except OSError as e:
+            log.warning('cannot list folder %s: %s', path, e)
+            return []
+
+        # a folder changed just now may change again within the
+        # same time stamp, we will list it again next time
+        if time.time() - mtime/1E9 < racy_time:
+            mtime = -1
+
+        with self._lock:
+            self.db.execute('BEGIN')
+            old = dict(self.db.execute(
+                        'SELECT name, is_dir FROM entries WHERE folder = ?',
+                        (path,)).fetchall())
+
+            for name, is_dir in old.items():
+                if name not in content or bool(is_dir) != content[name]:
+                    self._forget(os.path.join(path, name))
+
+            self.db.executemany(
+                    'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                    [(os.path.join(path, name), path, name, int(is_dir))
+                     for name, is_dir in content.items()
+                     if name not in old or bool(old[name]) != is_dir])
+            self.db.execute('INSERT OR REPLACE INTO folders VALUES (?, ?)',
+                            (path, mtime))
+            self.db.execute('COMMIT')
+
+        return list(content.items())
+    # end folder
+
+
+    def listing(self, path:str, config:dict, level:int) -> list:
+        """ list the items of a folder at a given level, applying
+            searchTargets, searchPattern and ignore from the config,
+            the same as rdm_tree.list_level, but using the index
+
+            parameters:
+            path:       the folder to be listed (searchFolders applied)
+            config:     the configuration dict
+            level:      the depth in the folder tree
+
+            return:
+            a sorted list of names
+        """
+        res = level_filter(config, level).select(self.folder(path))
+        res.sort()
+        return res
+    # end listing
+
+
+    def record_info(self, path:str, level:int|None= None) -> dict|None:
+        """ the information of an experiment record, read from the
+            file only if it changed since the last time
+
+            parameters:
+            path:   the record file
+            level:  its level in the tree, stored with the record
+
+            return:
+            a dict with path, mtime, size, template, template version,
+            user, created and uploaded (list of servers), or None if
+            the file does not exist or cannot be read
+        """
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            with self._lock:
+                self.db.execute('DELETE FROM records WHERE path = ?', (path,))
+            return None
+
+        with self._lock:
+            row = self.db.execute(
+                    'SELECT path, mtime, size, template, template_version, '
+                    'user, created, uploaded FROM records WHERE path = ?',
+                    (path,)).fetchone()
+
+        if not row or row[1] != st.st_mtime_ns or row[2] != st.st_size:
+            try:
+                record = safe_load_file(path)
+            # a broken file is not a record, but must not stop
+            # the listing of the others
+            # pylint: disable=broad-exception-caught
+            except Exception as e:
+                log.warning('cannot read record %s: %s', path, e)
+                return None
+
+            if not isinstance(record, dict):
+                record = {}
+
+            row = (path,
+                   st.st_mtime_ns,
+                   st.st_size,
+                   _field_value(record, 'template'),
+                   _field_value(record, 'template version'),
+                   _field_value(record, 'user'),
+                   _field_value(record, 'created'),
+                   json.dumps(_uploaded_servers(record)))
+
+            with self._lock:
+                self.db.execute('INSERT OR REPLACE INTO records '
+                                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                (path, os.path.dirname(path), level) + row[1:])
+
+        return {'path': row[0],
+                'mtime': row[1],
+                'size': row[2],
+                'template': row[3],
+                'template version': row[4],
+                'user': row[5],
+                'created': row[6],
+                'uploaded': json.loads(row[7]) if row[7] else []}
+    # end record_info
+
+
+    def refresh(self, config:dict, start:str|None= None) -> dict:
+        """ walk the tree from start, and bring the index up to date
+
+            parameters:
+            config:     the configuration dict
+            start:      a project, a sample or the projects folder,
+                        None for the whole projectDir
+
+            return:
+            a dict with the number of 'folders' and 'records' found
+        """
+        if start is None:
+            start = config['projectDir']
+
+        start = os.path.abspath(os.path.expanduser(start))
+        last = record_level(config)
+        level, path = start_level(start, config)
+
+        counts = {'folders': 0, 'records': 0}
+        stack = [(level, path)]
+        while stack:
+            level, path = stack.pop()
+            names = self.listing(path, config, level)
+            counts['folders'] += 1
+
+            if level >= last:
+                for name in names:
+                    if self.record_info(os.path.join(path, name), level):
+                        counts['records'] += 1
+                continue
+
+            for name in names:
+                sub = os.path.join(path,
+                                   name,
+                                   config_element(config,
+                                                  'searchFolders',
+                                                  level+1))
+                stack.append((level+1, sub))
+
+        return counts
+    # end refresh
+
+
+    def records(self, folder:str|None= None) -> list:
+        """ the records known by the index, without checking the files
+
+            parameters:
+            folder:     only the records in this folder, None for all
+
+            return:
+            a list of dicts as in record_info, sorted by path
+        """
+        query = ('SELECT path, mtime, size, template, template_version, '
+                 'user, created, uploaded FROM records')
+        args = ()
+        if folder is not None:
+            query = f'{query} WHERE folder = ?'
+            args = (os.path.abspath(folder),)
+
+        with self._lock:
+            rows = self.db.execute(f'{query} ORDER BY path', args).fetchall()
+
+        return [{'path': i[0],
+                 'mtime': i[1],
+                 'size': i[2],
+                 'template': i[3],
+                 'template version': i[4],
+                 'user': i[5],
+                 'created': i[6],
+                 'uploaded': json.loads(i[7]) if i[7] else []}
+                for i in rows]
+    # end records
+# end of class RecordIndex
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_record_index() -> RecordIndex|None:
+    """ the index of the user in the configuration folder, opened
+        at the first call
+
+        return:
+        the RecordIndex, or None if the database cannot be used,
+        in which case the caller should list the folders directly
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            try:
+                _index = RecordIndex(os.path.join(get_config_dir(),
+                                                  index_name))
+            except (sqlite3.Error, OSError) as e:
+                log.warning('the index cannot be opened: %s', e)
+                return None
+
+    return _index
+# end get_record_index
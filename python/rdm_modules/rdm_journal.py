@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+""" An append-only journal of uploads, one per project.
+    Every step of an upload (experiment created, fields patched,
+    attachment sent, experiment locked, record updated) is written
+    as a JSON line into .rdm_upload_journal.jsonl in the project
+    folder. If an upload breaks, the next try reads back what was
+    done for the record and server, and continues from there instead
+    of creating a second experiment and sending the files again.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from rdm_modules.rdm_trace import get_logger
+
+__all__ = ['journal_name', 'journal_path', 'file_sha256', 'value_sha256',
+           'UploadJournal']
+
+log = get_logger('journal')
+
+journal_name = '.rdm_upload_journal.jsonl'
+
+# the entries read so far from every journal file:
+# path: {'offset': bytes read, 'entries': {(record, server): [entries]}}
+_journals = {}
+_journal_lock = threading.Lock()
+
+
+def journal_path(record_path:str, config:dict) -> str:
+    """ find the journal of the project the record belongs to
+
+        parameters:
+        record_path:    path to the record
+        config:         the configuration dict
+
+        return:
+        the path of the journal file: in the project folder, or
+        next to the record if it is not in the projects folder
+    """
+    record_path = os.path.abspath(record_path)
+    project_dir = os.path.abspath(
+            os.path.expanduser(config['projectDir'])
+            ) if 'projectDir' in config else ''
+
+    rel = os.path.relpath(record_path, project_dir) if project_dir else '..'
+    if rel.startswith('..') or os.sep not in rel:
+        return os.path.join(os.path.dirname(record_path), journal_name)
+
+    return os.path.join(project_dir, rel.split(os.sep)[0], journal_name)
+# end journal_path
+
+
+def file_sha256(file_path:str, chunk_size:int= 1048576) -> str:
+    """ the SHA-256 hash of a file, read in chunks
+
+        parameters:
+        file_path:  the file
+        chunk_size: size of the reads
+
+        return:
+        the hex digest
+    """
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as fp:
+        while True:
+            chunk = fp.read(chunk_size)
+            if not chunk:
+                break
+            h.update(chunk)
+
+    return h.hexdigest()
+# end file_sha256
+
+
+def value_sha256(value) -> str:
+    """ the SHA-256 hash of a JSON serializable value, e.g. a field
+        sent to the server, independent of the order of dict keys
+
+        return:
+        the hex digest
+    """
+    data = json.dumps(value, sort_keys= True, ensure_ascii= False,
+                      default= str)
+    return hashlib.sha256(data.encode('UTF-8')).hexdigest()
+# end value_sha256
+
+
+def _read_journal(path:str) -> dict:
+    """ read the new lines of a journal file since the last call,
+        call it holding _journal_lock
+
+        return:
+        the dict of entries grouped by (record, server)
+    """
+    this = _journals.setdefault(path, {'offset': 0, 'entries': {}})
+
+    if not os.path.isfile(path):
+        this['offset'] = 0
+        this['entries'] = {}
+        return this['entries']
+
+    if os.path.getsize(path) < this['offset']:
+        # the file was replaced or cut, start again
+        this['offset'] = 0
+        this['entries'] = {}
+
+    with open(path, 'rb') as fp:
+        fp.seek(this['offset'])
+        for line in fp:
+            # an unfinished last line is left for the next time
+            if not line.endswith(b'\n'):
+                break
+            this['offset'] += len(line)
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                log.warning('invalid line in journal %s', path)
+                continue
+
+            key = (entry.get('record'), entry.get('server'))
+            this['entries'].setdefault(key, []).append(entry)
+
+    return this['entries']
+# end _read_journal
+
+
+class UploadJournal():
+    """ the journal of one record uploaded to one server
+    """
+
+    def __init__(self, path:str, record_path:str, server:str) -> None:
+        """ parameters:
+            path:           the journal file, see journal_path()
+            record_path:    the record being uploaded
+            server:         the server link
+        """
+        self.path = path
+        # records are identified relative to the journal,
+        # so the project can be moved around
+        self.record = os.path.relpath(os.path.abspath(record_path),
+                                      os.path.dirname(path)).replace('\\', '/')
+        self.server = server
+    # end __init__
+
+
+    def log(self, step:str, **info) -> None:
+        """ append a step to the journal, and make sure
+            it is on the disk
+
+            parameters:
+            step:   'created', 'patched', 'attachment', 'locked'
+                    or 'done'
+            info:   data of the step, must be JSON serializable
+        """
+        entry = {'time': time.strftime('%Y-%m-%d %H:%M:%S %z',
+                                       time.localtime()),
+                 'record': self.record,
+                 'server': self.server,
+                 'step': step}
+        entry.update(info)
+
+        line = json.dumps(entry, ensure_ascii= False) + '\n'
+        with _journal_lock:
+            with open(self.path, 'ab') as fp:
+                fp.write(line.encode('UTF-8'))
+                fp.flush()
+                os.fsync(fp.fileno())
+    # end log
+
+
+    def state(self) -> dict:
+        """ collect what was done in the last, unfinished upload
+            of the record to the server
+
+            return:
+            a dict with:
+            'link':         the link of the created experiment or ''
+            'patched':      dict of the fields already sent, with the
+                            value_sha256 of what was sent (None in
+                            journals of older versions)
+            'attachments':  dict of file name: {'sha256', 'link'}
+            'locked':       bool, the experiment was locked
+            an empty dict if there is nothing to continue
+        """
+        with _journal_lock:
+            entries = list(_read_journal(self.path).get(
+                                (self.record, self.server), []))
+
+        # only what is after the last finished upload counts
+        res = {}
+        for entry in entries:
+            step = entry['step']
+            if step == 'done':
+                res = {}
+                continue
+
+            if not res:
+                res = {'link': '',
+                       'patched': {},
+                       'attachments': {},
+                       'locked': False}
+
+            if step == 'created':
+                res['link'] = entry['link']
+            elif step == 'patched':
+                hashes = entry.get('sha256', {})
+                res['patched'].update({i: hashes.get(i)
+                                       for i in entry['fields']})
+            elif step == 'attachment':
+                res['attachments'][entry['file']] = {
+                        'sha256': entry['sha256'],
+                        'link': entry.get('link', '')}
+            elif step == 'locked':
+                res['locked'] = True
+
+        if res and not res['link']:
+            return {}
+
+        return res
+    # end state
+# end of class UploadJournal
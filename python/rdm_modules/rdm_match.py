@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+""" Compiled name matching for the folder listings: the searchPattern
+    and ignore settings of the configuration are turned into a set of
+    exact names and a single regular expression once, and reused for
+    every listing.
+
+    Pattern forms (searchPattern, a string or a list of strings at
+    every level, any of them may match):
+    - 'abc'         names starting with abc (empty: everything)
+    - 'yaml$'       names ending with yaml
+    - '*.yaml'      a glob pattern, used if the pattern has *, ? or [
+    - 'glob:x'      x is a glob pattern
+    - 're:x'        x is a regular expression found anywhere in the name
+
+    Ignore entries are the same, except that a plain string is the full
+    name to be ignored.
+
+    The listings only use the names and the file type the system returns
+    with the folder content (DirEntry.is_dir() / is_file() use the cached
+    d_type), so no file is checked again one by one.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import fnmatch
+import functools
+import os
+import re
+
+__all__ = ['NameMatcher', 'LevelFilter', 'compile_patterns',
+           'compile_names', 'level_filter']
+
+_glob_chars = re.compile(r'[*?\[]')
+
+
+def _as_tuple(patterns) -> tuple:
+    """ a pattern or a list of patterns as a tuple of strings
+    """
+    if patterns is None:
+        return ()
+
+    if isinstance(patterns, str):
+        return (patterns,)
+
+    return tuple(str(i) for i in patterns)
+# end _as_tuple
+
+
+def _to_regex(pattern:str) -> str|None:
+    """ the regular expression of a regex, glob or suffix pattern,
+        matched from the start of the name
+
+        return:
+        the expression string, None for a plain string
+    """
+    if pattern.startswith('re:'):
+        body = pattern[3:]
+        try:
+            re.compile(body)
+        except re.error as e:
+            raise ValueError(f'invalid pattern {pattern}: {e}') from e
+        return f'(?s:.*?)(?:{body})'
+
+    if pattern.startswith('glob:'):
+        return fnmatch.translate(pattern[5:])
+
+    if _glob_chars.search(pattern):
+        return fnmatch.translate(pattern)
+
+    if pattern and pattern[-1] == '$':
+        return f'(?s:.*){re.escape(pattern[:-1])}\\Z'
+
+    return None
+# end _to_regex
+
+
+class NameMatcher():
+    """ a compiled set of name patterns, call it with a name
+    """
+
+    def __init__(self, patterns, plain:str= 'prefix') -> None:
+        """ compile the patterns
+
+            parameters:
+            patterns:   a pattern or a list of them
+            plain:      how plain strings match: 'prefix' (the start
+                        of the name) or 'exact' (the full name)
+
+            raise:
+            ValueError if a regular expression is invalid
+        """
+        self.patterns = _as_tuple(patterns)
+
+        exact = set()
+        prefixes = []
+        expressions = []
+        for pattern in self.patterns:
+            expression = _to_regex(pattern)
+            if expression is not None:
+                expressions.append(expression)
+            elif plain == 'exact':
+                exact.add(pattern)
+            else:
+                prefixes.append(pattern)
+
+        # an empty prefix takes everything
+        self.match_all = '' in prefixes
+        self.exact = frozenset(exact)
+        self.prefixes = tuple(prefixes)
+        self.regex = re.compile('|'.join(f'(?:{i})' for i in expressions))\
+                     if expressions else None
+    # end __init__
+
+
+    def __bool__(self) -> bool:
+        """ False if the matcher has no patterns at all
+        """
+        return bool(self.patterns)
+    # end __bool__
+
+
+    def __call__(self, name:str) -> bool:
+        """ True if the name matches any of the patterns
+        """
+        if self.match_all or name in self.exact:
+            return True
+
+        if self.prefixes and name.startswith(self.prefixes):
+            return True
+
+        return self.regex is not None and self.regex.match(name) is not None
+    # end __call__
+
+
+    def __repr__(self) -> str:
+        return f'NameMatcher({list(self.patterns)})'
+    # end __repr__
+# end of class NameMatcher
+
+
+@functools.lru_cache(maxsize= 64)
+def _compiled(patterns:tuple, plain:str) -> NameMatcher:
+    """ the compiled matchers, reused by all listings
+    """
+    return NameMatcher(patterns, plain)
+# end _compiled
+
+
+def compile_patterns(patterns) -> NameMatcher:
+    """ a matcher for searchPattern: plain strings match the start
+        of the name, an empty list matches everything
+    """
+    patterns = _as_tuple(patterns)
+    return _compiled(patterns if patterns else ('',), 'prefix')
+# end compile_patterns
+
+
+def compile_names(names) -> NameMatcher:
+    """ a matcher for ignore: plain strings match the full name,
+        an empty list matches nothing
+    """
+    return _compiled(_as_tuple(names), 'exact')
+# end compile_names
+
+
+class LevelFilter():
+    """ what is listed at a level of the tree: folders or files,
+        their patterns and the ignored names
+    """
+
+    def __init__(self, target:str, patterns, ignore) -> None:
+        """ parameters:
+            target:     'dir' or 'file'
+            patterns:   searchPattern of the level, used for files only
+            ignore:     the names not to be listed
+        """
+        self.target = target if target else 'dir'
+        self.wanted = compile_patterns(patterns if self.target == 'file'
+                                       else None)
+        self.ignored = compile_names(ignore)
+    # end __init__
+
+
+    def accept(self, name:str, is_dir:bool) -> bool:
+        """ True if an item of the folder is to be listed
+        """
+        if is_dir != (self.target == 'dir'):
+            return False
+
+        return self.wanted(name) and not self.ignored(name)
+    # end accept
+
+
+    def select(self, content) -> list:
+        """ the accepted names from (name, is_dir) pairs, in their order
+        """
+        return [name for name, is_dir in content if self.accept(name, is_dir)]
+    # end select
+
+
+    def entries(self, entries) -> list:
+        """ the accepted names of DirEntry items (e.g. os.scandir()),
+            checking the name first and the type using the cached d_type
+        """
+        wanted = self.wanted
+        ignored = self.ignored
+        if self.target == 'dir':
+            return [i.name for i in entries
+                    if not ignored(i.name) and i.is_dir()]
+
+        return [i.name for i in entries
+                if wanted(i.name) and not ignored(i.name) and i.is_file()]
+    # end entries
+
+
+    def scan(self, path:str) -> list:
+        """ the sorted accepted names in a folder
+        """
+        with os.scandir(path) as it:
+            res = self.entries(it)
+
+        res.sort()
+        return res
+    # end scan
+# end of class LevelFilter
+
+
+@functools.lru_cache(maxsize= 32)
+def _level_filter(target:str, patterns:tuple, ignore:tuple) -> LevelFilter:
+    """ the filters, reused by all listings
+    """
+    return LevelFilter(target, patterns, ignore)
+# end _level_filter
+
+
+def level_filter(config:dict, level:int) -> LevelFilter:
+    """ the filter of a level of the tree from searchTargets,
+        searchPattern and ignore in the configuration
+
+        parameters:
+        config:     the configuration dict
+        level:      the depth in the folder tree
+
+        return:
+        a LevelFilter, compiled only when the settings changed
+    """
+    # config_element, but a list of patterns may be the element
+    def element(key:str):
+        value = config[key] if key in config else ''
+        if isinstance(value, list):
+            return value[level] if len(value) > level else ''
+        return value
+
+    return _level_filter(element('searchTargets') or 'dir',
+                         _as_tuple(element('searchPattern')),
+                         _as_tuple(config['ignore'] if 'ignore' in config
+                                   else []))
+# end level_filter
@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+""" Create many projects and samples at once from a manifest, e.g. at
+    the start of a grant. The folders are made the same way as adding
+    a project or a sample in the main window: the folder list template
+    of the level is created, and the readme is written from its template
+    using replace_text.
+
+    Provisioning is idempotent: existing folders and readme files are
+    kept as they are, so a manifest can be run again after adding lines
+    to it. A dry run only reports what would be created.
+
+    Manifests are YAML:
+        projects:
+          - name: TH26-001
+            samples: [TH26-001-01, TH26-001-02]
+          - name: TH26-002
+    (a plain list of projects, or a dict of project: [samples] work too)
+    or CSV files with a project and a sample column (named after the
+    searchNames of the configuration), one line per sample.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from rdm_modules.project_config import replace_text
+from rdm_modules.project_dir import missing_folders
+from rdm_modules.rdm_tree import config_element
+from rdm_modules.rdm_yaml import safe_load_file
+
+__all__ = ['read_manifest', 'plan_provision', 'format_plan', 'provision']
+
+
+def _name_list(items) -> list:
+    """ sample names from a list of strings or dicts with a name
+    """
+    if items is None:
+        return []
+    if isinstance(items, (str, int, float)):
+        items = [items]
+
+    res = []
+    for i in items:
+        if isinstance(i, dict):
+            i = i.get('name', '')
+        i = str(i).strip()
+        if i and i not in res:
+            res.append(i)
+
+    return res
+# end _name_list
+
+
+def read_manifest(path:str, config:dict|None= None) -> list:
+    """ read a YAML or CSV manifest
+
+        parameters:
+        path:       the manifest file, .csv files are read as CSV,
+                    anything else as YAML
+        config:     the configuration, its searchNames are the
+                    column names of CSV files
+
+        return:
+        a list of {'name': project, 'samples': [names]} in the order
+        of the manifest, every project only once
+    """
+    projects = {}
+
+    if path.lower().endswith('.csv'):
+        names = config.get('searchNames', []) if config else []
+        key_project = names[0] if len(names) > 0 else 'project'
+        key_sample = names[1] if len(names) > 1 else 'sample'
+
+        with open(path, 'rt', encoding='utf-8-sig', newline='') as fp:
+            reader = csv.DictReader(fp)
+            fields = reader.fieldnames or []
+            if key_project not in fields:
+                raise ValueError(f'{path} has no {key_project} column')
+
+            for row in reader:
+                project = (row.get(key_project) or '').strip()
+                if not project:
+                    continue
+                samples = projects.setdefault(project, [])
+                sample = (row.get(key_sample) or '').strip()
+                if sample and sample not in samples:
+                    samples.append(sample)
+
+        return [{'name': k, 'samples': v} for k, v in projects.items()]
+
+    data = safe_load_file(path)
+    if isinstance(data, dict) and 'projects' in data:
+        data = data['projects']
+
+    if isinstance(data, dict):
+        data = [{'name': k, 'samples': v} for k, v in data.items()]
+
+    if not isinstance(data, list):
+        raise ValueError(f'{path} does not contain a list of projects')
+
+    for i in data:
+        if isinstance(i, dict):
+            name = str(i.get('name', '')).strip()
+            samples = _name_list(i.get('samples'))
+        else:
+            name = str(i).strip()
+            samples = []
+
+        if not name:
+            continue
+        known = projects.setdefault(name, [])
+        known += [j for j in samples if j not in known]
+
+    return [{'name': k, 'samples': v} for k, v in projects.items()]
+# end read_manifest
+
+
+def _check_name(name:str) -> None:
+    """ a project or sample name must be a single folder name
+    """
+    if (name in ('.', '..') or '/' in name or '\\' in name
+        or os.path.isabs(name)):
+        raise ValueError(f'invalid folder name: {name}')
+# end _check_name
+
+
+def _template_path(config:dict, key:str, level:int) -> str:
+    """ the template file of a level from templateDir and key,
+        '' if there is none
+    """
+    name = config_element(config, key, level)
+    template_dir = config_element(config, 'templateDir', level)
+    if not name or not template_dir:
+        return ''
+
+    return os.path.abspath(os.path.join(template_dir, name))
+# end _template_path
+
+
+def _plan_item(config:dict, path:str, level:int) -> dict:
+    """ what is missing for a project or sample folder
+
+        return:
+        a dict with the 'path', the 'level', the missing 'folders'
+        and the 'readme' path if it has to be written
+    """
+    folders = missing_folders(path,
+                              _template_path(config, 'templates', level))
+
+    readme = ''
+    readme_name = config_element(config, 'readme', level)
+    template = _template_path(config, 'defaultTemplate', level)
+    if readme_name and template and os.path.isfile(template):
+        readme = os.path.join(path, readme_name)
+        if os.path.exists(readme):
+            readme = ''
+
+    return {'path': path, 'level': level, 'folders': folders, 'readme': readme}
+# end _plan_item
+
+
+def plan_provision(manifest:list, config:dict) -> list:
+    """ find what has to be created for a manifest
+
+        parameters:
+        manifest:   the list from read_manifest
+        config:     the configuration dict
+
+        return:
+        a list of items (dicts of 'path', 'level', 'folders' and
+        'readme', see _plan_item), projects before their samples;
+        items with nothing to do are included with empty lists
+    """
+    project_dir = os.path.abspath(os.path.expanduser(config['projectDir']))
+    sample_folder = config_element(config, 'searchFolders', 1)
+
+    res = []
+    for project in manifest:
+        _check_name(project['name'])
+        project_path = os.path.join(project_dir, project['name'])
+        res.append(_plan_item(config, project_path, 0))
+
+        for sample in project['samples']:
+            _check_name(sample)
+            res.append(_plan_item(config,
+                                  os.path.join(project_path,
+                                               sample_folder,
+                                               sample),
+                                  1))
+
+    return res
+# end plan_provision
+
+
+def format_plan(plan:list, config:dict) -> str:
+    """ the plan as a diff like text: + for what would be created,
+        paths relative to the projectDir
+    """
+    project_dir = os.path.abspath(os.path.expanduser(config['projectDir']))
+    lines = []
+    unchanged = 0
+    for item in plan:
+        if not item['folders'] and not item['readme']:
+            unchanged += 1
+            continue
+
+        lines += [f'+ {os.path.relpath(i, project_dir)}{os.sep}'
+                  for i in item['folders']]
+        if item['readme']:
+            lines.append(f'+ {os.path.relpath(item["readme"], project_dir)}')
+
+    lines.append(f'# {len(plan) - unchanged} to create, '
+                 f'{unchanged} already complete')
+    return '\n'.join(lines)
+# end format_plan
+
+
+def _create_item(item:dict, config:dict) -> dict:
+    """ create the folders and the readme of a plan item
+
+        return:
+        a dict with the number of 'folders' and 'readmes' created
+    """
+    for i in item['folders']:
+        os.makedirs(i, exist_ok= True)
+
+    readmes = 0
+    if item['readme']:
+        template = _template_path(config, 'defaultTemplate', item['level'])
+        with open(template, 'rt', encoding='UTF-8') as fp:
+            txt = fp.read()
+
+        txt = replace_text(txt, config, item['path'])
+        # 'x' keeps a readme written meanwhile by somebody else
+        try:
+            with open(item['readme'], 'xt', encoding='UTF-8') as fp:
+                fp.write(txt)
+            readmes = 1
+        except FileExistsError:
+            pass
+
+    return {'folders': len(item['folders']), 'readmes': readmes}
+# end _create_item
+
+
+def provision(manifest:list,
+              config:dict,
+              dry_run:bool= False,
+              workers:int= 8) -> dict:
+    """ create the projects and samples of a manifest in parallel
+
+        parameters:
+        manifest:   the list from read_manifest
+        config:     the configuration dict
+        dry_run:    only plan, do not create anything
+        workers:    number of folders created at the same time
+
+        return:
+        a summary dict with the number of 'projects', 'samples',
+        created 'folders' and 'readmes', the 'unchanged' items,
+        the 'failed' ones with their errors, and the 'plan' text
+        of a dry run
+    """
+    # replace_text needs the projectDir as in the paths
+    config = dict(config)
+    config['projectDir'] = os.path.abspath(
+            os.path.expanduser(config['projectDir']))
+
+    plan = plan_provision(manifest, config)
+    todo = [i for i in plan if i['folders'] or i['readme']]
+
+    summary = {'projects': len(manifest),
+               'samples': sum(len(i['samples']) for i in manifest),
+               'folders': 0,
+               'readmes': 0,
+               'unchanged': len(plan) - len(todo),
+               'failed': []}
+
+    if dry_run:
+        summary['plan'] = format_plan(plan, config)
+        return summary
+
+    def run(item:dict) -> tuple:
+        # one broken folder must not stop the others
+        # pylint: disable=broad-exception-caught
+        try:
+            return (item, _create_item(item, config), None)
+        except Exception as e:
+            return (item, None, repr(e))
+    # end run
+
+    # the projects first, their samples are inside them
+    for level in [0, 1]:
+        items = [i for i in todo if i['level'] == level]
+        if not items:
+            continue
+
+        with ThreadPoolExecutor(max_workers= max(workers, 1)) as pool:
+            for item, res, error in pool.map(run, items):
+                if error is not None:
+                    summary['failed'].append({'path': item['path'],
+                                              'error': error})
+                    continue
+                summary['folders'] += res['folders']
+                summary['readmes'] += res['readmes']
+
+    return summary
+# end provision
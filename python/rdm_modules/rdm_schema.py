@@ -0,0 +1,401 @@
+#!/usr/bin/env python
+""" Compile a merged template to a checked, read-only schema.
+
+    The templates are plain dicts, and every user of them (the form
+    builder, the record merger, the uploaders) had to find out again
+    which keys are form fields, what their type means, and what extra
+    settings (units, options, form of a subset) they have. A mistake in
+    a template, like a misspelled type or a select without options,
+    showed up only as a broken form.
+
+    compile_template() does this once: every problem of the template is
+    reported together in a TemplateError, and the result is a Schema of
+    Field objects, which cannot be changed, so the same one can be shared
+    by all windows and threads. Schema.template() gives a fresh, editable
+    copy of the template dict for the code working on dicts.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+from types import MappingProxyType
+
+__all__ = ['TemplateError', 'field_types', 'input_type', 'Field', 'Schema',
+           'compile_template']
+
+
+# the field types of the templates:
+# units:    a list of units may be selected with the value
+# options:  a list of options must be defined
+# form:     a form of fields must be defined (subset)
+# input:    the closest HTML input type, used by the ELN uploaders
+field_types = {
+        'text':         {'units': True, 'input': 'text'},
+        'url':          {'units': True, 'input': 'url'},
+        'numeric':      {'units': True, 'input': 'number'},
+        'integer':      {'units': True, 'input': 'number'},
+        'list':         {'units': True, 'input': 'text'},
+        'numericlist':  {'units': True, 'input': 'text'},
+        'multiline':    {'input': 'text'},
+        'select':       {'options': True, 'input': 'select'},
+        'multiselect':  {'options': True, 'input': 'select'},
+        'checkbox':     {'input': 'checkbox'},
+        'file':         {'input': 'text'},
+        'date':         {'input': 'datetime-local'},
+        'subset':       {'form': True, 'input': 'text'}
+        }
+
+
+class TemplateError(ValueError):
+    """ a template which cannot be used, with all its problems
+    """
+
+    def __init__(self, problems:list, name:str= '') -> None:
+        """ parameters:
+            problems:   list of messages
+            name:       the name of the template
+        """
+        self.problems = list(problems)
+        self.name = name
+        super().__init__(f'{name if name else "template"}: '
+                         + '; '.join(self.problems))
+    # end __init__
+# end of class TemplateError
+
+
+def input_type(field_type:str) -> str:
+    """ the HTML input type of a field type, 'text' if unknown
+    """
+    if field_type in field_types:
+        return field_types[field_type]['input']
+
+    return 'text'
+# end input_type
+
+
+def _freeze(data):
+    """ a read-only copy of a YAML tree: dicts become mapping
+        proxies, lists become tuples
+    """
+    if isinstance(data, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in data.items()})
+
+    if isinstance(data, (list, tuple)):
+        return tuple(_freeze(i) for i in data)
+
+    return data
+# end _freeze
+
+
+def _thaw(data):
+    """ an editable copy of a frozen tree
+    """
+    if isinstance(data, MappingProxyType):
+        return {k: _thaw(v) for k, v in data.items()}
+
+    if isinstance(data, tuple):
+        return [_thaw(i) for i in data]
+
+    return data
+# end _thaw
+
+
+class Field():
+    """ a form field of a template, read only
+    """
+
+    __slots__ = ('name', 'type', 'doc', 'required', 'value',
+                 'unit', 'units', 'options', 'extension', 'form')
+
+    def __init__(self, name:str, **kwargs) -> None:
+        """ parameters:
+            name:       the key of the field
+            kwargs:     type, doc, required, value, unit, units (tuple),
+                        options (tuple), extension, form (Schema of
+                        a subset)
+        """
+        object.__setattr__(self, 'name', name)
+        for k in self.__slots__[1:]:
+            object.__setattr__(self, k, kwargs.get(k))
+    # end __init__
+
+
+    def __setattr__(self, key, value):
+        raise AttributeError('a Field cannot be changed')
+
+
+    def __repr__(self) -> str:
+        return f'Field({self.name!r}, {self.type!r})'
+# end of class Field
+
+
+class Schema():
+    """ a compiled template: its fields, its fixed entries and groups
+        in the order of the template, read only
+    """
+
+    def __init__(self,
+                 source:dict,
+                 fields:dict,
+                 name:str= '',
+                 problems:list|None= None) -> None:
+        """ use compile_template() to make one
+
+            parameters:
+            source:     the template dict, it is copied
+            fields:     key: Field for the form fields
+            name:       name of the template
+            problems:   the problems found by a lenient compile
+        """
+        object.__setattr__(self, '_source', _freeze(source))
+        object.__setattr__(self, 'fields', MappingProxyType(dict(fields)))
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'problems',
+                           tuple(problems) if problems else ())
+        object.__setattr__(self, 'constants', MappingProxyType(
+                {k: v for k, v in self._source.items() if k not in fields}))
+        object.__setattr__(self, 'groups', tuple(
+                k for k, v in self.constants.items()
+                if isinstance(v, str) and v.lower() in ['group', 'group_id']))
+    # end __init__
+
+
+    def __setattr__(self, key, value):
+        raise AttributeError('a Schema cannot be changed')
+
+
+    def __contains__(self, key) -> bool:
+        return key in self.fields
+
+
+    def __getitem__(self, key) -> Field:
+        return self.fields[key]
+
+
+    def __iter__(self):
+        """ the fields in the order of the template
+        """
+        return iter(self.fields.values())
+
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+
+    def __repr__(self) -> str:
+        return f'Schema({self.name!r}, {len(self.fields)} fields)'
+
+
+    def keys(self) -> tuple:
+        """ all keys of the template in order, fields and fixed entries
+        """
+        return tuple(self._source.keys())
+    # end keys
+
+
+    def of_type(self, field_type:str) -> tuple:
+        """ the fields of a type, e.g. all 'file' fields
+        """
+        return tuple(i for i in self.fields.values() if i.type == field_type)
+    # end of_type
+
+
+    def template(self) -> dict:
+        """ a new, editable copy of the template dict
+        """
+        return _thaw(self._source)
+    # end template
+
+
+    def validate(self, record:dict, prefix:str= '') -> list:
+        """ check the values of a record against the fields
+
+            parameters:
+            record:     a record, either with plain values or with
+                        full fields (dicts with type and value)
+            prefix:     put before the keys in the messages
+
+            return:
+            a list of problems, empty if the record is fine
+        """
+        if not isinstance(record, dict):
+            return [f'{prefix}the record is not a dict']
+
+        problems = []
+        for key, field in self.fields.items():
+            value = record.get(key)
+            unit = None
+            if isinstance(value, dict):
+                unit = value.get('unit')
+                value = value.get('value')
+
+            # values with units are [value, unit] in subsets,
+            # an empty one is [None, unit]
+            if (field.units and isinstance(value, list) and len(value) == 2
+                and isinstance(value[1], str) and field.type != 'list'):
+                value, unit = value
+
+            if value is None or value == '' or value == []:
+                if field.required:
+                    problems.append(f'{prefix}{key} is required')
+                continue
+
+            problem = _check_value(field, value, unit)
+            if problem:
+                problems.append(f'{prefix}{key}: {problem}')
+
+            if field.type == 'subset' and field.form is not None\
+                    and isinstance(value, list):
+                for i, row in enumerate(value):
+                    problems += field.form.validate(row,
+                                                    f'{prefix}{key}[{i}]/')
+
+        return problems
+    # end validate
+# end of class Schema
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_value(field:Field, value, unit:str|None) -> str:
+    """ check a value of a field
+
+        return:
+        the problem or '' if the value is fine
+    """
+    if unit is not None and field.units and unit not in field.units:
+        return f'unit {unit} is not one of {list(field.units)}'
+
+    t = field.type
+    if t == 'numeric' and not _is_number(value):
+        return f'{value!r} is not a number'
+
+    if t == 'integer' and not (isinstance(value, int)
+                               and not isinstance(value, bool)):
+        return f'{value!r} is not an integer'
+
+    if t == 'numericlist':
+        if not isinstance(value, list) or not all(_is_number(i) for i in value):
+            return f'{value!r} is not a list of numbers'
+
+    if t == 'checkbox' and not isinstance(value, bool):
+        return f'{value!r} is not true or false'
+
+    if t in ['select', 'multiselect']:
+        options = [str(i) for i in field.options]
+        values = value if isinstance(value, list) else [value]
+        if t == 'select' and isinstance(value, list):
+            return 'a single option is allowed'
+        wrong = [i for i in values if str(i) not in options]
+        if wrong:
+            return f'{wrong} not in the options'
+
+    if t == 'subset' and not isinstance(value, list):
+        return 'a subset must be a list of rows'
+
+    return ''
+# end _check_value
+
+
+def _compile_field(key, v:dict, problems:list) -> Field:
+    """ check a field definition and make its Field
+    """
+    t = v['type']
+    if not isinstance(t, str) or t not in field_types:
+        problems.append(f'{key}: unknown type {t!r}')
+        kind = {}
+    else:
+        kind = field_types[t]
+
+    required = v.get('required', False)
+    if required is None:
+        required = False
+    if not isinstance(required, bool):
+        problems.append(f'{key}: required must be true or false')
+
+    options = None
+    if kind.get('options'):
+        options = v.get('options')
+        if not isinstance(options, list) or not options:
+            problems.append(f'{key}: {t} needs a list of options')
+            options = []
+        options = tuple(options)
+
+    units = v.get('units')
+    unit = v.get('unit')
+    if units is not None:
+        if isinstance(units, str):
+            units = [units]
+        if (not isinstance(units, list) or not units
+            or not all(isinstance(i, str) and i.strip() for i in units)):
+            problems.append(f'{key}: units must be a list of unit names')
+            units = None
+        elif not kind.get('units') and kind:
+            problems.append(f'{key}: {t} fields cannot have units')
+            units = None
+        else:
+            units = tuple(units)
+    # the selected unit of a record is checked by validate(), the
+    # form builder takes any unit, so old records stay readable
+
+    form = None
+    if kind.get('form'):
+        if not isinstance(v.get('form'), dict) or not v['form']:
+            problems.append(f'{key}: subset needs a form')
+        else:
+            # the problems of the sub-form are reported with this one
+            form = compile_template(v['form'], str(key), strict= False)
+            problems += [f'{key}/{i}' for i in form.problems]
+
+    return Field(key,
+                 type= t,
+                 doc= v.get('doc', ''),
+                 required= bool(required),
+                 value= _freeze(v.get('value')),
+                 unit= unit,
+                 units= units,
+                 options= options,
+                 extension= v.get('extension', 'yaml'),
+                 form= form)
+# end _compile_field
+
+
+def compile_template(template:dict,
+                     name:str= '',
+                     strict:bool= True) -> Schema:
+    """ check a merged template and compile it to a Schema
+
+        parameters:
+        template:   the template dict (default template merged),
+                    or a full record, which contains its template
+        name:       the name of the template for the messages
+        strict:     raise TemplateError for any problem, if False,
+                    the problems are in Schema.problems
+
+        return:
+        the Schema
+
+        raise:
+        TemplateError listing every problem found, if strict
+    """
+    if not isinstance(template, dict):
+        raise TemplateError(['the template is not a dict'], name)
+
+    if not name and isinstance(template.get('template'), str):
+        name = template['template']
+
+    problems = []
+    fields = {}
+    for k, v in template.items():
+        if isinstance(v, dict) and 'type' in v:
+            fields[k] = _compile_field(k, v, problems)
+
+    if problems and strict:
+        raise TemplateError(problems, name)
+
+    return Schema(template, fields, name, problems)
+# end compile_template
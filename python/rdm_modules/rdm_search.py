@@ -0,0 +1,600 @@
+#!/usr/bin/env python
+""" Search in the experiment records of the project tree.
+    Every record is read with its templates (as read_record does), and
+    its fields, including those in subsets, are put into an inverted
+    index in an SQLite database in the configuration folder:
+    - every word of every value, with the name of the field
+    - the values of numeric and integer fields, converted to the base
+      unit (e.g. 5 nm is stored as 5E-9 m), so ranges can be searched
+      independent of the unit used in the record
+
+    The index is updated incrementally: a record is read again only if
+    its modification time or size changed.
+
+    Queries are a list of conditions separated by spaces, all must match:
+        SEM                     a word starting with SEM in any field
+        "Au/Pd"                 all words of the text in any field
+        coating:Au              a word starting with Au in field coating
+        "glue type"=carbon      the word carbon in field glue type
+        "coating thickness">5nm numeric comparison, also <, <=, >=
+        "coating thickness"=2..10nm     a range, limits included
+        temperature=25          numeric equality if the value is a number
+    Field names are case insensitive, quote them if they contain spaces.
+    Numbers without a unit are compared to the values as they are in the
+    records, numbers with a unit are compared in the base unit.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import os
+import re
+import sqlite3
+import threading
+
+from rdm_modules.project_config import get_config_dir
+from rdm_modules.rdm_fields import FieldIndex
+from rdm_modules.rdm_schema import TemplateError
+from rdm_modules.rdm_templates import read_record
+from rdm_modules.rdm_trace import get_logger
+from rdm_modules.rdm_tree import (config_element, record_level, iter_records)
+from rdm_modules.rdm_yaml import safe_load_file
+
+__all__ = ['search_name', 'parse_unit', 'parse_quantity', 'record_fields',
+           'parse_query', 'SearchIndex', 'get_search_index']
+
+log = get_logger('search')
+
+search_name = 'rdm_search.sqlite'
+
+# increment it if the tables or the indexing change,
+# the old index is dropped then
+schema_version = 1
+
+_schema = """
+CREATE TABLE IF NOT EXISTS docs (
+    path    TEXT PRIMARY KEY,
+    mtime   INTEGER,
+    size    INTEGER
+);
+CREATE TABLE IF NOT EXISTS terms (
+    term    TEXT NOT NULL,
+    field   TEXT NOT NULL,
+    path    TEXT NOT NULL,
+    PRIMARY KEY (term, field, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS terms_field ON terms (field, term);
+CREATE INDEX IF NOT EXISTS terms_path ON terms (path);
+CREATE TABLE IF NOT EXISTS numbers (
+    field   TEXT NOT NULL,
+    raw     REAL,
+    base    TEXT,
+    value   REAL,
+    path    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS numbers_value ON numbers (field, base, value);
+CREATE INDEX IF NOT EXISTS numbers_raw ON numbers (field, raw);
+CREATE INDEX IF NOT EXISTS numbers_path ON numbers (path);
+"""
+
+# keys of a record which are not data
+_skip_keys = ['doc', 'full record', 'uploaded', 'no_default']
+
+_numeric_types = ['numeric', 'integer', 'numericlist']
+
+_prefixes = {'Y': 1E24, 'Z': 1E21, 'E': 1E18, 'P': 1E15, 'T': 1E12,
+             'G': 1E9, 'M': 1E6, 'k': 1E3, 'h': 1E2, 'da': 1E1,
+             'd': 1E-1, 'c': 1E-2, 'm': 1E-3, 'u': 1E-6, 'µ': 1E-6,
+             'μ': 1E-6, 'n': 1E-9, 'p': 1E-12, 'f': 1E-15, 'a': 1E-18}
+
+_base_units = ['m', 'g', 's', 'A', 'K', 'mol', 'cd', 'Hz', 'N', 'Pa', 'J',
+               'W', 'C', 'V', 'F', 'Ohm', 'Ω', 'S', 'T', 'H', 'Wb', 'L',
+               'eV', 'bar', 'Wh', 'Da', 'Gy', 'Sv', 'Bq', 'lm', 'lx', 'rad']
+
+# units which are not made of a prefix and a base unit,
+# checked before the prefixes (h is an hour, not a hecto)
+_other_units = {'min': (60.0, 's'),
+                'h': (3600.0, 's'),
+                'd': (86400.0, 's'),
+                'l': (1.0, 'L'),
+                'Å': (1E-10, 'm'),
+                'atm': (101325.0, 'Pa'),
+                'Torr': (133.322, 'Pa'),
+                'rpm': (1/60, 'Hz'),
+                '°C': (1.0, '°C'),
+                '%': (1.0, '%')}
+
+_word = re.compile(r'\w+')
+_quantity = re.compile(r'^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*(.*?)\s*$')
+_power = re.compile(r'^(.+?)\^?([23])$')
+_condition = re.compile(r"""\s*(?:(?:"(?P<qfield>[^"]+)"|(?P<field>[^\s"<>=:]+))"""
+                        r"""\s*(?P<op><=|>=|<|>|=|:)\s*)?"""
+                        r"""(?:"(?P<qvalue>[^"]*)"|(?P<value>\S+))""")
+
+
+def _parse_simple_unit(unit:str) -> tuple:
+    """ a unit without division, like nm, mg or cm2
+
+        return:
+        a tuple of (factor, base unit)
+    """
+    unit = unit.strip()
+    if not unit:
+        return (1.0, '')
+
+    if unit in _other_units:
+        return _other_units[unit]
+
+    if unit in _base_units:
+        return (1.0, unit)
+
+    m = _power.match(unit)
+    if m and m.group(1) != unit:
+        factor, base = _parse_simple_unit(m.group(1))
+        power = int(m.group(2))
+        return (factor**power, f'{base}{power}')
+
+    for prefix in sorted(_prefixes, key= len, reverse= True):
+        if unit.startswith(prefix):
+            rest = unit[len(prefix):]
+            if rest in _base_units:
+                return (_prefixes[prefix], rest)
+            if rest in _other_units and _other_units[rest][1] == 'L':
+                return (_prefixes[prefix], 'L')
+
+    # unknown, use as it is
+    return (1.0, unit)
+# end _parse_simple_unit
+
+
+def parse_unit(unit:str|None) -> tuple:
+    """ take a unit and find its factor relative to the base unit,
+        e.g. nm is (1E-9, 'm'), mg/ml is (1.0, 'g/L')
+        Unknown units are their own base unit.
+
+        parameters:
+        unit:   the unit as string
+
+        return:
+        a tuple of (factor, base unit)
+    """
+    if not unit:
+        return (1.0, '')
+
+    if '/' in unit:
+        num, den = unit.split('/', 1)
+        f1, b1 = _parse_simple_unit(num)
+        f2, b2 = _parse_simple_unit(den)
+        if f2 == 0:
+            return (1.0, unit.strip())
+        return (f1/f2, f'{b1}/{b2}')
+
+    return _parse_simple_unit(unit)
+# end parse_unit
+
+
+def parse_quantity(text:str) -> tuple|None:
+    """ split a text like 5nm or '1.5 mg/ml' to a number and a unit
+
+        return:
+        a tuple of (number, unit) or None if it is not a number
+    """
+    m = _quantity.match(str(text))
+    if not m:
+        return None
+
+    return (float(m.group(1)), m.group(2))
+# end parse_quantity
+
+
+def record_fields(record:dict):
+    """ generate every field of a record, including those in subsets
+
+        parameters:
+        record:     a record as read_record returns it, or a simple one
+
+        yield:
+        (field name, type, value, unit) tuples, where type and unit
+        may be None if they are not known
+    """
+    for path, this_type, value, unit in FieldIndex(record):
+        if this_type in ['subset', 'group']:
+            continue
+
+        if len(path) == 1 and str(path[0]).lower() in _skip_keys:
+            continue
+
+        yield (path[-1], this_type, value, unit)
+# end record_fields
+
+
+def parse_query(query:str) -> list:
+    """ split up a query to conditions, see the module description
+
+        parameters:
+        query:  the query text
+
+        return:
+        a list of dicts with 'field' (lower case or None), 'op'
+        (None, ':', '=', '<', '<=', '>', '>=') and 'value'
+    """
+    res = []
+    pos = 0
+    query = query.strip()
+    while pos < len(query):
+        m = _condition.match(query, pos)
+        if not m or m.end() == pos:
+            break
+        pos = m.end()
+
+        field = m.group('qfield') or m.group('field')
+        value = m.group('qvalue') if m.group('qvalue') is not None\
+                else m.group('value')
+        res.append({'field': field.strip().lower() if field else None,
+                    'op': m.group('op'),
+                    'value': value})
+
+    return res
+# end parse_query
+
+
+def _tokens(text) -> list:
+    """ the lower case words of a value
+    """
+    return _word.findall(str(text).lower())
+# end _tokens
+
+
+def _prefix_range(term:str) -> tuple:
+    """ the limits of terms starting with term
+    """
+    return (term, f'{term}\U0010ffff')
+# end _prefix_range
+
+
+class SearchIndex():
+    """ an inverted index of the record fields in an SQLite database
+    """
+
+    def __init__(self, path:str) -> None:
+        """ open or create the database
+
+            parameters:
+            path:   the database file, ':memory:' for a temporary one
+        """
+        self.path = path
+        if path != ':memory:':
+            folder = os.path.dirname(path)
+            if folder and not os.path.isdir(folder):
+                os.makedirs(folder, exist_ok= True)
+
+        self._lock = threading.RLock()
+        self.db = sqlite3.connect(path,
+                                  check_same_thread= False,
+                                  isolation_level= None)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version != schema_version:
+            for table in ['docs', 'terms', 'numbers']:
+                self.db.execute(f'DROP TABLE IF EXISTS {table}')
+            self.db.execute(f'PRAGMA user_version={schema_version}')
+
+        self.db.executescript(_schema)
+    # end __init__
+
+
+    def close(self) -> None:
+        """ close the database
+        """
+        with self._lock:
+            self.db.close()
+    # end close
+
+
+    def _remove(self, path:str) -> None:
+        """ drop a record, call it holding the lock in a transaction
+        """
+        for table in ['docs', 'terms', 'numbers']:
+            self.db.execute(f'DELETE FROM {table} WHERE path = ?', (path,))
+    # end _remove
+
+
+    def add(self, path:str, record:dict, mtime:int= 0, size:int= 0) -> None:
+        """ put a record into the index, replacing what was there
+
+            parameters:
+            path:       the record file
+            record:     the content, best with its templates
+            mtime:      modification time of the file in ns
+            size:       size of the file
+        """
+        path = os.path.abspath(path)
+        terms = set()
+        numbers = []
+
+        for field, this_type, value, unit in record_fields(record):
+            field = str(field).lower()
+            values = value if isinstance(value, list) else [value]
+
+            for v in values:
+                if v is None or v == '':
+                    continue
+
+                for t in _tokens(v):
+                    terms.add((t, field, path))
+
+                # numbers are numbers in numeric fields, and in
+                # fields of unknown type
+                if (isinstance(v, bool)
+                    or (this_type is not None
+                        and this_type not in _numeric_types)):
+                    continue
+
+                if isinstance(v, (int, float)):
+                    number = float(v)
+                elif this_type in _numeric_types:
+                    q = parse_quantity(v)
+                    if q is None:
+                        continue
+                    number = q[0]
+                    if q[1] and not unit:
+                        unit = q[1]
+                else:
+                    continue
+
+                factor, base = parse_unit(unit)
+                numbers.append((field, number, base, number*factor, path))
+
+        # the file name is searchable as well
+        name = os.path.splitext(os.path.basename(path))[0]
+        for t in _tokens(name):
+            terms.add((t, 'name', path))
+
+        with self._lock:
+            self.db.execute('BEGIN')
+            self._remove(path)
+            self.db.executemany('INSERT INTO terms VALUES (?, ?, ?)', terms)
+            self.db.executemany('INSERT INTO numbers VALUES (?, ?, ?, ?, ?)',
+                                numbers)
+            self.db.execute('INSERT INTO docs VALUES (?, ?, ?)',
+                            (path, mtime, size))
+            self.db.execute('COMMIT')
+    # end add
+
+
+    def remove(self, path:str) -> None:
+        """ drop a record from the index
+        """
+        with self._lock:
+            self.db.execute('BEGIN')
+            self._remove(os.path.abspath(path))
+            self.db.execute('COMMIT')
+    # end remove
+
+
+    def update(self,
+               config:dict,
+               start:str|None= None,
+               lister= None) -> dict:
+        """ bring the index up to date under start, reading only
+            the records changed since the last update
+
+            parameters:
+            config:     the configuration dict
+            start:      a record, sample, project or the projects
+                        folder, None for the whole projectDir
+            lister:     function(path, config, level) listing a folder,
+                        e.g. RecordIndex.listing, default is scandir
+
+            return:
+            a dict with the number of 'records', and those 'indexed'
+            and 'removed'
+        """
+        if start is None:
+            start = config['projectDir']
+        start = os.path.abspath(os.path.expanduser(start))
+
+        level = record_level(config)
+        template_dir = config_element(config, 'templateDir', level)
+        default_template = config_element(config, 'defaultTemplate', level)
+        if default_template:
+            default_template = os.path.join(template_dir, default_template)
+
+        # the records below start, not those of its siblings
+        # like project_0001, or start itself if it is a record
+        low, high = _prefix_range(os.path.join(start, ''))
+        with self._lock:
+            known = {i[0]: (i[1], i[2]) for i in self.db.execute(
+                        'SELECT path, mtime, size FROM docs '
+                        'WHERE (path >= ? AND path < ?) OR path = ?',
+                        (low, high, start))}
+
+        counts = {'records': 0, 'indexed': 0, 'removed': 0}
+        kwargs = {'lister': lister} if lister is not None else {}
+        seen = set()
+        for path in iter_records(config, start, **kwargs):
+            path = os.path.abspath(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+
+            seen.add(path)
+            counts['records'] += 1
+            if known.get(path) == (st.st_mtime_ns, st.st_size):
+                continue
+
+            record = None
+            try:
+                try:
+                    record = read_record(path, default_template, template_dir)
+                except TemplateError as e:
+                    log.warning('invalid template of %s: %s', path, e)
+                # without matching templates we still have the values
+                if not record:
+                    record = safe_load_file(path)
+            # a broken record must not stop the indexing of the others
+            # pylint: disable=broad-exception-caught
+            except Exception as e:
+                log.warning('cannot read record %s: %s', path, e)
+
+            self.add(path, record if isinstance(record, dict) else {},
+                     st.st_mtime_ns, st.st_size)
+            counts['indexed'] += 1
+
+        for path in set(known) - seen:
+            self.remove(path)
+            counts['removed'] += 1
+
+        return counts
+    # end update
+
+
+    def _condition_sql(self, condition:dict) -> tuple:
+        """ turn a condition of parse_query to an SQL query of paths
+
+            return:
+            a list of (SQL, parameters) tuples, all of them must match
+        """
+        field = condition['field']
+        op = condition['op']
+        value = condition['value']
+
+        # numeric conditions
+        if field and op in ('<', '<=', '>', '>=', '='):
+            if op == '=' and '..' in value:
+                lo, hi = value.split('..', 1)
+                q_lo = parse_quantity(lo)
+                q_hi = parse_quantity(hi)
+                if q_lo is None or q_hi is None:
+                    raise ValueError(f'{value} is not a range')
+
+                # 2..10nm means both limits in nm
+                lo_unit = q_lo[1] or q_hi[1]
+                hi_unit = q_hi[1] or q_lo[1]
+                if not lo_unit:
+                    return [('SELECT path FROM numbers WHERE field = ? '
+                             'AND raw BETWEEN ? AND ?',
+                             (field, q_lo[0], q_hi[0]))]
+
+                f_lo, b_lo = parse_unit(lo_unit)
+                f_hi, b_hi = parse_unit(hi_unit)
+                if b_lo != b_hi:
+                    raise ValueError(f'{value} has different units')
+
+                return [('SELECT path FROM numbers WHERE field = ? '
+                         'AND base = ? AND value BETWEEN ? AND ?',
+                         (field, b_lo, q_lo[0]*f_lo, q_hi[0]*f_hi))]
+
+            q = parse_quantity(value)
+            if q is not None:
+                number, unit = q
+                if unit:
+                    factor, base = parse_unit(unit)
+                    column, limits = 'value', (field, base)
+                    number *= factor
+                    where = 'field = ? AND base = ? AND'
+                else:
+                    column, limits = 'raw', (field,)
+                    where = 'field = ? AND'
+
+                if op == '=':
+                    eps = abs(number)*1E-9
+                    return [(f'SELECT path FROM numbers WHERE {where} '
+                             f'{column} BETWEEN ? AND ?',
+                             limits + (number - eps, number + eps))]
+
+                return [(f'SELECT path FROM numbers WHERE {where} '
+                         f'{column} {op} ?',
+                         limits + (number,))]
+
+            if op != '=':
+                raise ValueError(f'{value} is not a number')
+
+        # text: every word must be found, starting with it for ':'
+        # or without field, exact for '='
+        res = []
+        for t in _tokens(value):
+            if op == '=':
+                res.append(('SELECT path FROM terms WHERE field = ? '
+                            'AND term = ?', (field, t)))
+            elif field:
+                res.append(('SELECT path FROM terms WHERE field = ? '
+                            'AND term >= ? AND term < ?',
+                            (field,) + _prefix_range(t)))
+            else:
+                res.append(('SELECT path FROM terms '
+                            'WHERE term >= ? AND term < ?',
+                            _prefix_range(t)))
+
+        return res
+    # end _condition_sql
+
+
+    def search(self,
+               query:str,
+               under:str|None= None,
+               limit:int|None= None) -> list:
+        """ find the records matching all conditions of a query
+
+            parameters:
+            query:  the query, see the module description
+            under:  only records in this folder or below
+            limit:  maximum number of hits
+
+            return:
+            a sorted list of record paths
+        """
+        parts = []
+        for condition in parse_query(query):
+            parts += self._condition_sql(condition)
+
+        if not parts:
+            return []
+
+        sql = ' INTERSECT '.join(i[0] for i in parts)
+        params = tuple(j for i in parts for j in i[1])
+
+        # a record matching in several fields or rows is one hit
+        sql = f'SELECT DISTINCT path FROM ({sql})'
+        if under:
+            sql = f'{sql} WHERE path >= ? AND path < ?'
+            params += _prefix_range(os.path.join(os.path.abspath(under), ''))
+        sql = f'{sql} ORDER BY path'
+        if limit:
+            sql = f'{sql} LIMIT ?'
+            params += (int(limit),)
+
+        with self._lock:
+            return [i[0] for i in self.db.execute(sql, params)]
+    # end search
+# end of class SearchIndex
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex|None:
+    """ the search index of the user in the configuration folder,
+        opened at the first call
+
+        return:
+        the SearchIndex, or None if the database cannot be used
+    """
+    global _index
+    with _index_lock:
+        if _index is None:
+            try:
+                _index = SearchIndex(os.path.join(get_config_dir(),
+                                                  search_name))
+            except (sqlite3.Error, OSError) as e:
+                log.warning('the search index cannot be opened: %s', e)
+                return None
+
+    return _index
+# end get_search_index
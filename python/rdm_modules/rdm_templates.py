@@ -14,9 +14,25 @@
 """
 
 import os
-import yaml
+import threading
+from collections import OrderedDict
 
+from rdm_modules.rdm_atomic import atomic_write
+from rdm_modules.rdm_cache import load_template
+from rdm_modules.rdm_fields import FieldIndex
+from rdm_modules.rdm_schema import (Schema, compile_template)
+from rdm_modules.rdm_trace import (get_logger, span, traced)
+from rdm_modules.rdm_yaml import (dump_record, patch_top_level, safe_load)
 
+log = get_logger('templates')
+
+# compiled templates: (template, default): (file stamps, Schema)
+_schemas = OrderedDict()
+_schemas_lock = threading.Lock()
+schema_cache_size = 64
+
+
+@traced('merge')
 def merge_templates(filename:str, default_file:str)->dict:
     """ Based on configuration and a template path, merge
         the default template and the requested template to
@@ -29,20 +45,20 @@ def merge_templates(filename:str, default_file:str)->dict:
         return:
         dict containing the template
     """
-    if not os.path.isfile(default_file):
-        print('Default template not found')
+    # templates come through the cache as private copies,
+    # so we are free to change them below
+    default_template = load_template(default_file) \
+            if default_file and os.path.isfile(default_file) else None
+    if default_template is None:
+        log.info('default template not found: %s', default_file)
         default_template = {}
-    else:
-        with open(default_file, 'rt', encoding='UTF-8') as fp:
-            default_template = yaml.safe_load(fp)
 
-    if not os.path.isfile(filename):
-        print('template not found!')
+    template = load_template(filename) \
+            if filename and os.path.isfile(filename) else None
+    if template is None:
+        log.warning('template not found: %s', filename)
         return {}
 
-    with open(filename, 'rt', encoding='UTF-8') as fp:
-        template = yaml.safe_load(fp)
-
     # allow skipping default
     nk = 'no_default'
     if nk in template \
@@ -56,6 +72,73 @@ def merge_templates(filename:str, default_file:str)->dict:
 # end merge_templates
 
 
+def _stamp(filename:str|None) -> tuple|None:
+    """ modification time and size of a file, None if it is not a file
+    """
+    if not filename:
+        return None
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+
+    return (st.st_mtime_ns, st.st_size) if os.path.isfile(filename) else None
+# end _stamp
+
+
+def get_schema(filename:str, default_file:str|None) -> Schema|None:
+    """ merge the default template and a template, and compile them
+        to a Schema (see rdm_schema). The result is kept, and compiled
+        again only if one of the files changed.
+
+        parameters:
+        filename:       the path to the template
+        default_file:   the path to the default template
+
+        return:
+        the shared, read-only Schema, or None if the template
+        is not found
+
+        raise:
+        TemplateError if the template has problems
+    """
+    key = (os.path.abspath(filename) if filename else '',
+           os.path.abspath(default_file) if default_file else '')
+    stamps = (_stamp(filename), _stamp(default_file))
+    if stamps[0] is None:
+        log.warning('template not found: %s', filename)
+        return None
+
+    with _schemas_lock:
+        if key in _schemas and _schemas[key][0] == stamps:
+            _schemas.move_to_end(key)
+            return _schemas[key][1]
+
+    merged = merge_templates(filename, default_file)
+    if not merged:
+        return None
+
+    with span('compile', template= os.path.basename(filename)):
+        schema = compile_template(merged, os.path.basename(filename))
+
+    with _schemas_lock:
+        _schemas[key] = (stamps, schema)
+        _schemas.move_to_end(key)
+        while len(_schemas) > schema_cache_size:
+            _schemas.popitem(last= False)
+
+    return schema
+# end get_schema
+
+
+def clear_schema_cache() -> None:
+    """ forget the compiled templates, e.g. to time compiling them
+    """
+    with _schemas_lock:
+        _schemas.clear()
+# end clear_schema_cache
+
+
 def list_to_dict(data:list,
                  simple:bool = True) -> dict:
     """ In results we have subsets, which are recorded
@@ -88,7 +171,7 @@ def list_to_dict(data:list,
         return {}
 
     if not isinstance(data, list):
-        print('cannot convert non list to dict!')
+        log.warning('cannot convert non list to dict')
         return data
 
 
@@ -121,7 +204,7 @@ def list_to_dict(data:list,
 
     for line in data:
         if line is None:
-            print('empty line found')
+            log.debug('empty line found')
             for i in range(len(keys)):
                 values[i].append(None)
             continue
@@ -189,7 +272,7 @@ def combine_template_data(template:dict,
                         res[k]['value'] = data[k]
                         # keep form for future use (if needed)
                     else:
-                        print('calling subset on', k)
+                        log.debug('combining subset %s', k)
                         # res[k]['value'] = combine_template_data(
                         new_input = combine_template_data(
                             v['form'],
@@ -201,8 +284,7 @@ def combine_template_data(template:dict,
                         # values out, so drop it
                         res[k].pop('form')
                 else:
-                    print('form not in template subset!')
-                    print(v)
+                    log.warning('form not in template subset %s', k)
             else:
                 res[k]['value'] = data[k]
 
@@ -224,6 +306,8 @@ def combine_template_data(template:dict,
 def find_in_record(data:dict, search:str='file')->list:
     """ make a deep search into the dict and find every field with a type
         in variable search, and return all values as a simple list.
+        The record is walked once by FieldIndex, and not changed.
+        Use FieldIndex directly to ask for several types.
 
         parameters:
         data:       dict, typically a record
@@ -238,60 +322,7 @@ def find_in_record(data:dict, search:str='file')->list:
     if not isinstance(data, dict):
         raise ValueError('inproper input type')
 
-    search = search.lower()
-
-    res = []
-    for k,v in data.items():
-        if isinstance(v, dict):
-            if 'type' in v:
-                if v['type'].lower() == search:
-                    if 'value' in v:
-                        vv = v['value']
-                        if isinstance(vv, list):
-                            res += vv
-                        else:
-                            res.append(vv)
-                    else:
-                        print(f'key found without value in {k}')
-
-                elif (v['type'] == 'subset'
-                      and 'form' in v
-                      and 'value' in v):
-                    # now, it gets tricky, because here
-                    # form contains types under keys,
-                    # value contains a list of dicts with
-                    # key: value pairs only
-                    klist = find_key_in_record(v['form'], search)
-
-                    if klist:
-                        for kk in klist:
-                            for this_vv in v['value']:
-                                if not this_vv[kk] or this_vv[kk] is None:
-                                    continue
-
-                                if isinstance(this_vv[kk], list):
-                                    res += this_vv[kk]
-                                else:
-                                    res.append(this_vv[kk])
-                        # end collecting results
-                    # now, check other subsets
-                    klist = find_key_in_record(v['form'], 'subset')
-                    if klist:
-                        vf = v['form']
-                        for kk in klist:
-                            for this_vv in v['value']:
-                                if not this_vv[kk] or this_vv[kk] is None:
-                                    continue
-
-                                this_record = vf[kk]
-                                this_record['value']= this_vv[kk]
-                                res += find_in_record(this_record, search)
-                    # end digging deeper
-            # no else
-    # end of for in data
-    # for debugging, indicate the result:
-    print('found', search,':', res)
-    return res
+    return FieldIndex(data).values(search.lower())
 # end of find_in_record
 
 
@@ -346,6 +377,9 @@ def read_record(record:str|None = None,
         Full record is defined with a 'full record': true entry and having
         at least one field with a type subfield in it.
 
+        The templates are compiled and checked by get_schema, a broken
+        template raises a TemplateError.
+
         Parameters:
         record:             path to the record or None
         default_template:   path to default template
@@ -358,8 +392,9 @@ def read_record(record:str|None = None,
     record_dict = {}
     if (record is not None
         and os.path.isfile(record)):
-        with open(record, 'rt', encoding='UTF-8') as fp:
-            record_dict = yaml.safe_load(fp)
+        with open(record, 'rt', encoding='UTF-8') as fp,\
+                span('parse', path= record):
+            record_dict = safe_load(fp)
             # if we got somehow a messy file:
             if not record_dict:
                 return {}
@@ -383,8 +418,9 @@ def read_record(record:str|None = None,
     # end constructing template path
 
     # we allow the user to disable the default template
-    temp_dict = merge_templates(template,
-                                default_template)
+    # the compiled template is shared, we work on a copy
+    schema = get_schema(template, default_template)
+    temp_dict = schema.template() if schema is not None else {}
 
     # if no record, then an empty form:
     if not record_dict:
@@ -397,34 +433,52 @@ def read_record(record:str|None = None,
     k = 'template version'
     if (k in  temp_dict and k in record_dict
         and  temp_dict[k] != record_dict[k]):
-        print('Version mismatch!')
-        print('Template has:', temp_dict[k])
-        print('Data has:', record_dict[k])
+        log.warning('version mismatch of %s: the template has %s, '
+                    'the record %s', record, temp_dict[k], record_dict[k])
         return {}
     # end if version mismatch
 
-    return combine_template_data(temp_dict,
-                                 record_dict,
-                                 simple= True)
+    with span('merge'):
+        res = combine_template_data(temp_dict,
+                                    record_dict,
+                                    simple= True)
+
+    # the upload information is not part of any template,
+    # but must survive, or we upload the record again
+    if res and 'Uploaded' in record_dict:
+        res['Uploaded'] = record_dict['Uploaded']
+
+    return res
 # end read_record
 
 
+@traced('save')
 def save_record(record:dict,
                 file_path:str,
                 overwrite:bool= True,
-                full_record:bool= True)->bool:
+                full_record:bool= True,
+                fsync:str|None= None,
+                writer= None,
+                done= None)->bool:
     """ dump a dict as a yaml file, with some tiny tuning
         to get a better formatted output.
-        Existing files would be overwritten.
+        Existing files would be overwritten, atomically: the file
+        is either the old or the new record, even after a crash.
 
         parameters
         record:     the dict to be saved
         file_path:  file to be saved
         overwrite:  Bool, if true, overwrite the file
         full_record: save everything or strip out subdicts
+        fsync:      'none', 'file' or 'dir', None for the
+                    default of rdm_atomic.fsync_policy
+        writer:     a WriteBehind queue to write the file later,
+                    its fsync policy applies then
+        done:       function(file_path, error) the writer calls
+                    once the file is written
 
         return:
-        True if done, False upon error
+        True if done (or queued), False upon error
     """
     file_path = os.path.abspath(
             os.path.expanduser(file_path)
@@ -439,7 +493,7 @@ def save_record(record:dict,
 
     if (not overwrite
         and os.path.isfile(file_path)):
-        print('File exist, will not overwwite!')
+        log.warning('file exists, will not overwrite: %s', file_path)
         return False
 
     if not full_record:
@@ -463,19 +517,72 @@ def save_record(record:dict,
             record['full record'] = True
     # end if full_record to be stripped
 
-    with open(file_path,
-              'wt',
-              encoding='UTF-8') as fp:
-        out_txt = yaml.safe_dump(record,
-                                 sort_keys= False,
-                                 allow_unicode= True,
-                                 width= 70,
-                                 default_style= None)
-        # remove the multiple new lines produced by yaml
-        # which breaks multiline entries badly apart
-        # strip may not be needed actually
-        # fp.write(out_txt.strip().replace('\n\n', '\n'))
-        fp.write(out_txt.replace('\n\n', '\n'))
+    # unsorted keys, unicode and 70 character lines
+    out_txt = dump_record(record)
+    # remove the multiple new lines produced by yaml
+    # which breaks multiline entries badly apart
+    out_txt = out_txt.replace('\n\n', '\n')
+
+    if writer is not None:
+        writer.write(file_path, out_txt, done)
+        return True
+
+    try:
+        atomic_write(file_path, out_txt, fsync)
+    except OSError as e:
+        log.error('cannot save %s: %s', file_path, e)
+        return False
     return True
 # end of save_record
 
+
+@traced('save')
+def patch_record(file_path:str,
+                 updates:dict,
+                 fsync:str|None= None,
+                 writer= None,
+                 done= None)->bool:
+    """ set top level keys of a record file (e.g. 'Uploaded') in its
+        text, keeping the comments and layout of the rest, instead of
+        dumping the whole record again. The file is replaced atomically
+        as by save_record.
+
+        parameters:
+        file_path:  the record file
+        updates:    the keys and their new values
+        fsync:      'none', 'file' or 'dir', None for the
+                    default of rdm_atomic.fsync_policy
+        writer:     a WriteBehind queue to write the file later
+        done:       function(file_path, error) the writer calls
+                    once the file is written
+
+        return:
+        True if done (or queued), False if the file cannot be read,
+        patched (not a plain block mapping) or written; then the
+        record should be saved by save_record
+    """
+    file_path = os.path.abspath(os.path.expanduser(file_path))
+    try:
+        # newline= '' keeps the line ends of the file
+        with open(file_path, 'rt', encoding='UTF-8', newline='') as fp:
+            text = fp.read()
+    except (OSError, UnicodeDecodeError) as e:
+        log.warning('cannot read %s: %s', file_path, e)
+        return False
+
+    text = patch_top_level(text, updates)
+    if text is None:
+        log.info('cannot patch %s, it has to be saved again', file_path)
+        return False
+
+    if writer is not None:
+        writer.write(file_path, text, done)
+        return True
+
+    try:
+        atomic_write(file_path, text, fsync)
+    except OSError as e:
+        log.error('cannot save %s: %s', file_path, e)
+        return False
+    return True
+# end of patch_record
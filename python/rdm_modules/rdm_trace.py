@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+""" Logging and timing of the work phases of RDM-desktop.
+
+    The modules log through the standard logging package under the
+    'rdm' logger (e.g. 'rdm.templates'), instead of printing to the
+    console. The level is set by setup_logging(), or the RDM_LOG
+    environment variable (debug, info, warning, error), warning by
+    default. With RDM_LOG_FORMAT=json every message is a JSON line.
+
+    The phases (scan, parse, merge, form, save, upload) are wrapped in
+    spans:
+
+        with span('parse', path= path):
+            ...
+
+    or decorated with @traced('merge'). While tracing is off (the
+    default) span() returns the same empty context, and the decorated
+    functions are called directly, which costs well below a microsecond
+    per call, nothing compared to reading a file. If it
+    is switched on by start_tracing(), or the RDM_TRACE environment
+    variable naming a JSON file, every span is recorded with its time,
+    thread and parent span, and summed up by name. export_timings()
+    writes them to JSON, with RDM_TRACE this happens at exit.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import atexit
+import contextlib
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+__all__ = ['get_logger', 'setup_logging', 'span', 'traced', 'start_tracing',
+           'stop_tracing', 'tracing', 'timings', 'export_timings']
+
+root_name = 'rdm'
+# spans kept in the memory, the summary goes on counting
+max_spans = 100000
+
+# None while tracing is off, checked by every span
+_tracer = None
+_null_span = contextlib.nullcontext()
+_setup_lock = threading.Lock()
+_atexit_registered = False
+
+
+def get_logger(name:str) -> logging.Logger:
+    """ the logger of a module, under the 'rdm' logger
+
+        parameters:
+        name:   the short name of the module, e.g. 'templates'
+    """
+    return logging.getLogger(f'{root_name}.{name}')
+# end get_logger
+
+
+class _JSONFormatter(logging.Formatter):
+    """ a log record as a line of JSON
+    """
+    def format(self, record:logging.LogRecord) -> str:
+        res = {'time': round(record.created, 6),
+               'level': record.levelname,
+               'logger': record.name,
+               'message': record.getMessage(),
+               'thread': record.threadName}
+        if record.exc_info:
+            res['exception'] = self.formatException(record.exc_info)
+        return json.dumps(res, default= str, ensure_ascii= False)
+# end of class _JSONFormatter
+
+
+def setup_logging(level:str|int|None= None,
+                  json_format:bool|None= None,
+                  trace:str|None= None) -> logging.Logger:
+    """ set up the 'rdm' logger to write to stderr, and start tracing
+        if asked for; called by the programs, not by the modules
+
+        parameters:
+        level:          a level name or number, default is RDM_LOG
+                        from the environment or 'warning'
+        json_format:    write JSON lines, default is RDM_LOG_FORMAT=json
+        trace:          a JSON file to write the timings to at exit,
+                        default is RDM_TRACE, None or '' for no tracing
+
+        return:
+        the 'rdm' logger
+    """
+    if level is None:
+        level = os.environ.get('RDM_LOG', 'warning')
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+        if not isinstance(level, int):
+            level = logging.WARNING
+
+    if json_format is None:
+        json_format = os.environ.get('RDM_LOG_FORMAT', '').lower() == 'json'
+
+    if trace is None:
+        trace = os.environ.get('RDM_TRACE', '')
+
+    logger = logging.getLogger(root_name)
+    with _setup_lock:
+        logger.setLevel(level)
+        handler = None
+        for i in logger.handlers:
+            if getattr(i, '_rdm_handler', False):
+                handler = i
+        if handler is None:
+            handler = logging.StreamHandler(sys.stderr)
+            handler._rdm_handler = True
+            logger.addHandler(handler)
+            logger.propagate = False
+
+        handler.setFormatter(_JSONFormatter() if json_format else
+                             logging.Formatter('%(levelname)s %(name)s: '
+                                               '%(message)s'))
+
+    if trace:
+        start_tracing(trace)
+
+    return logger
+# end setup_logging
+
+
+class _Tracer():
+    """ the recorded spans and their sums by name
+    """
+
+    def __init__(self, path:str|None) -> None:
+        self.path = path
+        self.t0 = time.perf_counter()
+        self.wall0 = time.time()
+        self.spans = []
+        self.dropped = 0
+        # name: [count, total s, max s]
+        self.summary = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.next_id = 1
+    # end __init__
+
+
+    def add(self, name:str, start:float, end:float, span_id:int,
+            parent:int|None, attrs:dict) -> None:
+        dt = end - start
+        with self.lock:
+            s = self.summary.get(name)
+            if s is None:
+                self.summary[name] = [1, dt, dt]
+            else:
+                s[0] += 1
+                s[1] += dt
+                s[2] = max(s[2], dt)
+
+            if len(self.spans) < max_spans:
+                self.spans.append({'id': span_id,
+                                   'parent': parent,
+                                   'name': name,
+                                   'start': round(start - self.t0, 6),
+                                   'duration': round(dt, 6),
+                                   'thread': threading.current_thread().name,
+                                   **attrs})
+            else:
+                self.dropped += 1
+    # end add
+
+
+    def new_id(self) -> int:
+        with self.lock:
+            span_id = self.next_id
+            self.next_id += 1
+        return span_id
+    # end new_id
+# end of class _Tracer
+
+
+class _Span():
+    """ times a block and records it in the tracer
+    """
+    __slots__ = ('tracer', 'name', 'attrs', 'start', 'id', 'parent')
+
+    def __init__(self, tracer:_Tracer, name:str, attrs:dict) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.start = 0.0
+        self.id = 0
+        self.parent = None
+
+
+    def __enter__(self) -> '_Span':
+        stack = getattr(self.tracer.local, 'stack', None)
+        if stack is None:
+            stack = self.tracer.local.stack = []
+        self.parent = stack[-1] if stack else None
+        self.id = self.tracer.new_id()
+        stack.append(self.id)
+        self.start = time.perf_counter()
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        end = time.perf_counter()
+        self.tracer.local.stack.pop()
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer.add(self.name, self.start, end, self.id, self.parent,
+                        self.attrs)
+# end of class _Span
+
+
+def span(name:str, **attrs):
+    """ a context timing the block in it, if tracing is on
+
+        parameters:
+        name:   the phase, e.g. 'parse'
+        attrs:  extra information stored with the span, e.g. path=...
+                (keep them cheap, they are evaluated even if tracing
+                is off)
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _null_span
+    return _Span(tracer, name, attrs)
+# end span
+
+
+def traced(name:str):
+    """ decorator timing every call of a function as a span
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            with _Span(tracer, name, {'function': func.__qualname__}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+# end traced
+
+
+def tracing() -> bool:
+    """ True if the spans are recorded
+    """
+    return _tracer is not None
+
+
+def start_tracing(path:str|None= None) -> None:
+    """ start recording the spans, earlier recordings are dropped
+
+        parameters:
+        path:   a JSON file the timings are written to at exit,
+                None to export them only by export_timings()
+    """
+    global _tracer, _atexit_registered
+    with _setup_lock:
+        _tracer = _Tracer(path)
+        if path and not _atexit_registered:
+            atexit.register(_export_at_exit)
+            _atexit_registered = True
+# end start_tracing
+
+
+def stop_tracing() -> dict:
+    """ stop recording, and return what was recorded, see timings()
+    """
+    global _tracer
+    res = timings()
+    with _setup_lock:
+        _tracer = None
+    return res
+# end stop_tracing
+
+
+def timings() -> dict:
+    """ the recorded spans
+
+        return:
+        a dict with the 'start' time (s since the epoch), the 'summary'
+        of every span name with its 'count', 'total', 'mean' and 'max'
+        time in s, the list of 'spans' (id, parent, name, start relative
+        to the start, duration, thread and attributes), and the number
+        of 'dropped' spans over max_spans; empty if tracing is off
+    """
+    tracer = _tracer
+    if tracer is None:
+        return {}
+
+    with tracer.lock:
+        summary = {k: {'count': v[0],
+                       'total': round(v[1], 6),
+                       'mean': round(v[1] / v[0], 6),
+                       'max': round(v[2], 6)}
+                   for k, v in sorted(tracer.summary.items(),
+                                      key= lambda x: -x[1][1])}
+        spans = list(tracer.spans)
+        dropped = tracer.dropped
+
+    return {'start': tracer.wall0,
+            'summary': summary,
+            'spans': spans,
+            'dropped': dropped}
+# end timings
+
+
+def export_timings(path:str) -> dict:
+    """ write the recorded spans to a JSON file
+
+        return:
+        the exported dict, see timings()
+    """
+    res = timings()
+    with open(path, 'wt', encoding='UTF-8') as fp:
+        json.dump(res, fp, indent= 1, default= str)
+    return res
+# end export_timings
+
+
+def _export_at_exit() -> None:
+    tracer = _tracer
+    if tracer is not None and tracer.path:
+        # pylint: disable=broad-exception-caught
+        try:
+            export_timings(tracer.path)
+        except Exception as e:
+            get_logger('trace').error('cannot write the timings to %s: %s',
+                                      tracer.path, e)
+# end _export_at_exit
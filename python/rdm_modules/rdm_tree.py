@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+""" Walk the project tree the same way the ListWidget does, but without
+    any GUI: projects in the projectDir, samples in their searchFolders,
+    experiment records matching the searchPattern.
+    Used by the command line tools working on many records at once.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import os
+
+from rdm_modules.rdm_match import level_filter
+from rdm_modules.rdm_trace import traced
+
+__all__ = ['config_element', 'list_level', 'record_level', 'start_level',
+           'iter_records']
+
+
+def config_element(config:dict, key:str, level:int) -> str:
+    """ Get a config value, if it is a list, then its element at level.
+        The same as ListWidget.get_config_element.
+
+        parameters:
+        config:     the configuration dict
+        key:        a key in config
+        level:      the depth in the folder tree
+
+        return:
+        the value or '' if not found
+    """
+    if key in config:
+        if isinstance(config[key], list):
+            if len(config[key]) > level:
+                return config[key][level]
+        else:
+            return config[key]
+
+    return ''
+# end config_element
+
+
+def record_level(config:dict) -> int:
+    """ the level where the records (files) are listed,
+        by default the last one
+    """
+    targets = config['searchTargets'] if 'searchTargets' in config else []
+    for i in range(len(targets)-1, -1, -1):
+        if targets[i] == 'file':
+            return i
+
+    return max(len(targets)-1, 0)
+# end record_level
+
+
+@traced('scan')
+def list_level(path:str, config:dict, level:int) -> list:
+    """ list the items of a folder at a given level, applying
+        searchTargets, searchPattern and ignore from the config
+
+        parameters:
+        path:       the folder to be listed (searchFolders already applied)
+        config:     the configuration dict
+        level:      the depth in the folder tree
+
+        return:
+        a sorted list of names
+    """
+    if not os.path.isdir(path):
+        return []
+
+    return level_filter(config, level).scan(path)
+# end list_level
+
+
+def start_level(path:str, config:dict) -> tuple:
+    """ find out at which level of the tree a folder is.
+
+        return:
+        a tuple of (level, listing path) where listing path is the
+        folder to be listed at that level
+    """
+    project_dir = os.path.abspath(os.path.expanduser(config['projectDir']))
+    rel = os.path.relpath(path, project_dir)
+    if rel == '.':
+        return (0, project_dir)
+
+    if rel.startswith('..'):
+        raise ValueError(f'{path} is not in the project folder')
+
+    parts = [i for i in rel.replace('\\', '/').split('/') if i]
+    level = 0
+    current = project_dir
+    while parts:
+        if level > 0:
+            prefix = config_element(config, 'searchFolders', level)
+            prefix = [i for i in prefix.replace('\\', '/').split('/') if i]
+            for i, p in enumerate(prefix):
+                if not parts:
+                    # the path points inside the prefix, e.g. the
+                    # Data folder of a project
+                    return (level, os.path.join(current, *prefix[i:]))
+                if parts[0] != p:
+                    raise ValueError(f'{path} does not match searchFolders')
+                current = os.path.join(current, parts.pop(0))
+
+            if not parts:
+                return (level, current)
+
+        # one item at this level
+        current = os.path.join(current, parts.pop(0))
+        level += 1
+
+        if not parts:
+            prefix = config_element(config, 'searchFolders', level)
+            return (level, os.path.join(current, prefix))
+
+    return (level, current)
+# end start_level
+
+
+def iter_records(config:dict, start:str|None= None, lister= list_level):
+    """ generate the path of every record under start
+
+        parameters:
+        config:     the configuration dict
+        start:      a record file, a project, a sample or the projects
+                    folder; None means the whole projectDir
+        lister:     function(path, config, level) returning the sorted
+                    names in a folder, like list_level or the listing
+                    of the index
+
+        yield:
+        the full path of every record file found
+    """
+    if start is None:
+        start = config['projectDir']
+
+    start = os.path.abspath(os.path.expanduser(start))
+    if os.path.isfile(start):
+        yield start
+        return
+
+    last = record_level(config)
+    level, path = start_level(start, config)
+
+    # a simple depth first walk
+    stack = [(level, path)]
+    while stack:
+        level, path = stack.pop()
+        names = lister(path, config, level)
+
+        if level >= last:
+            for name in names:
+                yield os.path.join(path, name)
+            continue
+
+        # reversed so the output comes in sorted order
+        for name in reversed(names):
+            sub = os.path.join(path,
+                               name,
+                               config_element(config, 'searchFolders', level+1))
+            stack.append((level+1, sub))
+# end iter_records
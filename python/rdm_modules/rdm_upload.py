@@ -0,0 +1,412 @@
+#!/usr/bin/env python
+""" The upload pipeline of records without any GUI:
+    read the record with its templates, convert it to a JSON safe
+    dict, send it with the selected uploader, then write back the
+    upload information into the record.
+
+    The rdmUploader window and the command line batch uploader
+    (RDM_upload.py) both use these functions.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from rdm_modules.rdm_atomic import WriteBehind
+from rdm_modules.rdm_converters import convert_record_to_JSON
+from rdm_modules.rdm_journal import (UploadJournal, journal_path)
+from rdm_modules.rdm_templates import (patch_record, read_record,
+                                       save_record)
+from rdm_modules.rdm_trace import (get_logger, traced)
+from rdm_modules.rdm_tree import (config_element, record_level, iter_records)
+
+# List here all uploaders for the various ELNs
+from rdm_modules.uploaders.ElabFTW import upload_record as elabFTW
+
+__all__ = ['uploader_dict', 'AlreadyUploaded', 'upload_record_file',
+           'batch_upload']
+
+log = get_logger('upload')
+
+# In this dict we combine the name of ELNs and the functions
+# to do the upload
+# Every function receives a dict for the record to be processed
+# the server URL and the security token as:
+#
+#   title:str,
+#   record:dict,
+#   record_path:str,
+#   server:str,
+#   token:str,
+#   verify= True,
+#   error_handler= showerror,
+#   progress= print,
+#   stats= None,
+#   journal= None,
+#   **options
+#
+# where stats is an optional dict the uploader fills with the number and
+# time of its requests, journal is an UploadJournal to log the steps to
+# and continue broken uploads from, options are uploader specific settings, like the
+# size of the connection pool (pool_size) or the number of retries (retries).
+#
+# It is the job of the functions to tune the format to the actual ELN.
+# The functions return a dict containing:
+# server:   link to server (https...)
+# id:       the ID of the new record on the server
+# date:     date and time of the upload
+uploader_dict = {
+        "ElabFTW":elabFTW
+        }
+
+
+class AlreadyUploaded(Exception):
+    """ the record has an upload to the server already
+    """
+    def __init__(self, record_path:str, upload:dict) -> None:
+        """ parameters:
+            record_path:    the record
+            upload:         its upload information for the server
+        """
+        super().__init__(f'Record is already uploaded at: {upload["link"]}')
+        self.record_path = record_path
+        self.upload = upload
+# end of class AlreadyUploaded
+
+
+def _log_error(title:str, message:str, **kwargs) -> None:
+    """ the default error handler without a GUI
+    """
+    log.error('%s: %s', title, message)
+# end _log_error
+
+
+def find_uploaded(uploaded:dict|list, server:str) -> dict|None:
+    """ check the 'Uploaded' field of a record for an
+        upload to server
+
+        parameters:
+        uploaded:   the content of the 'Uploaded' field
+        server:     the server link
+
+        return:
+        the upload information or None
+    """
+    if not uploaded:
+        return None
+
+    if isinstance(uploaded, dict):
+        uploaded = [uploaded]
+
+    for i in uploaded:
+        if isinstance(i, dict) and 'server' in i and server == i['server']:
+            return i
+
+    return None
+# end find_uploaded
+
+
+@traced('upload')
+def upload_record_file(record_path:str,
+                       config:dict,
+                       server:str,
+                       token:str,
+                       eln:str= 'ElabFTW',
+                       level:int|None= None,
+                       verify:bool|None= None,
+                       error_handler= _log_error,
+                       progress= None,
+                       options:dict|None= None,
+                       stats:dict|None= None,
+                       writer= None)->dict|None:
+    """ Manage the upload of a record file by:
+        - getting the metadata content
+        - merging it with the template to a full record
+        - invoke the selected uploader
+        - append upload information to the record
+
+        Check the 'Uploaded' field for the server, and
+        avoid double uploading.
+
+        The 'Uploaded' field should contain at least:
+        'server':   the https... link to the server
+        'link':     the actual link to the current record
+        It also may have: 'id' for the record and a 'date' of upload
+
+        parameters:
+        record_path:    path to the record file
+        config:         the configuration dict
+        server:         the https link to the server
+        token:          the security token to be used
+        eln:            a key of uploader_dict
+        level:          the level of records in the folder tree,
+                        None to take it from the configuration
+        verify:         check certificates, if None, do not check
+                        for 127.0.0.1 only
+        error_handler:  function(title, message) to report problems
+        progress:       function(filename, sent, total) reporting the
+                        attachment uploads, None to use the default
+                        of the uploader
+        options:        extra keyword arguments for the uploader
+        stats:          a dict for request counts and timing, filled
+                        by the uploader
+        writer:         a WriteBehind queue to save the record later,
+                        None to save it right away
+
+        return:
+        the upload information dict, or None if nothing was uploaded
+
+        raise:
+        AlreadyUploaded if the record has an upload to the server
+    """
+    if level is None:
+        level = record_level(config)
+
+    template_dir = config_element(config, 'templateDir', level)
+    default_template = config_element(config, 'defaultTemplate', level)
+    if default_template:
+        default_template = os.path.join(template_dir, default_template)
+
+    record = read_record(record_path,
+                         default_template,
+                         template_dir)
+    if not record:
+        error_handler('error', f'File not found: {record_path}')
+        return None
+
+    # clean up somewhat
+    if 'Uploaded' in record:
+        uploaded = record.pop('Uploaded')
+    else:
+        uploaded = {}
+
+    if eln in uploader_dict:
+        up_func = uploader_dict[eln]
+    else:
+        error_handler('error', 'Uploader not found!')
+        return None
+
+    this_upload = find_uploaded(uploaded, server)
+    if this_upload:
+        raise AlreadyUploaded(record_path, this_upload)
+
+    record_converted = convert_record_to_JSON(record)
+
+    title = os.path.splitext(os.path.basename(record_path))[0]
+    title = title.replace('_', ' ')
+
+    # locally we allow self-signed certs
+    if verify is None:
+        verify = '127.0.0.1' not in server
+
+    kwargs = dict(options) if options else {}
+    kwargs['verify'] = verify
+    kwargs['error_handler'] = error_handler
+    if progress is not None:
+        kwargs['progress'] = progress
+    if stats is not None:
+        kwargs['stats'] = stats
+
+    # every step is journaled, so a broken upload can continue
+    journal = UploadJournal(journal_path(record_path, config),
+                            record_path,
+                            server)
+    kwargs['journal'] = journal
+
+    # we upload the JSON safe version, record_converted
+    upload_result= up_func(
+                    title,
+                    record_converted,
+                    os.path.dirname(record_path),
+                    server,
+                    token,
+                    **kwargs)
+
+    if not upload_result:
+        return None
+
+    if uploaded:
+        if isinstance(uploaded, list):
+            uploaded.append(upload_result)
+        else:
+            uploaded = [uploaded, upload_result]
+    else:
+        uploaded = upload_result
+
+    # update the record with upload information
+    record['Uploaded'] = uploaded
+
+    # If the record has 'full record', then is is a full record
+    # else, we may be switching to full records in config, so we allow that too
+    full_record = (('full record' in record and record['full record'])
+                   or ('full record' in config and config['full record'])
+                   )
+
+    # the upload is done only when the record knows about it,
+    # until then a new try continues the same experiment
+    def finish(file_path:str, error:Exception|None) -> None:
+        if error is None:
+            journal.log('done',
+                        id= upload_result['id'],
+                        link= upload_result['link'])
+
+    # only the 'Uploaded' field is written into the file, keeping its
+    # comments; the record is dumped back only if that is not possible
+    if patch_record(record_path, {'Uploaded': uploaded},
+                    fsync= config.get('fsync'), writer= writer, done= finish):
+        if writer is None:
+            finish(record_path, None)
+        return upload_result
+
+    if writer is not None:
+        save_record(record, record_path, overwrite=True,
+                    full_record= full_record, writer= writer, done= finish)
+        return upload_result
+
+    # if one had comments in this YAML, those are gone...
+    if not save_record(record, record_path, overwrite=True,
+                       full_record= full_record,
+                       fsync= config.get('fsync')):
+        error_handler('error',
+                      f'Uploaded to {upload_result["link"]}, '
+                      f'but cannot save the record: {record_path}')
+        return None
+
+    finish(record_path, None)
+    return upload_result
+# end upload_record_file
+
+
+def batch_upload(paths:list,
+                 config:dict,
+                 server:str,
+                 token:str,
+                 eln:str= 'ElabFTW',
+                 workers:int= 4,
+                 verify:bool|None= None,
+                 options:dict|None= None) -> dict:
+    """ upload every record found under the paths using a pool
+        of worker threads
+
+        parameters:
+        paths:      list of record files, samples, projects or
+                    the projects folder
+        config:     the configuration dict
+        server:     the https link to the server
+        token:      the security token to be used
+        eln:        a key of uploader_dict
+        workers:    number of records uploaded at the same time
+        verify:     check certificates, see upload_record_file
+        options:    extra keyword arguments for the uploader,
+                    by default a connection pool as large as workers
+
+        return:
+        a summary dict with lists of:
+        'uploaded': record, id, link, requests and time of the
+                    new experiments
+        'skipped':  records already uploaded to this server
+        'failed':   records and the error messages
+    """
+    records = []
+    seen = set()
+    for path in paths:
+        for i in iter_records(config, path):
+            if i not in seen:
+                seen.add(i)
+                records.append(i)
+
+    level = record_level(config)
+
+    # every worker should have its own connection
+    if options is None:
+        options = {'pool_size': max(workers, 1)}
+
+    def run(record_path:str) -> tuple:
+        """ upload one record and collect its messages
+
+            return:
+            the record, the upload information or None, the
+            AlreadyUploaded exception or None, the messages and
+            the stats
+        """
+        messages = []
+        stats = {}
+        exists = None
+        def collect(title, message, **kwargs):
+            messages.append((title, message))
+
+        try:
+            res = upload_record_file(record_path,
+                                     config,
+                                     server,
+                                     token,
+                                     eln= eln,
+                                     level= level,
+                                     verify= verify,
+                                     error_handler= collect,
+                                     options= options,
+                                     stats= stats,
+                                     writer= writer)
+        except AlreadyUploaded as e:
+            exists = e
+            res = None
+        # a batch must go on with the other records
+        # pylint: disable=broad-exception-caught
+        except Exception as e:
+            messages.append(('error', repr(e)))
+            res = None
+
+        return (record_path, res, exists, messages, stats)
+    # end run
+
+    summary = {'server': server,
+               'records': len(records),
+               'uploaded': [],
+               'skipped': [],
+               'failed': [],
+               'requests': 0,
+               'bytes saved': 0}
+
+    # the records are saved in the background, while the
+    # next ones are uploaded
+    writer = WriteBehind(fsync= config.get('fsync'))
+    with writer, ThreadPoolExecutor(max_workers= max(workers, 1)) as pool:
+        for record_path, res, exists, messages, stats in pool.map(run,
+                                                                  records):
+            summary['requests'] += stats.get('requests', 0)
+            summary['bytes saved'] += stats.get('bytes saved', 0)
+            if res:
+                summary['uploaded'].append({
+                    'record': record_path,
+                    'id': res['id'],
+                    'link': res['link'],
+                    'requests': stats.get('requests', 0),
+                    'request time': round(stats.get('request time', 0.0), 3),
+                    'time': round(stats.get('time', 0.0), 3)
+                    })
+            elif exists is not None:
+                summary['skipped'].append({'record': record_path,
+                                           'reason': str(exists)})
+            else:
+                summary['failed'].append({
+                    'record': record_path,
+                    'error': '; '.join(f'{i}: {j}' for i,j in messages)
+                    })
+
+    # uploaded, but the record could not be updated
+    for i in list(summary['uploaded']):
+        error = writer.errors.get(os.path.abspath(i['record']))
+        if error is not None:
+            summary['uploaded'].remove(i)
+            summary['failed'].append({
+                'record': i['record'],
+                'error': f'error: Uploaded to {i["link"]}, but cannot save '
+                         f'the record: {error}'
+                })
+
+    return summary
+# end batch_upload
@@ -6,42 +6,19 @@
     Warranty:   None
 """
 
-import json
 import os
 import tkinter as tk
 from tkinter import ttk
 from tkinter.messagebox import showerror
+from rdm_modules.rdm_trace import get_logger
 from rdm_modules.rdm_widgets import (EntryBox, CheckBox, RdmWindow)
-from rdm_modules.rdm_templates import (read_record, save_record)
-
-from rdm_modules.rdm_converters import convert_record_to_JSON
-
-# List here all uploaders for the various ELNs
-from rdm_modules.uploaders.ElabFTW import upload_record as elabFTW
-
-# and yaml:
-import yaml
-
-# In this dict we combine the name of ELNs and the functions
-# to do the upload
-# Every function receives a dict for the record to be processed
-# the server URL and the security token as:
-#
-#   title:str,
-#   record:dict,
-#   record_path:str,
-#   server:str,
-#   token:str,
-#   verify= True
-#
-# It is the job of the functions to tune the format to the actual ELN.
-# The functions return a dict containing:
-# server:   link to server (https...)
-# id:       the ID of the new record on the server
-# date:     date and time of the upload
-uploader_dict = {
-        "ElabFTW":elabFTW
-        }
+from rdm_modules.rdm_worker import TkExecutor
+
+# the uploaders for the various ELNs are listed in rdm_upload
+from rdm_modules.rdm_upload import (AlreadyUploaded, uploader_dict,
+                                    upload_record_file)
+
+log = get_logger('uploader')
 
 
 class rdmUploader():
@@ -147,9 +124,45 @@ class rdmUploader():
                             )
 
         button.grid(column=1, row=4, sticky='se')
+        self.button = button
+
+        # the upload runs in the background, reporting here
+        self.progress_label = tk.Label(frame, text= '')
+        self.progress_label.grid(column=0, row=5, columnspan=2, sticky='w')
+        self.progress_bar = ttk.Progressbar(frame,
+                                            orient= 'horizontal',
+                                            mode= 'determinate',
+                                            maximum= 100)
+        self.progress_bar.grid(column=0, row=6, columnspan=2, sticky='we')
+
+        self.executor = TkExecutor(window, on_busy= self.show_busy)
+        window.bind('<Destroy>',
+                    lambda event: self.executor.close()\
+                            if event.widget is window else None,
+                    add= '+')
     # end __init__
 
 
+    def show_busy(self, busy:bool) -> None:
+        """ disable the button while uploading
+        """
+        self.button.config(state= 'disabled' if busy else 'normal')
+        self.window.config(cursor= 'watch' if busy else '')
+        if busy:
+            self.progress_label.config(text= 'uploading...')
+    # end show_busy
+
+
+    def show_progress(self, filename:str, sent:int, total:int) -> None:
+        """ show the progress of an attachment
+        """
+        percent = 100*sent/total if total else 100
+        self.progress_label.config(
+                text= f'{os.path.basename(filename)}: {percent:.0f} %')
+        self.progress_bar['value'] = percent
+    # end show_progress
+
+
     def upload(self,
                record_path:str,
                config:dict,
@@ -170,35 +183,7 @@ class rdmUploader():
             It also may have: 'id' for the record and a 'date' of upload
         """
 
-        global uploader_dict
-        print('upload was requested')
-
-        k = 'templateDir'
-        if (config and k in config):
-            template_dir = config[k]
-        k = 'defaultTemplate'
-        if (config and k in config):
-            default_template = os.path.join(template_dir, config[k][level])
-
-        record = read_record(record_path,
-                             default_template,
-                             template_dir)
-        if not record:
-            errorshow('error', f'File not found: {record_path}')
-            return
-
-        # clean up somewhat
-
-        if 'Uploaded' in record:
-            uploaded = record.pop('Uploaded')
-        else:
-            uploaded = {}
-
-        record_converted = convert_record_to_JSON(record)
-        print('record:\n', record_converted)
-
-        title = os.path.splitext(os.path.basename(record_path))[0]
-        title = title.replace('_', ' ')
+        log.debug('upload was requested')
 
         # collect the info of the form:
         # server link, token, eln
@@ -206,63 +191,46 @@ class rdmUploader():
         token = self.server_token.get()
         uploader_key = self.eln_type.get()
 
-        if uploader_key in uploader_dict:
-            up_func = uploader_dict[uploader_key]
-        else:
-            showerror('error', 'Uploader not found!')
-            return
-
-        # locally we allow self-signed certs
-        if '127.0.0.1' in server:
-            verify= False
-        else:
-            verify = True
-
-        if uploaded:
-            if isinstance(uploaded, dict) and 'server' in uploaded:
-                if server == uploaded['server']:
-                    showerror('exists',
-                              f'Record is already uploaded at: {uploaded["link"]}')
-                    return
+        # the upload runs in a worker thread, messages and
+        # progress are passed to the Tk thread
+        def error_handler(title:str, message:str, **kwargs) -> None:
+            self.executor.call(showerror, title, message)
+
+        # report only when the percentage changes
+        last = {}
+        def progress(filename:str, sent:int, total:int) -> None:
+            percent = int(100*sent/total) if total else 100
+            if last.get(filename) != percent:
+                last[filename] = percent
+                self.executor.call(self.show_progress, filename, sent, total)
+
+        def done(upload_result:dict|None) -> None:
+            if upload_result:
+                self.window.destroy()
             else:
-                for i in uploaded:
-                    if 'server' in i and server == i['server']:
-                        showerror('exists',
-                                  f'Record is already uploaded at {i["link"]}')
-                        return
-        # end checking if record is uploaded to this server
-
-        # we upload the JSON safe version, record_converted
-        upload_result= up_func(
-                        title,
-                        record_converted,
-                        os.path.dirname(record_path),
-                        server,
-                        token,
-                        verify= verify)
-
-        if uploaded:
-            if isinstance(uploaded, list):
-                uploaded.append(upload_result)
-            else:
-                uploaded = [upload_result]
-        else:
-            uploaded = upload_result
-        # now, write back the record
-
-        # update the record with upload information
-        record['Uploaded'] = uploaded
-
-        # dump the record back
-        # if one had comments in this YAML, those are gone...
-        # If the record has 'full record', then is is a full record
-        # else, we may be switching to full records in config, so we allow that too
-        full_record = (('full record' in record and record['full record'])
-                       or ('full record' in config and config['full record'])
-                       )
-
-        save_record(record, record_path, overwrite=True, full_record= full_record)
-        self.window.destroy()
+                self.progress_label.config(text= 'upload failed')
+
+        def failed(error:Exception) -> None:
+            if isinstance(error, AlreadyUploaded):
+                self.progress_label.config(text= 'already uploaded')
+                showerror('exists', str(error))
+                return
+            self.progress_label.config(text= 'upload failed')
+            showerror('Upload error', repr(error))
+
+        # reading, converting, uploading and writing back the
+        # record is the same as in the batch upload
+        self.executor.submit(upload_record_file,
+                             record_path,
+                             config,
+                             server,
+                             token,
+                             eln= uploader_key,
+                             level= level,
+                             error_handler= error_handler,
+                             progress= progress,
+                             on_done= done,
+                             on_error= failed)
     # end of upload
 # end rdmUpload
 
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+""" Check experiment records against their templates without the GUI.
+
+    The forms check the values while they are typed, but records
+    written by instruments or scripts directly to the disk were never
+    checked. Here every record is read, its template is found the same
+    way as for editing (the template key of the record in templateDir,
+    merged with the default template of the level), and the values are
+    checked by the compiled schema (see rdm_schema): types, required
+    fields, select options, units, numeric lists and the rows of subsets.
+
+    The compiled templates are shared, so checking a large archive costs
+    little more than reading the records, done by a pool of threads.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rdm_modules.rdm_converters import is_record
+from rdm_modules.rdm_schema import (TemplateError, compile_template)
+from rdm_modules.rdm_templates import get_schema
+from rdm_modules.rdm_tree import (config_element, iter_records, record_level)
+from rdm_modules.rdm_yaml import safe_load_file
+
+__all__ = ['validate_record', 'validate_tree', 'format_report']
+
+
+def _is_full_record(record:dict) -> bool:
+    """ a full record carries its template (fields with types)
+    """
+    return (bool(record.get('full record'))
+            and any(isinstance(v, dict) and 'type' in v
+                    for v in record.values()))
+# end _is_full_record
+
+
+def validate_record(record_path:str,
+                    config:dict,
+                    level:int|None= None) -> dict:
+    """ check a record file against its template
+
+        parameters:
+        record_path:    the YAML file of the record
+        config:         the configuration dict
+        level:          the level of records in the tree,
+                        default is the record level of the config
+
+        return:
+        a dict with the 'record' path, its 'template' name, the list
+        of 'problems' (empty if the record is fine), and 'skipped'
+        True if the file is not an experiment record
+    """
+    res = {'record': record_path, 'template': '', 'problems': [],
+           'skipped': False}
+
+    if not is_record(record_path):
+        res['skipped'] = True
+        return res
+
+    if level is None:
+        level = record_level(config)
+
+    # a broken file is a problem of the record, not of the check
+    # pylint: disable=broad-exception-caught
+    try:
+        record = safe_load_file(record_path)
+    except Exception as e:
+        res['problems'].append(f'cannot read: {e}')
+        return res
+
+    if not isinstance(record, dict):
+        res['problems'].append('the record is not a dict')
+        return res
+
+    res['template'] = str(record.get('template', ''))
+
+    try:
+        if _is_full_record(record):
+            # it was saved with its template, check against that
+            schema = compile_template(record, res['template'], strict= False)
+            res['problems'] += schema.problems
+
+        else:
+            template_dir = config_element(config, 'templateDir', level)
+            default = config_element(config, 'defaultTemplate', level)
+            schema = get_schema(os.path.join(template_dir, res['template']),
+                                os.path.join(template_dir, default)
+                                if default else None)
+            if schema is None:
+                res['problems'].append(f'template {res["template"]} '
+                                       'not found')
+                return res
+
+            k = 'template version'
+            version = schema.constants.get(k)
+            if k in record and version is not None and record[k] != version:
+                res['problems'].append(f'template version {record[k]}, '
+                                       f'the template has {version}')
+                return res
+
+    except TemplateError as e:
+        res['problems'] += [f'template: {i}' for i in e.problems]
+        return res
+
+    res['problems'] += schema.validate(record)
+    return res
+# end validate_record
+
+
+def validate_tree(paths:list,
+                  config:dict,
+                  workers:int= 8) -> dict:
+    """ check every record under the paths using a pool of threads
+
+        parameters:
+        paths:      list of record files, samples, projects or
+                    the projects folder
+        config:     the configuration dict
+        workers:    number of records checked at the same time
+
+        return:
+        a report dict with the number of 'records', 'valid' and
+        'skipped' files, the 'invalid' records with their problems,
+        the number of problems per 'template', and the 'time' in s
+    """
+    t0 = time.perf_counter()
+    records = []
+    seen = set()
+    for path in paths:
+        for i in iter_records(config, path):
+            if i not in seen:
+                seen.add(i)
+                records.append(i)
+
+    level = record_level(config)
+
+    report = {'records': len(records),
+              'valid': 0,
+              'skipped': 0,
+              'invalid': [],
+              'templates': {},
+              'time': 0.0}
+
+    with ThreadPoolExecutor(max_workers= max(workers, 1)) as pool:
+        for res in pool.map(lambda i: validate_record(i, config, level),
+                            records):
+            if res['skipped']:
+                report['skipped'] += 1
+            elif res['problems']:
+                report['invalid'].append({'record': res['record'],
+                                          'template': res['template'],
+                                          'problems': res['problems']})
+                name = res['template'] if res['template'] else '-'
+                report['templates'][name] = report['templates'].get(name, 0)\
+                                            + len(res['problems'])
+            else:
+                report['valid'] += 1
+
+    report['time'] = round(time.perf_counter() - t0, 3)
+    return report
+# end validate_tree
+
+
+def format_report(report:dict) -> str:
+    """ the report of validate_tree as readable text
+    """
+    lines = []
+    for i in report['invalid']:
+        lines.append(f'{i["record"]} ({i["template"]}):')
+        lines += [f'    {j}' for j in i['problems']]
+
+    if report['templates']:
+        lines.append('')
+        lines.append('problems per template:')
+        lines += [f'    {k}: {v}' for k, v in
+                  sorted(report['templates'].items(),
+                         key= lambda x: -x[1])]
+
+    lines.append(f'{report["records"]} files, {report["valid"]} valid, '
+                 f'{len(report["invalid"])} invalid, '
+                 f'{report["skipped"]} not records, '
+                 f'checked in {report["time"]} s')
+    return '\n'.join(lines)
+# end format_report
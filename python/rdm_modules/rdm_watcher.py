@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+""" Watch folders for new, deleted or renamed files and folders, so the
+    open windows can follow changes made by other programs, like an
+    instrument PC writing records or a colleague adding samples.
+
+    On Linux the kernel inotify interface is used through ctypes. Network
+    shares do not report changes made on other computers this way, so the
+    watched folders are also checked for a changed modification time
+    every few seconds, which is the only method on other systems.
+
+    Changes are collected, and reported only after the folder was quiet
+    for a short time (debouncing), so a program writing many files at
+    once causes a single refresh.
+
+    The callbacks run in the thread of the watcher, GUI code must pass
+    the news to its own thread (e.g. setting a threading.Event checked
+    using after()).
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from rdm_modules.rdm_trace import get_logger
+
+__all__ = ['FolderWatcher', 'get_watcher']
+
+log = get_logger('watcher')
+
+# inotify constants from <sys/inotify.h>
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+watch_mask = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_event_header = struct.Struct('iIII')
+
+
+def _load_inotify():
+    """ get the inotify functions of the C library
+
+        return:
+        the library or None if inotify is not available
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                           use_errno= True)
+        for name in ['inotify_init1', 'inotify_add_watch', 'inotify_rm_watch']:
+            getattr(libc, name)
+    except (OSError, AttributeError):
+        return None
+
+    libc.inotify_add_watch.argtypes = [ctypes.c_int,
+                                       ctypes.c_char_p,
+                                       ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+# end _load_inotify
+
+
+class FolderWatcher():
+    """ a thread reporting changes in the content of watched folders
+    """
+
+    def __init__(self,
+                 delay:float= 0.3,
+                 poll_interval:float|None= None,
+                 use_inotify:bool= True) -> None:
+        """ start the watcher
+
+            parameters:
+            delay:          seconds without news before a change
+                            is reported
+            poll_interval:  seconds between checking the modification
+                            times, default is 10 with inotify, 2 without
+            use_inotify:    use inotify if the system has it
+        """
+        self.delay = delay
+        self._lock = threading.Lock()
+        # path: {'callbacks': {handle: function}, 'wd': int, 'mtime': int}
+        self._folders = {}
+        # wd: path
+        self._wds = {}
+        # path: time of the last change
+        self._pending = {}
+        self._handles = {}
+        self._next_handle = 0
+        self._stop = threading.Event()
+
+        self._libc = _load_inotify() if use_inotify else None
+        self._fd = None
+        if self._libc is not None:
+            fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+
+        self.backend = 'inotify' if self._fd is not None else 'poll'
+        if poll_interval is None:
+            poll_interval = 10.0 if self._fd is not None else 2.0
+        self.poll_interval = poll_interval
+
+        self._thread = threading.Thread(target= self._run,
+                                        name= 'folder watcher',
+                                        daemon= True)
+        self._thread.start()
+    # end __init__
+
+
+    @staticmethod
+    def _mtime(path:str) -> int|None:
+        """ the modification time of a folder, None if it is gone
+        """
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+    # end _mtime
+
+
+    def _add_wd(self, path:str) -> int|None:
+        """ add an inotify watch, call it holding the lock
+        """
+        if self._fd is None:
+            return None
+
+        wd = self._libc.inotify_add_watch(self._fd,
+                                          os.fsencode(path),
+                                          watch_mask)
+        if wd < 0:
+            return None
+
+        self._wds[wd] = path
+        return wd
+    # end _add_wd
+
+
+    def watch(self, path:str, callback) -> int:
+        """ start watching a folder
+
+            parameters:
+            path:       the folder
+            callback:   function(path) called in the watcher thread,
+                        when the content of the folder changed
+
+            return:
+            a handle for unwatch()
+        """
+        path = os.path.abspath(path)
+        # a slow network drive must not hold up the lock
+        mtime = self._mtime(path)
+        with self._lock:
+            handle = self._next_handle
+            self._next_handle += 1
+            self._handles[handle] = path
+
+            if path not in self._folders:
+                self._folders[path] = {'callbacks': {},
+                                       'wd': self._add_wd(path),
+                                       'mtime': mtime}
+            self._folders[path]['callbacks'][handle] = callback
+
+        return handle
+    # end watch
+
+
+    def unwatch(self, handle:int) -> None:
+        """ stop calling a callback, and stop watching the folder
+            if nobody else needs it
+        """
+        with self._lock:
+            path = self._handles.pop(handle, None)
+            if path is None or path not in self._folders:
+                return
+
+            folder = self._folders[path]
+            folder['callbacks'].pop(handle, None)
+            if folder['callbacks']:
+                return
+
+            self._folders.pop(path)
+            self._pending.pop(path, None)
+            wd = folder['wd']
+            if wd is not None:
+                self._wds.pop(wd, None)
+                self._libc.inotify_rm_watch(self._fd, wd)
+    # end unwatch
+
+
+    def stop(self) -> None:
+        """ stop the watcher thread and close inotify
+        """
+        self._stop.set()
+        self._thread.join()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+    # end stop
+
+
+    def _read_events(self) -> None:
+        """ read what inotify has, and mark the folders changed
+        """
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return
+
+        now = time.monotonic()
+        pos = 0
+        with self._lock:
+            while pos + _event_header.size <= len(data):
+                wd, mask, _, length = _event_header.unpack_from(data, pos)
+                pos += _event_header.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    # events were lost, check everything
+                    for path in self._folders:
+                        self._pending[path] = now
+                    continue
+
+                path = self._wds.get(wd)
+                if path is None:
+                    continue
+
+                self._pending[path] = now
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    # the folder is gone, the poll finds it if it
+                    # comes back
+                    self._wds.pop(wd, None)
+                    if path in self._folders:
+                        self._folders[path]['wd'] = None
+    # end _read_events
+
+
+    def _poll(self) -> None:
+        """ check the modification time of every folder
+        """
+        # stat without the lock, watch() and unwatch() are called
+        # from the GUI, which must not wait for a hung network drive
+        with self._lock:
+            paths = list(self._folders)
+        mtimes = [(path, self._mtime(path)) for path in paths]
+
+        now = time.monotonic()
+        with self._lock:
+            for path, mtime in mtimes:
+                folder = self._folders.get(path)
+                # unwatched meanwhile
+                if folder is None:
+                    continue
+                if mtime != folder['mtime']:
+                    folder['mtime'] = mtime
+                    self._pending[path] = now
+                    # a folder created again needs a new watch
+                    if folder['wd'] is None and mtime is not None:
+                        folder['wd'] = self._add_wd(path)
+    # end _poll
+
+
+    def _run(self) -> None:
+        """ the loop of the watcher thread
+        """
+        next_poll = time.monotonic() + self.poll_interval
+        while not self._stop.is_set():
+            now = time.monotonic()
+            with self._lock:
+                waits = [next_poll - now]
+                waits += [t + self.delay - now for t in self._pending.values()]
+            timeout = max(min(waits + [0.5]), 0.0)
+
+            if self._fd is not None:
+                ready = select.select([self._fd], [], [], timeout)[0]
+                if ready:
+                    self._read_events()
+            else:
+                self._stop.wait(timeout)
+
+            now = time.monotonic()
+            if now >= next_poll:
+                self._poll()
+                next_poll = now + self.poll_interval
+
+            # report the folders which were quiet long enough
+            ready = []
+            with self._lock:
+                for path, t in list(self._pending.items()):
+                    if now - t < self.delay:
+                        continue
+                    self._pending.pop(path)
+                    if path in self._folders:
+                        ready.append(path)
+
+            # the new modification times, again without the lock
+            mtimes = [(path, self._mtime(path)) for path in ready]
+            calls = []
+            with self._lock:
+                for path, mtime in mtimes:
+                    folder = self._folders.get(path)
+                    if folder is None:
+                        continue
+                    folder['mtime'] = mtime
+                    calls += [(f, path) for f in folder['callbacks'].values()]
+
+            for func, path in calls:
+                # a bad callback must not kill the watcher
+                # pylint: disable=broad-exception-caught
+                try:
+                    func(path)
+                except Exception as e:
+                    log.exception('error in folder watcher callback: %s', e)
+    # end _run
+# end of class FolderWatcher
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_watcher() -> FolderWatcher:
+    """ the watcher of the program, started at the first call
+    """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = FolderWatcher()
+    return _watcher
+# end get_watcher
@@ -7,6 +7,7 @@
     Date:       2023-02-26
     Warranty:   None
 """
+import bisect
 import os
 import subprocess
 import time
@@ -18,6 +19,10 @@ from tkinter.filedialog import askopenfilenames
 from tkinter import StringVar
 from tempfile import NamedTemporaryFile
 
+from rdm_modules.rdm_trace import get_logger
+
+log = get_logger('widgets')
+
 
 class FilePickerTextField():
     """ a small class to build a file picker in the form of
@@ -775,7 +780,7 @@ class DateRoller():
             #day = int(self.varlist[2].get())
 
         except ValueError:
-            print('invalid value entered!')
+            log.debug('invalid value entered')
             self.error= True
             self.value= None
             return
@@ -812,7 +817,7 @@ class DateRoller():
             date = (int(i.get()) for i in self.varlist)
 
         except ValueError:
-            print('Invalid value in date!')
+            log.debug('invalid value in date')
             self.error= True
             self.value = None
             return
@@ -835,6 +840,353 @@ class DateRoller():
 #################### now, this is a more generic thing, the window with its
 #################### own basic frames
 
+class VirtualList():
+    """ A list box for very long sorted lists: only the visible rows
+        are put into the Tk listbox, the rest is kept in a python list.
+        Items can be added while a folder is being listed, and typing
+        on the list filters it to the items containing the typed text.
+    """
+
+    def __init__(self,
+                 parent:tk.Misc= None,
+                 on_filter= None,
+                 on_select= None) -> None:
+        """ make the listbox and its scrollbar in a frame
+
+            parameters:
+            parent:     the parent widget
+            on_filter:  function(text) called when the type-ahead
+                        filter changed, to show it somewhere
+            on_select:  function(item) called when an item is selected
+                        by the mouse or the keyboard
+        """
+        self.frame = tk.Frame(parent)
+        self.frame.columnconfigure(0, weight=10)
+        self.frame.columnconfigure(1, weight=1)
+        self.frame.rowconfigure(0, weight=10)
+
+        self.listbox = tk.Listbox(self.frame,
+                                  selectmode= tk.BROWSE,
+                                  height= 1,
+                                  exportselection= False)
+        self.listbox.grid(column=0, row=0, padx=0, pady=0, sticky='swne')
+
+        self.scrollbar= tk.Scrollbar(
+                self.frame,
+                bg='grey',
+                orient='vertical',
+                command= self.yview,
+                takefocus= True
+                )
+        self.scrollbar.grid(column=1, row=0, sticky='ns')
+
+        self.on_filter = on_filter
+        self.on_select = on_select
+        # all items sorted, and the filtered ones
+        self.items = []
+        self.view = self.items
+        self.filter_text = ''
+        self.selected = None
+        # first visible row and number of rows
+        self.top = 0
+        self.rows = 20
+        self.row_height = font.nametofont(
+                'TkDefaultFont').metrics('linespace') + 1
+        self._calibrated = False
+
+        self.listbox.bind('<Configure>', self.resize)
+        self.listbox.bind('<<ListboxSelect>>', self.select)
+        self.listbox.bind('<MouseWheel>', self.roll)
+        self.listbox.bind('<4>', self.roll)
+        self.listbox.bind('<5>', self.roll)
+        # dragging would scroll the Tk listbox itself
+        self.listbox.bind('<B1-Motion>', lambda event: 'break')
+        for key, step in [('<Up>', -1), ('<Down>', 1),
+                          ('<Prior>', 'page -1'), ('<Next>', 'page 1'),
+                          ('<Home>', 'first'), ('<End>', 'last')]:
+            self.listbox.bind(key,
+                              lambda event, step= step: self.move(step))
+        self.listbox.bind('<Key>', self.type_ahead)
+        self.listbox.bind('<BackSpace>', self.type_ahead)
+        self.listbox.bind('<Escape>', self.type_ahead)
+    # end __init__
+
+
+    def grid(self, **kwargs) -> None:
+        """ place the frame
+        """
+        self.frame.grid(**kwargs)
+    # end grid
+
+
+    def bind(self, sequence:str, func) -> None:
+        """ bind an event of the listbox, e.g. double click
+        """
+        self.listbox.bind(sequence, func, add= '+')
+    # end bind
+
+
+    def size(self) -> int:
+        """ the number of items shown (after filtering)
+        """
+        return len(self.view)
+    # end size
+
+
+    def _find(self, item:str, data:list) -> int|None:
+        """ the index of item in a sorted list or None
+        """
+        i = bisect.bisect_left(data, item)
+        if i < len(data) and data[i] == item:
+            return i
+        return None
+    # end _find
+
+
+    def _match(self, item:str) -> bool:
+        """ does the item pass the type-ahead filter
+        """
+        return self.filter_text.lower() in item.lower()
+    # end _match
+
+
+    def set_items(self, items:list) -> None:
+        """ replace the content
+
+            parameters:
+            items:  list of strings, they get sorted
+        """
+        self.items = sorted(items)
+        self.refilter()
+    # end set_items
+
+
+    def clear(self) -> None:
+        """ remove all items
+        """
+        self.set_items([])
+    # end clear
+
+
+    def add(self, items:list) -> None:
+        """ add items keeping the order, e.g. while a folder
+            is being listed
+
+            parameters:
+            items:  list of strings
+        """
+        if not items:
+            return
+
+        if len(items) > 64:
+            # items listed already (a refresh, or the watcher racing
+            # the listing) must not show up twice; in place, the view
+            # may be the same list
+            self.items[:] = sorted(set(self.items).union(items))
+        else:
+            for i in items:
+                if self._find(i, self.items) is None:
+                    bisect.insort(self.items, i)
+
+        if self.view is not self.items:
+            for i in items:
+                if self._match(i) and self._find(i, self.view) is None:
+                    bisect.insort(self.view, i)
+        self.render()
+    # end add
+
+
+    def remove(self, item:str) -> None:
+        """ remove an item
+        """
+        i = self._find(item, self.items)
+        if i is not None:
+            self.items.pop(i)
+
+        if self.view is not self.items:
+            i = self._find(item, self.view)
+            if i is not None:
+                self.view.pop(i)
+
+        if item == self.selected:
+            self.selected = None
+        self.render()
+    # end remove
+
+
+    def get_selected(self) -> str|None:
+        """ the selected item or None
+        """
+        return self.selected
+    # end get_selected
+
+
+    def refilter(self) -> None:
+        """ apply the type-ahead filter to all items
+        """
+        if self.filter_text:
+            self.view = [i for i in self.items if self._match(i)]
+        else:
+            self.view = self.items
+        self.top = 0
+        self.render()
+    # end refilter
+
+
+    def render(self) -> None:
+        """ put the visible rows into the listbox
+        """
+        n = len(self.view)
+        self.top = max(0, min(self.top, n - self.rows))
+
+        self.listbox.delete(0, 'end')
+        visible = self.view[self.top:self.top + self.rows]
+        if visible:
+            self.listbox.insert('end', *visible)
+
+        if self.selected is not None:
+            i = self._find(self.selected, self.view)
+            if i is not None and self.top <= i < self.top + self.rows:
+                self.listbox.selection_set(i - self.top)
+                self.listbox.activate(i - self.top)
+
+        if n > self.rows:
+            self.scrollbar.set(self.top/n, (self.top + self.rows)/n)
+        else:
+            self.scrollbar.set(0, 1)
+
+        # the real row height is known once two rows are shown
+        if not self._calibrated and len(visible) > 1:
+            first = self.listbox.bbox(0)
+            second = self.listbox.bbox(1)
+            if first and second and second[1] > first[1]:
+                self._calibrated = True
+                self.row_height = second[1] - first[1]
+                self.resize()
+    # end render
+
+
+    def resize(self, event= None) -> None:
+        """ the number of rows follows the height of the listbox
+        """
+        height = event.height if event is not None\
+                else self.listbox.winfo_height()
+        rows = max(1, height // self.row_height)
+        if rows != self.rows:
+            self.rows = rows
+            self.render()
+    # end resize
+
+
+    def yview(self, *args) -> None:
+        """ the scrollbar command
+        """
+        if not args:
+            return
+
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.view))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            self.top += step*self.rows if args[2] == 'pages' else step
+        self.render()
+    # end yview
+
+
+    def roll(self, event) -> str:
+        """ scroll with the mouse wheel
+        """
+        # in windows, delta is nonzero
+        if event.delta != 0:
+            self.top -= int(event.delta/120)*2
+        # on Linux, it is 0 but button 4/5 work
+        else:
+            self.top += 2 if event.num == 5 else -2
+        self.render()
+        return 'break'
+    # end roll
+
+
+    def select(self, event= None) -> None:
+        """ remember the item clicked on
+        """
+        cur = self.listbox.curselection()
+        if cur:
+            self.selected = self.view[self.top + cur[0]]
+            if self.on_select is not None:
+                self.on_select(self.selected)
+    # end select
+
+
+    def move(self, step:int|str) -> str:
+        """ move the selection with the keyboard,
+            scrolling as needed
+        """
+        n = len(self.view)
+        if not n:
+            return 'break'
+
+        i = self._find(self.selected, self.view)\
+                if self.selected is not None else None
+        if i is None:
+            i = self.top - 1 if step in (1, 'page 1') else self.top + 1
+
+        if step == 'first':
+            i = 0
+        elif step == 'last':
+            i = n - 1
+        elif isinstance(step, str):
+            i += int(step.split()[1]) * self.rows
+        else:
+            i += step
+
+        i = max(0, min(i, n - 1))
+        self.selected = self.view[i]
+        if self.on_select is not None:
+            self.on_select(self.selected)
+        if i < self.top:
+            self.top = i
+        elif i >= self.top + self.rows:
+            self.top = i - self.rows + 1
+        self.render()
+        return 'break'
+    # end move
+
+
+    def type_ahead(self, event) -> str|None:
+        """ filter the list by the typed text
+        """
+        if event.keysym == 'BackSpace':
+            text = self.filter_text[:-1]
+        elif event.keysym == 'Escape':
+            # without a filter, Escape closes the window as usual
+            if not self.filter_text:
+                return None
+            text = ''
+        elif event.char and event.char.isprintable()\
+                and not event.state & 0x4:
+            text = self.filter_text + event.char
+        else:
+            return None
+
+        narrower = text.startswith(self.filter_text) and self.filter_text
+        self.filter_text = text
+        if narrower:
+            # only the items already shown can match
+            self.view = [i for i in self.view if self._match(i)]
+            self.top = 0
+            self.render()
+        else:
+            self.refilter()
+
+        if self.on_filter is not None:
+            self.on_filter(self.filter_text)
+
+        return 'break'
+    # end type_ahead
+# end of class VirtualList
+
+
 class RdmWindow():
     """ make a default window, within define some frames:
         - a main area for content
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+""" Run slow work (listing folders on network drives, reading records,
+    uploading) in worker threads, so the Tk windows stay responsive.
+
+    Tk must only be used from the thread running the mainloop. The
+    workers therefore never touch the widgets: their results and any
+    function they want to run in the GUI are put into a queue, which is
+    emptied regularly by the Tk thread using after().
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import queue
+import threading
+import tkinter as tk
+from concurrent.futures import (Future, ThreadPoolExecutor)
+
+from rdm_modules.rdm_trace import get_logger
+
+__all__ = ['TkExecutor', 'get_pool']
+
+log = get_logger('worker')
+
+# all windows share the same threads
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(max_workers:int= 4) -> ThreadPoolExecutor:
+    """ the thread pool of the program, created at the first call
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers= max_workers,
+                                       thread_name_prefix= 'rdm worker')
+    return _pool
+# end get_pool
+
+
+class TkExecutor():
+    """ submit functions to the worker threads and get their results
+        back in the Tk thread of a widget
+    """
+
+    def __init__(self,
+                 widget:tk.Misc,
+                 on_busy= None,
+                 interval:int= 50) -> None:
+        """ parameters:
+            widget:     any widget of the window, the queue is emptied
+                        using its after() while work is going on
+            on_busy:    function(bool) called in the Tk thread when
+                        the first job starts and the last one ends,
+                        to show a busy state
+            interval:   ms between checking the queue
+        """
+        self.widget = widget
+        self.on_busy = on_busy
+        self.interval = interval
+        self.running = 0
+        self._queue = queue.Queue()
+        self._after_id = None
+        self._closed = False
+    # end __init__
+
+
+    def _schedule(self) -> None:
+        """ make sure the queue is checked soon
+        """
+        if self._after_id is None and not self._closed:
+            self._after_id = self.widget.after(self.interval, self._drain)
+    # end _schedule
+
+
+    def _drain(self) -> None:
+        """ run what the workers sent, in the Tk thread
+        """
+        self._after_id = None
+        # check again before running anything: a callback may open
+        # a form and wait for it, the queue must be served meanwhile
+        if self.running > 0:
+            self._schedule()
+
+        while True:
+            try:
+                func, args, kwargs = self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if self._closed:
+                continue
+
+            # a failing callback must not stop the others
+            # pylint: disable=broad-exception-caught
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                log.exception('error in callback: %r', e)
+
+        if self.running > 0:
+            self._schedule()
+    # end _drain
+
+
+    def call(self, func, *args, **kwargs) -> None:
+        """ run func(*args, **kwargs) in the Tk thread, can be called
+            from any thread (e.g. to report progress from a worker).
+            The queue is checked while jobs are running, so call it
+            from the jobs submitted here.
+        """
+        self._queue.put((func, args, kwargs))
+    # end call
+
+
+    def _finished(self,
+                  future:Future,
+                  on_done,
+                  on_error) -> None:
+        """ deliver the result of a job in the Tk thread
+        """
+        self.running -= 1
+        if self.running == 0 and self.on_busy is not None:
+            self.on_busy(False)
+
+        error = future.exception()
+        if error is not None:
+            if on_error is not None:
+                on_error(error)
+            else:
+                log.error('error in worker: %r', error,
+                          exc_info= error)
+            return
+
+        if on_done is not None:
+            on_done(future.result())
+    # end _finished
+
+
+    def submit(self,
+               func,
+               *args,
+               on_done= None,
+               on_error= None,
+               **kwargs) -> Future:
+        """ run func(*args, **kwargs) in a worker thread
+            Call it from the Tk thread.
+
+            parameters:
+            func:       the function to run
+            on_done:    function(result) called in the Tk thread
+            on_error:   function(exception) called in the Tk thread,
+                        by default the error is printed
+
+            return:
+            the Future of the job
+        """
+        self.running += 1
+        if self.running == 1 and self.on_busy is not None:
+            self.on_busy(True)
+
+        future = get_pool().submit(func, *args, **kwargs)
+        future.add_done_callback(
+                lambda f: self.call(self._finished, f, on_done, on_error))
+        self._schedule()
+
+        return future
+    # end submit
+
+
+    def close(self) -> None:
+        """ drop the results still coming, e.g. when the window
+            is closed
+        """
+        self._closed = True
+        if self._after_id is not None:
+            try:
+                self.widget.after_cancel(self._after_id)
+            except tk.TclError:
+                pass
+            self._after_id = None
+    # end close
+# end of class TkExecutor
@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+""" The YAML backend of the program.
+    Every YAML read and write should go through here, so we use
+    the libyaml based CSafeLoader / CSafeDumper where pyyaml was
+    built with them, and fall back to the pure python versions
+    where not.
+
+    patch_top_level() changes top level keys of a record in its text,
+    keeping the comments and the layout of everything else.
+
+    The libyaml emitter folds long double quoted scalars and escapes
+    characters outside the BMP differently from the python one. Records
+    must look the same whichever backend wrote them, so dump_record()
+    checks the libyaml output for these cases, and redoes the dump with
+    the python emitter when it finds one.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import re
+
+import yaml
+
+from rdm_modules.rdm_trace import span
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+    from yaml import CSafeDumper as SafeDumper
+    LIBYAML = True
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+    LIBYAML = False
+
+# the pure python ones are always there
+from yaml import SafeDumper as PySafeDumper
+
+__all__ = ['LIBYAML', 'SafeLoader', 'SafeDumper',
+           'safe_load', 'safe_load_file', 'safe_dump', 'dump_record',
+           'patch_top_level']
+
+# the formatting used for records
+record_style = {'sort_keys': False,
+                'allow_unicode': True,
+                'width': 70,
+                'default_style': None}
+
+# escapes the two emitters do not agree on
+special_escapes = ('\\U', '\\N', '\\L', '\\P', '\\_')
+
+# a complex key, also as the first key of a list item
+_complex_key = re.compile(r'^[ -]*\? ', re.M)
+
+# a top level key: quoted or plain, followed by ':' and space or end
+_key_line = re.compile(r"""^(?:'((?:[^']|'')*)'"""
+                       r'''|"((?:[^"\\]|\\.)*)"'''
+                       r"""|([^\s#'"?:,\[\]{}&*!|>%@`-][^#]*?))"""
+                       r"""[ \t]*:(?:[ \t]|$)""")
+
+
+def safe_load(stream):
+    """ yaml.safe_load using the fastest loader available
+
+        parameters:
+        stream:     a string or an open file
+
+        return:
+        the parsed python object
+    """
+    return yaml.load(stream, Loader= SafeLoader)
+# end safe_load
+
+
+def safe_load_file(file_path:str):
+    """ read and parse a whole YAML file
+
+        parameters:
+        file_path:  path to the file
+
+        return:
+        the parsed python object
+    """
+    with open(file_path, 'rt', encoding='UTF-8') as fp,\
+            span('parse', path= file_path):
+        return yaml.load(fp, Loader= SafeLoader)
+# end safe_load_file
+
+
+def safe_dump(data, stream= None, **kwargs):
+    """ yaml.safe_dump using the fastest dumper available.
+        Parameters are the same as for yaml.safe_dump.
+    """
+    return yaml.dump(data, stream, Dumper= SafeDumper, **kwargs)
+# end safe_dump
+
+
+def _python_emitter_needed(text:str) -> bool:
+    """ check a libyaml output for double quoted scalars which
+        may be written differently by the python emitter:
+        - scalars longer than the line width (folding differs)
+        - scalars with escapes of line separators, non breaking
+          space or characters outside the BMP (style differs)
+        - complex keys ('? key'), used for long keys or keys with
+          control characters (the emitters choose them differently)
+    """
+    if '? ' in text and _complex_key.search(text):
+        return True
+
+    # most records have no double quoted scalar at all
+    if '"' not in text:
+        return False
+
+    width = record_style['width']
+    for token in yaml.scan(text, Loader= SafeLoader):
+        if (isinstance(token, yaml.ScalarToken)
+            and token.style == '"'):
+            if (token.start_mark.line != token.end_mark.line
+                or token.end_mark.column > width):
+                return True
+
+            scalar = text[token.start_mark.index:token.end_mark.index]
+            if any(i in scalar for i in special_escapes):
+                return True
+
+    return False
+# end _python_emitter_needed
+
+
+def dump_record(record:dict) -> str:
+    """ dump a record to a YAML string with the record formatting:
+        keys unsorted, unicode allowed and 70 character lines.
+
+        parameters:
+        record:     the dict to be dumped
+
+        return:
+        the YAML text
+    """
+    text = yaml.dump(record, Dumper= SafeDumper, **record_style)
+
+    if LIBYAML and _python_emitter_needed(text):
+        text = yaml.dump(record, Dumper= PySafeDumper, **record_style)
+
+    return text
+# end dump_record
+
+
+def _top_level_keys(lines:list) -> list|None:
+    """ find the top level keys of a block mapping document
+
+        parameters:
+        lines:  the lines of the document, with their line ends
+
+        return:
+        a list of [key, first line, last line] of every key, the last
+        line is the last one with content (trailing comments and empty
+        lines belong to the next key), or None if the document is not
+        a plain block mapping
+    """
+    keys = []
+    last = -1
+    for n, line in enumerate(lines):
+        c = line[:1]
+        stripped = line.rstrip('\r\n')
+        if not stripped.strip() or c == '#':
+            continue
+
+        if c in ' \t':
+            # inside the value of the last key
+            last = n
+        elif stripped == '-' or stripped.startswith('- '):
+            # a sequence item, not indented under its key
+            if not keys:
+                return None
+            last = n
+        elif stripped.startswith(('---', '...', '%')):
+            # document markers and directives: several documents,
+            # or content on the marker line
+            if keys or stripped.startswith('...') or stripped[3:].strip():
+                return None
+        else:
+            m = _key_line.match(stripped)
+            if m is None:
+                return None
+
+            if keys:
+                keys[-1][2] = last
+            if m.group(1) is not None:
+                key = m.group(1).replace("''", "'")
+            elif m.group(2) is not None:
+                key = safe_load(f'"{m.group(2)}"')
+            else:
+                key = m.group(3)
+            keys.append([key, n, n])
+            last = n
+
+    if keys:
+        keys[-1][2] = last
+    return keys if keys else None
+# end _top_level_keys
+
+
+def patch_top_level(text:str, updates:dict) -> str|None:
+    """ set top level keys of a record in its YAML text, without
+        dumping the whole record again: the block of an existing key
+        is replaced, a new key is appended, every other line (comments,
+        order, formatting, line ends) is kept as it is
+
+        parameters:
+        text:       the YAML text of the record
+        updates:    the keys and their new values
+
+        return:
+        the new text, or None if the text cannot be patched safely
+        (not a block mapping, a key appears twice, or its value is
+        an anchor used elsewhere), then the record has to be dumped
+    """
+    bom = ''
+    if text.startswith('\ufeff'):
+        bom = '\ufeff'
+        text = text[1:]
+
+    lines = text.splitlines(keepends= True)
+    keys = _top_level_keys(lines)
+    if keys is None:
+        return None
+
+    newline = '\r\n' if lines[0].endswith('\r\n') else '\n'
+    for key, value in updates.items():
+        found = [i for i in keys if i[0] == key]
+        if len(found) > 1:
+            return None
+
+        fragment = dump_record({key: value}).replace('\n\n', '\n')
+        # the dump must read back the same, e.g. no odd key types
+        if safe_load(fragment) != {key: value}:
+            return None
+        new_lines = fragment.splitlines(keepends= True)
+        if newline != '\n':
+            new_lines = [i.replace('\n', newline) for i in new_lines]
+
+        if found:
+            _, first, last = found[0]
+            # the old block must be the key alone, and
+            # no anchor other keys may refer to
+            old = ''.join(lines[first:last + 1])
+            try:
+                if (any(isinstance(i, yaml.AnchorToken)
+                        for i in yaml.scan(old, Loader= SafeLoader))
+                    or list(safe_load(old)) != [key]):
+                    return None
+            except (yaml.YAMLError, TypeError):
+                return None
+            lines[first:last + 1] = new_lines
+        else:
+            if not lines[-1].endswith('\n'):
+                lines[-1] += newline
+            lines.extend(new_lines)
+
+        # the line numbers of the keys changed
+        keys = _top_level_keys(lines)
+
+    return bom + ''.join(lines)
+# end patch_top_level
@@ -7,12 +7,269 @@
 """
 import json
 import os
-from rdm_modules.rdm_templates import find_in_record
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from rdm_modules.rdm_fields import FieldIndex
+from rdm_modules.rdm_schema import input_type
 from rdm_modules.rdm_converters import is_record
-from requests import (request, ConnectionError)
-from tkinter.messagebox import showerror, askyesno
+from rdm_modules.rdm_journal import (UploadJournal, file_sha256,
+                                     value_sha256)
+from rdm_modules.rdm_attachments import get_attachment_index
+from rdm_modules.rdm_trace import (get_logger, span, traced)
+from rdm_modules.rdm_yaml import safe_dump
+from rdm_modules.uploaders.multipart import MultipartFileStream
+from requests import (Session, ConnectionError)
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
-import yaml
+
+log = get_logger('elabftw')
+
+try:
+    from tkinter.messagebox import showerror
+except ImportError:
+    # python without Tk, e.g. a server running the batch upload
+    def showerror(title:str, message:str, **kwargs) -> None:
+        log.error('%s: %s', title, message)
+
+
+# sessions shared by all uploads, keyed by their pool settings
+_sessions = {}
+_session_lock = threading.Lock()
+# stats may be updated from the attachment threads
+_stats_lock = threading.Lock()
+
+
+def get_session(pool_size:int= 8,
+                retries:int= 3,
+                backoff:float= 0.5) -> Session:
+    """ Get a keep-alive HTTP session shared by all uploads of
+        the process, so records and attachments reuse the open
+        connections instead of a new TCP and TLS handshake for
+        every request.
+
+        Failed connections and 429 / 5xx answers are retried with
+        an exponential backoff. POST is only retried if the
+        connection could not be made, so no experiment is created
+        twice.
+
+        parameters:
+        pool_size:  connections kept open per server, should be
+                    at least the number of parallel uploads
+        retries:    how many times to retry a request
+        backoff:    backoff factor in seconds between retries
+
+        return:
+        a requests.Session
+    """
+    key = (pool_size, retries, backoff)
+    with _session_lock:
+        if key in _sessions:
+            return _sessions[key]
+
+        retry = Retry(total= retries,
+                      connect= retries,
+                      read= retries,
+                      status= retries,
+                      backoff_factor= backoff,
+                      status_forcelist= (429, 500, 502, 503, 504),
+                      allowed_methods= frozenset(['GET', 'PATCH', 'PUT',
+                                                  'DELETE', 'HEAD']),
+                      raise_on_status= False)
+        adapter = HTTPAdapter(pool_connections= pool_size,
+                              pool_maxsize= pool_size,
+                              max_retries= retry)
+        session = Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _sessions[key] = session
+
+    return session
+# end get_session
+
+
+def _request(session:Session,
+             method:str,
+             url:str,
+             stats:dict|None,
+             **kwargs):
+    """ send a request through the session, and count it with
+        its latency in stats (if it is not None)
+
+        parameters:
+        session:    the requests.Session
+        method:     'POST', 'PATCH', ...
+        url:        the link
+        stats:      a dict to collect 'requests', 'request time'
+                    and 'max latency'
+        kwargs:     passed to session.request
+
+        return:
+        the response
+    """
+    t0 = time.perf_counter()
+    try:
+        with span('request', method= method):
+            return session.request(method, url, **kwargs)
+    finally:
+        if stats is not None:
+            dt = time.perf_counter() - t0
+            with _stats_lock:
+                stats['requests'] = stats.get('requests', 0) + 1
+                stats['request time'] = stats.get('request time', 0.0) + dt
+                stats['max latency'] = max(stats.get('max latency', 0.0), dt)
+# end _request
+
+
+def _page_link(server:str, experiment:str) -> str:
+    """ turn the API link of an experiment to the link of its page
+    """
+    exp_id = experiment.rsplit('/', 1)[-1]
+    return f'{server}/experiments.php?mode=view&id={exp_id}'
+# end _page_link
+
+
+def _log_progress(filename:str, sent:int, total:int) -> None:
+    """ the default progress report: a log line for every finished
+        file, stdout is left to the programs (e.g. the JSON summary
+        of RDM_upload.py)
+    """
+    if sent >= total:
+        log.info('sent %s (%d bytes)', filename, total)
+# end _log_progress
+
+
+@traced('attachments')
+def upload_attachments(session:Session,
+                       link:str,
+                       record_path:str,
+                       filelist:list,
+                       token:str,
+                       verify= True,
+                       workers:int= 4,
+                       retries:int= 3,
+                       backoff:float= 0.5,
+                       progress= _log_progress,
+                       stats:dict|None= None,
+                       error_handler= showerror,
+                       on_done= None) -> dict:
+    """ Upload files to an experiment, several at the same time.
+        The files are streamed from the disk, not loaded into memory.
+        A failed file is retried on its own, the others are not sent
+        again.
+
+        parameters:
+        session:        the requests.Session to use
+        link:           the link of the experiment
+        record_path:    the folder of the record, file names are
+                        relative to it
+        filelist:       list of file names
+        token:          the security token
+        verify:         check the certificate of the server
+        workers:        how many files are sent at the same time
+        retries:        how many times a failed file is tried again
+        backoff:        seconds to wait before the first retry,
+                        doubled at every further one
+        progress:       function(filename, sent, total) called as
+                        the file is read (from the worker threads!)
+        stats:          a dict for counting the requests, also gets
+                        'attachments', 'attachment bytes', 'attachment
+                        time' and 'throughput' in bytes/second
+        error_handler:  function(title, message) to report the
+                        failed files at the end
+        on_done:        function(filename, info) called when a file
+                        was uploaded, info is the same as in the
+                        returned dict (called from the worker threads)
+
+        return:
+        a dict of file name: {'link': link of the upload,
+                              'sha256': hash of the file content,
+                              'size': size in bytes}
+        for every file successfully uploaded
+    """
+    # not setting Content-Type, the stream has its own
+    file_header = {'Accept': 'application/json',
+                   # 'charset': 'UTF-8',
+                   'Authorization': token}
+
+    def send(fn:str) -> tuple:
+        """ send one file, retry if needed
+
+            return:
+            (fn, upload information or None, error text)
+        """
+        error = ''
+        for attempt in range(retries + 1):
+            if attempt:
+                time.sleep(backoff * 2**(attempt-1))
+
+            report = None
+            if progress is not None:
+                report = lambda sent, total: progress(fn, sent, total)
+
+            try:
+                with MultipartFileStream(os.path.join(record_path, fn),
+                                         progress= report) as stream:
+                    header = dict(file_header)
+                    header['Content-Type'] = stream.content_type
+                    rep = _request(session,
+                                   'POST',
+                                   f'{link}/uploads',
+                                   stats,
+                                   data= stream,
+                                   headers= header,
+                                   verify= verify,
+                                   # long read time for large files
+                                   timeout= (10, 300))
+            except (ConnectionError, OSError) as e:
+                error = repr(e)
+                continue
+
+            if rep.ok and rep.status_code == 201:
+                info = {'link': rep.headers.get('Location', ''),
+                        'sha256': stream.sha256,
+                        'size': stream.size}
+                if on_done is not None:
+                    on_done(fn, info)
+                return (fn, info, '')
+
+            error = rep.text
+            # client errors will not get better by trying again
+            if rep.status_code < 500 and rep.status_code != 429:
+                break
+
+        return (fn, None, error)
+    # end send
+
+    log.info('uploading %d attachments', len(filelist))
+    t0 = time.perf_counter()
+    res = {}
+    failed = []
+    with ThreadPoolExecutor(max_workers= max(workers, 1)) as pool:
+        for fn, info, error in pool.map(send, filelist):
+            if info is None:
+                failed.append(f'{fn}: {error}')
+            else:
+                res[fn] = info
+
+    dt = time.perf_counter() - t0
+    n_bytes = sum(i['size'] for i in res.values())
+    log.info('uploaded %d files, %.2f MB/s', len(res),
+             n_bytes/max(dt, 1e-9)/1e6)
+
+    if stats is not None:
+        with _stats_lock:
+            stats['attachments'] = stats.get('attachments', 0) + len(res)
+            stats['attachment bytes'] = stats.get('attachment bytes', 0) + n_bytes
+            stats['attachment time'] = stats.get('attachment time', 0.0) + dt
+            stats['throughput'] = (stats['attachment bytes']
+                                   / max(stats['attachment time'], 1e-9))
+
+    if failed:
+        error_handler('error', 'Failed attachments:\n' + '\n'.join(failed))
+
+    return res
+# end upload_attachments
 
 
 def upload_record(
@@ -21,7 +278,18 @@ def upload_record(
         record_path:str,
         server:str,
         token:str,
-        verify= True)->dict:
+        verify= True,
+        error_handler= showerror,
+        progress= _log_progress,
+        session:Session|None= None,
+        pool_size:int= 8,
+        retries:int= 3,
+        backoff:float= 0.5,
+        per_field:bool= False,
+        attachment_workers:int= 4,
+        stats:dict|None= None,
+        journal:UploadJournal|None= None,
+        deduplicate:bool= True)->dict:
     """ Send a record to a server, and return
         a confirmation with information about the upload
 
@@ -34,6 +302,27 @@ def upload_record(
         token:          the security token to be used
         verify:         check certificate validity
                         (False for self signed certificates)
+        error_handler:  function(title, message) reporting errors,
+                        a message box by default
+        progress:       function(filename, sent, total) reporting the
+                        progress of attachment uploads (called from
+                        worker threads)
+        session:        a requests.Session to use, if None, the
+                        shared one from get_session()
+        pool_size, retries, backoff:
+                        settings of the shared session, see
+                        get_session()
+        per_field:      send title, body and metadata in separate
+                        PATCH requests (for older servers)
+        attachment_workers:
+                        how many attachments are sent at the same time
+        stats:          a dict to be filled with the number of
+                        requests, their time and the whole upload time
+        journal:        an UploadJournal of this record and server,
+                        every step is logged there, and an unfinished
+                        upload is continued from the last step
+        deduplicate:    do not send files with content already
+                        uploaded to the server, link them in the body
 
         return:
         a dict containing:
@@ -45,13 +334,17 @@ def upload_record(
         None on error
     """
     res = dict()
+    t_start = time.perf_counter()
+
+    if session is None:
+        session = get_session(pool_size, retries, backoff)
 
     if not server:
-        showerror('Server error', 'URL not provided!')
+        error_handler('Server error', 'URL not provided!')
         return None
 
     if not token:
-        showerror('Authentication', 'Authentication token is not provided!')
+        error_handler('Authentication', 'Authentication token is not provided!')
         return None
 
     header = {'Accept': 'application/json',
@@ -69,99 +362,197 @@ def upload_record(
     # here we have to take apart the record...
     body, meta, filelist = body_meta_from_record(record)
 
+    # what was done in an earlier, broken try:
+    state = journal.state() if journal is not None else {}
+
+    # filelist provides all potential attachments
+    # YAML files are supposed to be other records
+    # these would not be uploaded
+    if filelist:
+        filelist = [i for i in  filelist\
+                if os.path.isfile(
+                    os.path.join(record_path, i)
+                    # ) and not i.endswith('.yaml')
+                    ) and not is_record(os.path.join(record_path, i))
+                    ]
+        # a file linked from several fields or subset rows
+        # is attached only once
+        filelist = list(dict.fromkeys(filelist))
+
+    # files already on the server with another experiment are
+    # not sent again, but linked from the body
+    index = get_attachment_index() if deduplicate else None
+    if filelist and index is not None:
+        linked = []
+        for fn in filelist:
+            sha = index.sha256(os.path.join(record_path, fn))
+            prev = index.find(server, sha)
+            if prev and not (state and prev['experiment'] == state['link']):
+                linked.append((fn, prev))
+
+        if linked:
+            filelist = [i for i in filelist
+                        if i not in [j[0] for j in linked]]
+            saved = sum(j[1]['size'] for j in linked)
+            log.info('linking %d attachments already uploaded, '
+                     '%d bytes saved', len(linked), saved)
+
+            lines = [f'- {fn}: [{prev["name"]}]'
+                     f'({_page_link(server, prev["experiment"])})'
+                     for fn, prev in linked]
+            body = f'{body}# linked attachments\n' + '\n'.join(lines) + '\n\n'
+
+            if stats is not None:
+                stats['deduplicated'] = len(linked)
+                stats['bytes saved'] = saved
+
     upload_dict = {
                    'content_type': 2,
                    'title': title,
                    'body': body,
                    'metadata': meta,
-                   'action': 'lock',
                    }
 
-    # create the experiment
-    try:
-        rep = request('POST',
-                   f'{server}/api/v2/experiments',
-                   headers= header,
-                  json= empty_content,
-                  verify= verify,
-                  # set a default 10 seconds timout
-                  # for connect, 30 for read
-                  timeout= (10, 30))
-
-    except ConnectionError:
-        showerror('Server error', 'Server connection was refused!')
-        return None
+    # one PATCH for all fields, so we do not leave a half
+    # filled experiment behind, one per field if requested
+    if per_field:
+        patch_list = [{k:v} for k,v in upload_dict.items()]
+    else:
+        patch_list = [upload_dict]
 
-    if rep.ok and rep.status_code == 201:
-        print('experiment is created')
+    if state:
+        link = state['link']
+        log.info('continuing the upload to %s', link)
     else:
-        showerror('error', rep.text)
-        return None
+        # create the experiment
+        try:
+            rep = _request(session,
+                      'POST',
+                      f'{server}/api/v2/experiments',
+                      stats,
+                      headers= header,
+                      json= empty_content,
+                      verify= verify,
+                      # set a default 10 seconds timout
+                      # for connect, 30 for read
+                      timeout= (10, 30))
+
+        except ConnectionError:
+            error_handler('Server error', 'Server connection was refused!')
+            return None
 
-    link = rep.headers['Location']
+        if rep.ok and rep.status_code == 201:
+            log.debug('experiment is created')
+        else:
+            error_handler('error', rep.text)
+            return None
+
+        link = rep.headers['Location']
+        if journal is not None:
+            journal.log('created', link= link)
 
     # add title, body and metadata
-    for k,v in upload_dict.items():
-        rep = request('PATCH',
+    for patch in patch_list:
+        # sent in the earlier try, unless the record changed since
+        hashes = {k: value_sha256(v) for k, v in patch.items()}
+        if state and all(state['patched'].get(k) == h
+                         for k, h in hashes.items()):
+            continue
+
+        rep = _request(session,
+                      'PATCH',
                       link,
+                      stats,
                       headers= header,
-                      json= {k:v},
+                      json= patch,
                       verify= verify,
                       timeout= (10, 30))
 
         if rep.ok and rep.status_code == 200:
-            print(f'{k} is added')
+            log.debug('%s added', ', '.join(patch.keys()))
+            if journal is not None:
+                journal.log('patched', fields= list(patch.keys()),
+                            sha256= hashes)
         else:
-            showerror('error', rep.text)
+            error_handler('error', rep.text)
             return None
 
-    # filelist provides all potential attachments
-    # YAML files are supposed to be other records
-    # these would not be uploaded
     if filelist:
-        filelist = [i for i in  filelist\
-                if os.path.isfile(
-                    os.path.join(record_path, i)
-                    # ) and not i.endswith('.yaml')
-                    ) and not is_record(i)
-                    ]
+        # files sent in the earlier try are skipped,
+        # unless they have changed since
+        if filelist and state and state['attachments']:
+            done = state['attachments']
+            hash_func = index.sha256 if index is not None else file_sha256
+            filelist = [i for i in filelist
+                        if i not in done
+                        or done[i]['sha256'] != hash_func(
+                                            os.path.join(record_path, i))
+                        ]
+
         if filelist:
-            print('Uploading', len(filelist), 'attachments')
-            go_on = True
-
-            if len(filelist) > 10:
-                go_on = askyesno("Upload",
-                    "Too many attachments found!\n"
-                         "Consider uploading a zip file manually\n"
-                         "Continue with this upload?")
-            if go_on:
-                print('Start uploading attachments')
-                # not setting Content-Type, let requests handle it
-                header = {'Accept': 'application/json',
-                          # 'charset': 'UTF-8',
-                          'Authorization': token}
-
-                i = 0
-                for fn in filelist:
-                    with open(os.path.join(record_path, fn), 'rb') as fp:
-                        rep = request('POST',
-                                      f'{link}/uploads',
-                                      files= {'file': fp},
-                                      headers= header,
-                                      verify= verify)
-                        if rep.ok and rep.status_code == 201:
-                            print('Uploaded', fn)
-                            i += 1
-                        else:
-                            showerror('error', rep.text)
+            def on_done(fn:str, info:dict) -> None:
+                """ log the upload in the journal and the index
+                """
+                if journal is not None:
+                    journal.log('attachment',
+                                file= fn,
+                                sha256= info['sha256'],
+                                size= info['size'],
+                                link= info['link'])
+                if index is not None and info['link']:
+                    index.add(server,
+                              info['sha256'],
+                              info['size'],
+                              info['link'],
+                              link,
+                              fn)
+            # end on_done
+
+            sent = upload_attachments(session,
+                                      link,
+                                      record_path,
+                                      filelist,
+                                      token,
+                                      verify= verify,
+                                      workers= attachment_workers,
+                                      retries= retries,
+                                      backoff= backoff,
+                                      progress= progress,
+                                      stats= stats,
+                                      error_handler= error_handler,
+                                      on_done= on_done)
+
+            # do not lock an incomplete experiment, the next
+            # try continues with the missing files
+            if len(sent) < len(filelist):
+                return None
+
+    # lock the experiment as the very last step,
+    # when all its content is there
+    if not (state and state['locked']):
+        rep = _request(session,
+                       'PATCH',
+                       link,
+                       stats,
+                       headers= header,
+                       json= {'action': 'lock'},
+                       verify= verify,
+                       timeout= (10, 30))
+        if not rep.ok:
+            error_handler('error', rep.text)
+            return None
 
-                print('All together uploaded', i, 'files')
+        if journal is not None:
+            journal.log('locked')
 
     exp_id = link.rsplit('/',1)[-1]
     res['server'] = server
     res['id'] = exp_id
     res['link'] = link
     res['date'] = time.strftime('%Y-%m-%d %H:%M %z', time.localtime())
+
+    if stats is not None:
+        stats['time'] = time.perf_counter() - t_start
     # res['date'] = time.strftime('%Y-%m-%d %H:%M %z',
     #                            time.strptime(rep.headers['Date'],
     #                                          '%a, %d %b %Y %H:%M:%S %Z')
@@ -171,6 +562,7 @@ def upload_record(
 # end of upload_record
 
 
+@traced('convert')
 def body_meta_from_record(record:dict)->tuple:
     """ Split up a record to meta data and body parts, ready
         to be uploaded to an ElabFTW server.
@@ -213,27 +605,14 @@ def body_meta_from_record(record:dict)->tuple:
     # which is an excellent way of storing the default, read-only key-value
     # pairs of RDM-desktop
 
-    # key translation between RDM-desktop and ElabFTW
-    # these are only the types, there are other factors to consider
-    type_translation = {
-            'text': 'text',
-            'multiline': 'text',
-            'numeric': 'number',
-            'integer': 'number',
-            'list': 'text',
-            'numericlist': 'text',
-            'select': 'select',
-            'multiselect': 'select',
-            'checkbox': 'checkbox',
-            'url': 'url',
-            'date': 'datetime-local',
-            'file': 'text'
-            }
+    # key translation between RDM-desktop and ElabFTW: the extra fields
+    # of ElabFTW are HTML input types, see rdm_schema.field_types
 
     groups = []
     group_id = 0
-    filelist = find_in_record(record, 'file')
-    # print('Files:', filelist)
+    # one walk over the record before it gets changed below
+    fields = FieldIndex(record)
+    filelist = fields.values('file')
 
     # handle the record content extracting files and body elements,
     # converting types to those usable in ElabFTW
@@ -260,7 +639,6 @@ def body_meta_from_record(record:dict)->tuple:
 
             if 'type' in v:
                 if v['type'] == 'subset':
-                    print('subset:')
                     # Subsets are lists of dicts,
                     #
                     # since we do not have anything similar in ElabFTW,
@@ -290,12 +668,9 @@ def body_meta_from_record(record:dict)->tuple:
                                 table_row = [i for i in row.values()]
                                 table_vals.append(table_row)
 
-                            print('keys:', table_keys)
-                            print('got values:', table_vals)
                         else:
                             # this means an invalid structure!
-                            print('Unknown structure!')
-                            print('we got:', val)
+                            log.warning('unknown structure of subset %s', k)
                             continue
 
 
@@ -315,7 +690,7 @@ def body_meta_from_record(record:dict)->tuple:
                                 if isinstance(ii, list):
                                     # try catching numeric + unit parts:
                                     if ii and isinstance(ii[0], dict):
-                                        ii_text = yaml.safe_dump(ii)
+                                        ii_text = safe_dump(ii)
                                         ii_text = ii_text.replace('\n','<BR>')
                                     else:
                                         if len(ii) == 2 and isinstance(ii[1],str):
@@ -326,7 +701,7 @@ def body_meta_from_record(record:dict)->tuple:
 
                                 elif isinstance(ii, dict):
                                     # this should not really come up, but be safe
-                                    ii_text = yaml.safe_dump(ii)
+                                    ii_text = safe_dump(ii)
                                     ii_text = ii_text.replace('\n','<BR>')
 
                                 else:
@@ -404,7 +779,7 @@ def body_meta_from_record(record:dict)->tuple:
                 continue
 
             # all had a type, this we translate for ElabFWT
-            v['type'] = type_translation[v['type']]
+            v['type'] = input_type(v['type'])
 
         else:
             # it is not a dict, some key/value pair,
@@ -426,7 +801,6 @@ def body_meta_from_record(record:dict)->tuple:
                     groups.append({'id': group_id, 'name': k})
                     continue
 
-                print('simple string special case', k, ':', v)
                 v = {'type': 'text', 'value': v}
 
             elif isinstance(v, (int, float)):
@@ -478,7 +852,7 @@ def body_meta_from_record(record:dict)->tuple:
 
     # clean up filelist
     filelist = [i.replace('file:','') for i in filelist if isinstance(i,str)]
-    print('found files in record:', filelist)
+    log.debug('found files in record: %s', filelist)
 
     return (body, meta, filelist)
 # end body_meta_from_record
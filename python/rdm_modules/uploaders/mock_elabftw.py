@@ -0,0 +1,427 @@
+#!/usr/bin/env python
+""" A local stand-in of an ElabFTW server, implementing the parts of the
+    API v2 the uploader uses:
+
+    POST  /api/v2/experiments               create, 201 with Location
+    PATCH /api/v2/experiments/{id}          title, body, metadata, lock
+    POST  /api/v2/experiments/{id}/uploads  attach a file, 201 with Location
+    GET   /api/v2/experiments/{id}          the stored experiment
+
+    It runs over plain HTTP in a thread of the process, so uploads can be
+    tried and timed without a real server or network. Every answer can
+    be delayed (latency), and requests can be made to fail, either at a
+    given rate or the next few of a kind, to see how the uploader retries
+    and continues. The requests are counted by kind.
+
+    Usage:
+    with MockElabFTW(token= 'secret', latency= 0.01) as server:
+        upload_record(title, record, path, server.url, 'secret')
+        print(server.counts)
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import (BaseHTTPRequestHandler, ThreadingHTTPServer)
+
+__all__ = ['MockElabFTW']
+
+_experiment_path = re.compile(r'^/api/v2/experiments/(\d+)(/uploads)?/?$')
+_filename = re.compile(rb'filename="([^"]*)"')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """ answers the requests of one connection, the state is in the
+        MockElabFTW of the server
+    """
+    # keep-alive, as the uploader uses a pooled session
+    protocol_version = 'HTTP/1.1'
+    # the headers and the body are written separately, with Nagle
+    # every answer would wait for the delayed ACK of the client
+    disable_nagle_algorithm = True
+    # the mock is the owner of the server
+    mock = None
+
+    def log_message(self, format, *args) -> None:
+        # pylint: disable=redefined-builtin
+        return
+
+
+    def _read_body(self, keep:bool= True) -> tuple:
+        """ read the whole request body, also if it is not used,
+            so the connection can be reused
+
+            parameters:
+            keep:   keep the whole body, otherwise only its first chunk
+                    (uploads, where only the file name is needed)
+
+            return:
+            (size, the first chunk of the body, the body or b'')
+        """
+        chunk_size = 65536
+        size = 0
+        first = b''
+        parts = []
+
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                n = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if n == 0:
+                    self.rfile.readline()
+                    break
+                data = self.rfile.read(n)
+                self.rfile.readline()
+                size += len(data)
+                if not first:
+                    first = data
+                if keep:
+                    parts.append(data)
+
+        else:
+            remaining = int(self.headers.get('Content-Length', 0) or 0)
+            while remaining > 0:
+                data = self.rfile.read(min(remaining, chunk_size))
+                if not data:
+                    break
+                remaining -= len(data)
+                size += len(data)
+                if not first:
+                    first = data
+                if keep:
+                    parts.append(data)
+
+        body = b''.join(parts)
+        return (size, first, body)
+    # end _read_body
+
+
+    def _answer(self,
+                status:int,
+                content:dict|None= None,
+                location:str|None= None) -> None:
+        """ send a JSON answer
+        """
+        data = json.dumps(content if content is not None else {}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if location:
+            self.send_header('Location', location)
+        self.end_headers()
+        self.wfile.write(data)
+    # end _answer
+
+
+    def _handle(self, method:str) -> None:
+        mock = self.mock
+        match = _experiment_path.match(self.path.split('?')[0])
+
+        if self.path.rstrip('/') == '/api/v2/experiments':
+            kind = 'create' if method == 'POST' else 'other'
+        elif match and match.group(2):
+            kind = 'upload' if method == 'POST' else 'other'
+        elif match:
+            kind = {'PATCH': 'patch', 'GET': 'get'}.get(method, 'other')
+        else:
+            kind = 'other'
+
+        # the content of the attachments is not kept
+        size, first, body = self._read_body(keep= kind != 'upload')
+        status = mock.count(kind, size)
+        if mock.latency:
+            time.sleep(mock.latency)
+
+        if mock.token and self.headers.get('Authorization') != mock.token:
+            self._answer(401, {'code': 401, 'message': 'Unauthorized'})
+            return
+
+        if status:
+            self._answer(status, {'code': status,
+                                  'message': 'injected error'})
+            return
+
+        if kind == 'create':
+            exp_id = mock.create()
+            self._answer(201, location= f'{mock.url}/api/v2/experiments/'
+                                        f'{exp_id}')
+            return
+
+        if kind == 'other':
+            self._answer(404, {'code': 404, 'message': 'Not Found'})
+            return
+
+        exp_id = int(match.group(1))
+        if kind == 'get':
+            content = mock.experiment(exp_id)
+            if content is None:
+                self._answer(404, {'code': 404, 'message': 'Not Found'})
+            else:
+                self._answer(200, content)
+            return
+
+        if kind == 'patch':
+            try:
+                fields = json.loads(body) if body else {}
+            except ValueError:
+                self._answer(400, {'code': 400, 'message': 'invalid JSON'})
+                return
+            content, status = mock.patch(exp_id, fields)
+            self._answer(status, content)
+            return
+
+        # an upload: the file name is in the head of the multipart body
+        name = _filename.search(first)
+        name = name.group(1).decode('UTF-8', 'replace') if name else ''
+        upload_id, status = mock.upload(exp_id, name, size)
+        if status != 201:
+            self._answer(status, {'code': status, 'message': 'cannot upload'})
+            return
+        self._answer(201, location= f'{mock.url}/api/v2/experiments/'
+                                    f'{exp_id}/uploads/{upload_id}')
+    # end _handle
+
+
+    def do_POST(self) -> None:
+        self._handle('POST')
+
+    def do_PATCH(self) -> None:
+        self._handle('PATCH')
+
+    def do_GET(self) -> None:
+        self._handle('GET')
+# end of class _Handler
+
+
+class MockElabFTW():
+    """ an ElabFTW API v2 server on localhost, keeping the experiments
+        in memory
+    """
+
+    def __init__(self,
+                 token:str= '',
+                 latency:float= 0.0,
+                 error_rate:float= 0.0,
+                 error_status:int= 503,
+                 seed:int= 0,
+                 port:int= 0) -> None:
+        """ set up the server, start() or a with block runs it
+
+            parameters:
+            token:          the expected Authorization header,
+                            empty to accept any
+            latency:        seconds to wait before every answer
+            error_rate:     the part of the requests answered by
+                            error_status, 0 to 1
+            error_status:   the HTTP status of the injected errors
+            seed:           of the random errors, for repeatable runs
+            port:           the port to listen on, 0 for a free one
+        """
+        self.token = token
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.port = port
+
+        self._random = random.Random(seed)
+        # patch() returns experiment(), both lock
+        self._lock = threading.RLock()
+        self._server = None
+        self._thread = None
+        # kind: [status, remaining count]
+        self._inject = {}
+
+        self.experiments = {}
+        self.counts = {}
+        self.errors = 0
+        self.bytes_received = 0
+        self.upload_bytes = 0
+        self._next_id = 1
+        self._next_upload = 1
+    # end __init__
+
+
+    @property
+    def url(self) -> str:
+        """ the server link to give to the uploader
+        """
+        return f'http://127.0.0.1:{self.port}'
+
+
+    def start(self) -> 'MockElabFTW':
+        """ listen in a background thread
+        """
+        handler = type('Handler', (_Handler,), {'mock': self})
+        self._server = ThreadingHTTPServer(('127.0.0.1', self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target= self._server.serve_forever,
+                                        name= 'mock ElabFTW',
+                                        daemon= True)
+        self._thread.start()
+        return self
+    # end start
+
+
+    def stop(self) -> None:
+        """ stop listening
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+    # end stop
+
+
+    def __enter__(self) -> 'MockElabFTW':
+        return self.start()
+
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+    def inject(self, kind:str, status:int= 503, count:int= 1) -> None:
+        """ make the next requests of a kind fail
+
+            parameters:
+            kind:   'create', 'patch', 'upload' or 'get'
+            status: the HTTP status to answer
+            count:  how many requests fail, 0 to stop failing
+        """
+        with self._lock:
+            if count > 0:
+                self._inject[kind] = [status, count]
+            else:
+                self._inject.pop(kind, None)
+    # end inject
+
+
+    def reset(self) -> None:
+        """ forget the experiments, counts and injected errors
+        """
+        with self._lock:
+            self.experiments.clear()
+            self.counts.clear()
+            self._inject.clear()
+            self.errors = 0
+            self.bytes_received = 0
+            self.upload_bytes = 0
+            self._next_id = 1
+            self._next_upload = 1
+    # end reset
+
+
+    @property
+    def requests(self) -> int:
+        """ the number of requests answered
+        """
+        return sum(self.counts.values())
+
+
+    def count(self, kind:str, size:int) -> int:
+        """ count a request, and decide if it fails
+
+            return:
+            the status of an injected error, 0 if it goes on
+        """
+        with self._lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            self.bytes_received += size
+
+            status = 0
+            if kind in self._inject:
+                status, n = self._inject[kind]
+                if n <= 1:
+                    self._inject.pop(kind)
+                else:
+                    self._inject[kind][1] = n - 1
+            elif self.error_rate and self._random.random() < self.error_rate:
+                status = self.error_status
+
+            if status:
+                self.errors += 1
+        return status
+    # end count
+
+
+    def create(self) -> int:
+        """ a new empty experiment, return its id
+        """
+        with self._lock:
+            exp_id = self._next_id
+            self._next_id += 1
+            self.experiments[exp_id] = {'id': exp_id,
+                                        'title': 'Untitled',
+                                        'body': '',
+                                        'metadata': None,
+                                        'locked': 0,
+                                        'uploads': []}
+        return exp_id
+    # end create
+
+
+    def experiment(self, exp_id:int) -> dict|None:
+        """ a copy of an experiment, None if it does not exist
+        """
+        with self._lock:
+            if exp_id not in self.experiments:
+                return None
+            res = dict(self.experiments[exp_id])
+            res['uploads'] = list(res['uploads'])
+        return res
+    # end experiment
+
+
+    def patch(self, exp_id:int, fields:dict) -> tuple:
+        """ change or lock an experiment
+
+            return:
+            (the experiment, HTTP status)
+        """
+        with self._lock:
+            exp = self.experiments.get(exp_id)
+            if exp is None:
+                return ({'code': 404, 'message': 'Not Found'}, 404)
+            if exp['locked']:
+                return ({'code': 403, 'message': 'locked'}, 403)
+
+            if fields.get('action') == 'lock':
+                exp['locked'] = 1
+            else:
+                for k in ['title', 'body', 'metadata', 'content_type']:
+                    if k in fields:
+                        exp[k] = fields[k]
+        return (self.experiment(exp_id), 200)
+    # end patch
+
+
+    def upload(self, exp_id:int, name:str, size:int) -> tuple:
+        """ attach a file to an experiment
+
+            return:
+            (upload id, HTTP status)
+        """
+        with self._lock:
+            exp = self.experiments.get(exp_id)
+            if exp is None:
+                return (0, 404)
+            if exp['locked']:
+                return (0, 403)
+
+            upload_id = self._next_upload
+            self._next_upload += 1
+            exp['uploads'].append({'id': upload_id,
+                                   'real_name': name,
+                                   'size': size})
+            self.upload_bytes += size
+        return (upload_id, 201)
+    # end upload
+# end of class MockElabFTW
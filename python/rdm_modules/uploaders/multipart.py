@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+""" A streamed multipart/form-data body for uploading one file.
+    requests builds the whole body in memory when files= is used,
+    which is a problem for raw data files of several GB. This class
+    reads the file in chunks as the connection sends it, reports the
+    progress and calculates the SHA-256 hash of the file on the fly.
+
+    Author:     Tomio
+    License:    MIT
+    Date:       2026-10-17
+    Warranty:   None
+"""
+
+import hashlib
+import os
+import uuid
+
+__all__ = ['MultipartFileStream']
+
+
+class MultipartFileStream():
+    """ a file like object producing a multipart/form-data body with
+        a single file field. Use it as data= in requests, with the
+        content_type as the Content-Type header. Its length is known,
+        so no chunked transfer encoding is used.
+    """
+
+    def __init__(self,
+                 file_path:str,
+                 field:str= 'file',
+                 filename:str|None= None,
+                 progress= None,
+                 chunk_size:int= 65536) -> None:
+        """ open the file and prepare the multipart framing
+
+            parameters:
+            file_path:  the file to be sent
+            field:      name of the form field
+            filename:   the file name sent to the server,
+                        default is the base name of file_path
+            progress:   function(sent, total) called after every
+                        chunk read of the file
+            chunk_size: default size of reads
+        """
+        if filename is None:
+            filename = os.path.basename(file_path)
+
+        # quotes and line breaks would break the header
+        filename = filename.replace('"', '%22').replace('\r', '').replace('\n', '')
+
+        boundary = uuid.uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+
+        self._head = (f'--{boundary}\r\n'
+                      f'Content-Disposition: form-data; name="{field}"; '
+                      f'filename="{filename}"\r\n'
+                      'Content-Type: application/octet-stream\r\n'
+                      '\r\n').encode('UTF-8')
+        self._tail = f'\r\n--{boundary}--\r\n'.encode('UTF-8')
+
+        self.size = os.path.getsize(file_path)
+        self.sent = 0
+        self.progress = progress
+        self.chunk_size = chunk_size
+        self._hash = hashlib.sha256()
+        self._fp = open(file_path, 'rb')
+        # where we are: 0 head, 1 file, 2 tail, 3 done
+        self._part = 0
+        self._pos = 0
+    # end __init__
+
+
+    def __len__(self) -> int:
+        return len(self._head) + self.size + len(self._tail)
+
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+    @property
+    def sha256(self) -> str:
+        """ the hash of the file content read so far,
+            the full hash after the whole body was sent
+        """
+        return self._hash.hexdigest()
+    # end sha256
+
+
+    def read(self, size:int= -1) -> bytes:
+        """ read the next part of the body
+
+            parameters:
+            size:   maximum number of bytes, -1 for the chunk size
+
+            return:
+            bytes, empty at the end of the body
+        """
+        if size is None or size < 0:
+            size = self.chunk_size
+
+        if self._part == 0:
+            chunk = self._head[self._pos:self._pos+size]
+            self._pos += len(chunk)
+            if self._pos >= len(self._head):
+                self._part = 1
+                self._pos = 0
+            return chunk
+
+        if self._part == 1:
+            chunk = self._fp.read(size)
+            if chunk:
+                self._hash.update(chunk)
+                self.sent += len(chunk)
+                if self.progress is not None:
+                    self.progress(self.sent, self.size)
+                return chunk
+            self._part = 2
+
+        if self._part == 2:
+            chunk = self._tail[self._pos:self._pos+size]
+            self._pos += len(chunk)
+            if self._pos >= len(self._tail):
+                self._part = 3
+            return chunk
+
+        return b''
+    # end read
+
+
+    def close(self) -> None:
+        """ close the file
+        """
+        self._fp.close()
+    # end close
+# end of class MultipartFileStream